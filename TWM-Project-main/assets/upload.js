@@ -0,0 +1,67 @@
+// assets/upload.js - multipart upload for the dashboard (loaded automatically by Dash)
+//
+// The workbook is posted to /upload as a file instead of a base64 callback payload; the
+// returned job id goes into the 'ingest-job' store and the progress interval is switched on.
+
+(function () {
+    function setStatus(text, color) {
+        window.dash_clientside.set_props('upload-status', {
+            children: {
+                type: 'Span',
+                namespace: 'dash_html_components',
+                props: {children: text, style: {color: color, fontSize: '12px', fontWeight: '500'}}
+            }
+        });
+    }
+
+    function uploadFiles(files) {
+        if (!files || !files.length) {
+            return;
+        }
+        const formData = new FormData();
+        for (const file of files) {
+            formData.append('file', file);
+        }
+        setStatus('⏳ Uploading ' + Array.from(files, file => '\'' + file.name + '\'').join(', ') + '...', '#6c757d');
+
+        fetch('/upload', {method: 'POST', body: formData})
+            .then(response => response.json())
+            .then(data => {
+                if (data.success) {
+                    window.dash_clientside.set_props('ingest-job', {data: data.job_id});
+                    window.dash_clientside.set_props('job-progress-poll', {disabled: false});
+                } else {
+                    setStatus('❌ Error: ' + data.error, '#dc3545');
+                }
+            })
+            .catch(error => {
+                setStatus('❌ Upload failed', '#dc3545');
+                console.error('❌ Upload error:', error);
+            });
+    }
+
+    // The layout is rendered by React after load, so listen on the document
+    document.addEventListener('click', function (e) {
+        if (e.target.closest('#upload-data')) {
+            const input = document.createElement('input');
+            input.type = 'file';
+            input.accept = '.xlsx,.xls';
+            input.multiple = true;
+            input.addEventListener('change', () => uploadFiles(input.files));
+            input.click();
+        }
+    });
+
+    document.addEventListener('dragover', function (e) {
+        if (e.target.closest('#upload-data')) {
+            e.preventDefault();
+        }
+    });
+
+    document.addEventListener('drop', function (e) {
+        if (e.target.closest('#upload-data')) {
+            e.preventDefault();
+            uploadFiles(e.dataTransfer.files);
+        }
+    });
+})();
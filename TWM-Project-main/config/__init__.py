@@ -1,5 +1,5 @@
 # config/__init__.py
 
-from .constants import KW_RANGES, COLORS, QUARTERS, HALFYEARS, PARAMETER_GROUPS
+from .constants import KW_RANGES, COLORS, QUARTERS, HALFYEARS, PARAMETER_TAXONOMY_FILE
 
-__all__ = ['KW_RANGES', 'COLORS', 'QUARTERS', 'HALFYEARS', 'PARAMETER_GROUPS']
\ No newline at end of file
+__all__ = ['KW_RANGES', 'COLORS', 'QUARTERS', 'HALFYEARS', 'PARAMETER_TAXONOMY_FILE']
\ No newline at end of file
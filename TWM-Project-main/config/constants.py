@@ -1,5 +1,7 @@
 # config/constants.py
 
+import os
+
 # Defining KW ranges per month
 KW_RANGES = {
     "Jan": "KW: 1-5",
@@ -56,68 +58,42 @@ HALFYEARS = [
     {"name": "Jul - Dez", "months": ["Jul", "Aug", "Sep", "Okt", "Nov", "Dez"]}
 ]
 
-# Parameter groups for splitting customers into categories
-PARAMETER_GROUPS = {
-    "Grundwasser Pegel": [
-        "Grundwasser Pegel (SMP 1)",
-        "Grundwasser Pegel (SMP 2)",
-        "Grundwasser Pegel (SMP 5) PBSM",
-        "Grundwasser Pegel (SMP 6)",
-        "Grundwassermeßprogramm Pegel (GMP/EMP 1)",
-        "Grundwassermeßprogramm Pegel (GMP/EMP 1 + SMP 1)",
-        "Grundwassermeßprogramm Pegel (GMP/EMP 1 + SMP 1 + SMP 5)",
-        "Grundwassermeßprogramm Pegel (GMP/EMP 1 + SMP 1 + SMP 6)",
-        "Grundwassermeßprogramm Pegel (GMP/EMP 1+ SMP 5)",
-        "Grundwassermeßprogramm Pegel (GMP/EMP 1+ SMP 5 + SMP 6)",
-        "Grundwassermeßprogramm Pegel (GMP+EMP 1+EMP 3)",
-        "Grundwassermeßprogramm Pegel (GMP+EMP 1+EMP 3+SMP6)"
-    ],
-    "Grundwasser Brunnen": [
-        "Grundwasser (SMP 1)",
-        "Grundwasser (SMP 1) + DIN 50930+Fe/Mn",
-        "Grundwasser (SMP 1 + SMP 5) ohne vor Ort-Messung",
-        "Grundwasser (SMP 1) ohne vor Ort-Messung",
-        "Grundwasser (SMP 2)",
-        "Grundwasser (SMP 2) ohne vor Ort Messung",
-        "Grundwasser (SMP 5) PBSM",
-        "Grundwasser (SMP 5) PBSM ohne vor Ort Messung",
-        "Grundwasser (SMP 6)",
-        "Grundwasser (SMP 7)",
-        "Grundwassermeßprogramm (GMP)",
-        "GrundwassermeBprogramm (GMP)+Bak",
-        "Grundwassermeßprogramm (GMP/EMP 1)",
-        "Grundwassermeßprogramm (GMP/EMP 1 + SMP 1)",
-        "Grundwassermeßprogramm (GMP/EMP 1 + SMP 1 + SMP 5)",
-        "Grundwassermeßprogramm (GMP/EMP 1 + SMP 1 + SMP 5 + SMP 6)",
-        "Grundwassermeßprogramm (GMP/EMP 1 + SMP 1 + SMP 6)",
-        "Grundwassermeßprogramm (GMP/EMP 1+ SMP 5)",
-        "Grundwassermeßprogramm (GMP+EMP 1+EMP 3)",
-        "Grundwassermeßprogramm (GMP+EMP 1+EMP 3+SMP 4)",
-        "Grundwassermeßprogramm (GMP+EMP 1+EMP 3+SMP 6)"
-    ],
-    "Filterrückspülwässer": [
-        "abfiltrierbare Stoffe, pH Filterrückspülw.SAS+AOX+As",
-        "Filterrückspülw. Temp/pH",
-        "Klarwasser emin.",
-        "Sonderunters. Klarw.v. Filterrückspülw. (SAS)",
-        "Sonderunters. Klarw.v. Filterrückspülw. (SAS)+Alu",
-        "Sonderunters. Klarw. v. Filterrückspülw. (SAS+AOX)",
-        "Trubung"
-    ],
-    "Parametergruppe A": [
-        "Parametergruppe A TWN",
-        "Parametergruppe A TWN (mit Al, Clos)",
-        "Parametergruppe A WW-Ausg-",
-        "Parametergruppe A WW-Ausg- (mit Al,Clos)",
-        "Parametergruppe A WW-Ausg- (mit Al,Clos+GH)",
-        "Parametergruppe A WW-Ausg.+GH",
-        "Bakteriologie/Temp. (TrinkwV)",
-        "Clostridium perfringens"
-    ],
-    "Parametergruppe B": [
-        "Parametergruppe B (mit THM)",
-        "Parametergruppe B (ohne THM)",
-        "Sonst de Unters. nach DiM90430",
-        "LHKW + BTEX"
-    ]
-}
\ No newline at end of file
+# Parameter groups and the customers split into them (see utils/parameter_taxonomy.py)
+PARAMETER_TAXONOMY_FILE = os.environ.get(
+    "TWM_PARAMETER_TAXONOMY",
+    os.path.join(os.path.dirname(os.path.abspath(__file__)), "parameter_taxonomy.json")
+)
+
+# Local data directory for the ingested workbook artifact shared by dashboard and map
+DATA_DIR = os.environ.get(
+    "TWM_DATA_DIR",
+    os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "data")
+)
+
+# Number of artifact versions kept on disk
+ARTIFACT_KEEP_VERSIONS = 3
+
+# Upload memoization: transformed datasets kept per app process, keyed by SHA-256 of the upload
+UPLOAD_CACHE_MAX_ENTRIES = int(os.environ.get("TWM_UPLOAD_CACHE_ENTRIES", 8))
+UPLOAD_CACHE_MAX_BYTES = int(os.environ.get("TWM_UPLOAD_CACHE_MB", 512)) * 1024 * 1024
+
+# Rendered dashboard sections (customer headers/tables) kept per app process
+SECTION_CACHE_MAX_ENTRIES = int(os.environ.get("TWM_SECTION_CACHE_ENTRIES", 512))
+SECTION_CACHE_MAX_BYTES = int(os.environ.get("TWM_SECTION_CACHE_MB", 256)) * 1024 * 1024
+
+# Dashboard sessions (one dataset per browser session): count, total memory and idle time before eviction
+SESSION_MAX_COUNT = int(os.environ.get("TWM_SESSION_MAX", 16))
+SESSION_MAX_BYTES = int(os.environ.get("TWM_SESSION_MB", 1024)) * 1024 * 1024
+SESSION_IDLE_SECONDS = int(os.environ.get("TWM_SESSION_IDLE_MINUTES", 60)) * 60
+
+# Uploads are buffered in memory up to this size, larger ones spill to a private temp directory
+UPLOAD_SPOOL_MAX_BYTES = int(os.environ.get("TWM_UPLOAD_SPOOL_MB", 32)) * 1024 * 1024
+
+# Worker processes that parse uploaded workbooks/sheets in the background (0 = parse in the job thread)
+INGEST_WORKERS = int(os.environ.get("TWM_INGEST_WORKERS", os.cpu_count() or 2))
+
+# Finished ingest jobs kept for /jobs/<id>
+INGEST_JOB_HISTORY = 50
+
+# Log level of the ingest/processing loggers (DEBUG shows per-row details)
+LOG_LEVEL = os.environ.get("TWM_LOG_LEVEL", "INFO").upper()
@@ -1,27 +1,50 @@
 # dashboard_app.py - Separate Dashboard Application
 
+import time
+from functools import partial
+
 import dash
-from dash import html, dcc, Input, Output, State, callback_context
+from dash import html, dcc, Input, Output, State, MATCH, callback_context
 import flask
 
 # Import the dashboard module
-from dashboard_module import process_dashboard_data, create_dashboard_content
+from dashboard_module import (update_dashboard_frame, create_dashboard_content, create_customer_sections,
+                              create_customer_section)
+from utils.ingest_jobs import INGEST_JOBS, JOB_DONE
+from utils.ingest_store import load_frame, frame_of, loaded_frames, current_version, current_digest, read_manifest
+from utils.date_engine import date_engine_stats
+from utils.sample_tokens import sample_token_stats
+from utils.sample_matrix import SampleMatrix
+from utils.upload_cache import UPLOAD_CACHE
+from utils.section_cache import SECTION_CACHE
+from utils.search_index import SearchIndex
+from utils.session_store import SessionStore, new_session_id
+from utils.parameter_taxonomy import load_taxonomy
+from utils.workbook_schema import MAP_ONLY_COLUMNS
+from utils.ingest_log import get_logger, StageTimer
+
+log = get_logger("dashboard")
 
 # Initialize Flask server and Dash app
 server = flask.Flask(__name__)
 app = dash.Dash(__name__, server=server, suppress_callback_exceptions=True)
 app.title = "Probenplanung Dashboard"
 
-# Global variables
-DASHBOARD_DATA = None
-CONTENT_CACHE = {
-    'dashboard': None,
-    'data_version': 0
-}
+# Dataset, rendered content and transform state per browser session (bounded LRU, idle sessions evicted)
+SESSIONS = SessionStore(on_evict=SECTION_CACHE.forget)
+
+# Browser-session cookie identifying the dashboard session of a request
+SESSION_COOKIE = 'twm_session'
 
 # Map application URL (change port if needed)
 MAP_APP_URL = "http://127.0.0.1:5002"
 
+# How often the dashboard checks for a newer shared data version (e.g. uploaded in the map app)
+DATA_VERSION_POLL_MS = 5000
+
+# How often the upload status is refreshed while an ingest job runs
+JOB_PROGRESS_POLL_MS = 1000
+
 # Dashboard-only app layout
 app.layout = html.Div([
     # Header section
@@ -34,12 +57,11 @@ app.layout = html.Div([
 
         # Upload and map link row
         html.Div([
-            # Upload component
-            dcc.Upload(
+            # Upload area: assets/upload.js posts the file to /upload (multipart) and hands back the job id
+            html.Div(
                 id='upload-data',
                 children=html.Div(['📄 Drag & Drop Excel File']),
-                className="upload-area-compact",
-                multiple=False
+                className="upload-area-compact"
             ),
 
             # Map application button
@@ -81,52 +103,174 @@ app.layout = html.Div([
 
     # Hidden stores
     html.Div(id='cache-invalidator', style={'display': 'none'}),
+    dcc.Interval(id='data-version-poll', interval=DATA_VERSION_POLL_MS, n_intervals=0),
+    dcc.Store(id='ingest-job'),
+    dcc.Interval(id='job-progress-poll', interval=JOB_PROGRESS_POLL_MS, n_intervals=0, disabled=True),
 
 ], className="main-container-redesigned")
 
 
+@server.before_request
+def _identify_session():
+    """Session id of the request's browser session (a new one if the browser has none yet)"""
+    flask.g.session_id = flask.request.cookies.get(SESSION_COOKIE) or new_session_id()
+
+
+@server.after_request
+def _remember_session(response):
+    if flask.request.cookies.get(SESSION_COOKIE) != flask.g.get('session_id'):
+        response.set_cookie(SESSION_COOKIE, flask.g.session_id, httponly=True, samesite='Lax')
+    return response
+
+
+def current_session():
+    """Dashboard session of the current request"""
+    return SESSIONS.get(flask.g.session_id)
+
+
+def _measure(session):
+    """Account a session's memory and enforce the store limits (datasets the caches share are not charged)"""
+    session.measure(shared=[UPLOAD_CACHE.peek('dashboard', session.data_key), *loaded_frames()])
+    SESSIONS.resized(session)
+
+
+def _apply_dataset(session, version, df, digest=None, timer=None):
+    """Build a session's dashboard data from an ingested frame (memoized by workbook hash) and invalidate its rendered content"""
+    timer = timer or StageTimer()
+    # Split customers depend on the parameter taxonomy as well as on the workbook
+    cache_key = f"{digest}:{load_taxonomy().fingerprint}" if digest else None
+    dashboard_data = UPLOAD_CACHE.get('dashboard', cache_key) if cache_key else None
+    if dashboard_data is not None:
+        log.info(f"⚡ Dashboard data for sha256 {digest[:12]} served from upload cache")
+        dashboard_error = None
+        session.last_changes = {'mode': 'cached'}
+    else:
+        with timer.stage('transform'):
+            # Uploads and version syncs hand the transform the same shared frame of the dashboard's columns
+            df = frame_of(version, df, exclude=MAP_ONLY_COLUMNS)
+            dashboard_data, session.last_changes, dashboard_error = update_dashboard_frame(df, session.transform_state)
+        if cache_key and dashboard_data is not None:
+            UPLOAD_CACHE.put('dashboard', cache_key, dashboard_data)
+
+    # Invalidate cache when new data is loaded (same data -> keep the rendered content)
+    if dashboard_data is not session.data:
+        session.content = None
+        session.sections.update(data_version=version,
+                                versions=SECTION_CACHE.track(session.id, dashboard_data or [], version))
+        with timer.stage('matrix'):
+            session.matrix = SampleMatrix.from_customers(dashboard_data) if dashboard_data is not None else None
+        with timer.stage('search_index'):
+            session.search_index = SearchIndex(dashboard_data, session.matrix) if dashboard_data is not None else None
+    session.data, session.data_key = dashboard_data, cache_key
+    session.data_version = version
+
+    with timer.stage('measure'):
+        _measure(session)
+    session.last_timings = timer.as_dict()
+    log.info(timer.summary())
+    return dashboard_error
+
+
+def _describe_changes(changes):
+    """Short change summary of an incremental update for the upload status"""
+    if not changes or changes.get('mode') != 'incremental':
+        return ""
+    return (f" Changes: +{changes['rows_added']} / -{changes['rows_removed']} / ~{changes['rows_changed']} rows, "
+            f"{changes['customers_rebuilt']} of {changes['customers_total']} customers rebuilt.")
+
+
+def finish_dashboard_upload(session, job, version, df, digest):
+    """Build the dashboard data of a session's published upload and swap it in (runs in the ingest job thread)"""
+    with session.lock:
+        # A newer upload of this session may have swapped its dataset in while this job waited for the lock
+        job.raise_if_cancelled()
+        dashboard_error = _apply_dataset(session, version, df, digest, job.timer)
+        matrix = session.matrix
+        # The session keeps its own upload instead of following newer shared versions (only once it is shown)
+        session.pinned = session.data is not None
+    if session.data is None:
+        raise ValueError(dashboard_error or "Unknown error processing dashboard data")
+    completed, planned = matrix.completed.sum(), matrix.planned.sum()
+    return {
+        'customers': len(matrix.kunden),
+        'samples': {'completed': int(completed), 'planned': int(planned)},
+        'changes': session.last_changes
+    }
+
+
+def _job_progress(job):
+    """Upload status line of a running ingest job"""
+    return html.Div([
+        html.Span("⏳", style={'fontSize': '14px', 'marginRight': '6px'}),
+        html.Span(f"Processing '{job.source_name}' ({job.stage}, {job.percent}%)...",
+                  style={'color': '#6c757d', 'fontSize': '12px', 'fontWeight': '500'})
+    ])
+
+
 @app.callback(
     [Output('upload-status', 'children'),
-     Output('cache-invalidator', 'children')],
-    [Input('upload-data', 'contents')],
-    [State('upload-data', 'filename')]
+     Output('cache-invalidator', 'children'),
+     Output('ingest-job', 'data'),
+     Output('job-progress-poll', 'disabled')],
+    [Input('data-version-poll', 'n_intervals'),
+     Input('job-progress-poll', 'n_intervals')],
+    [State('ingest-job', 'data')]
 )
-def handle_file_upload(contents, filename):
-    """Handle file upload for dashboard only"""
-    global DASHBOARD_DATA, CONTENT_CACHE
-
-    if contents is None:
-        return "", ""
-
-    try:
-        # Process data for dashboard
-        DASHBOARD_DATA, dashboard_error = process_dashboard_data(contents)
+def handle_file_upload(n_intervals, job_intervals, job_id):
+    """Report the progress of upload jobs started via /upload and pick up versions ingested by the map app"""
+    session = current_session()
+    triggered = [t['prop_id'] for t in callback_context.triggered]
 
-        # Invalidate cache when new data is uploaded
-        CONTENT_CACHE['data_version'] += 1
-        CONTENT_CACHE['dashboard'] = None
+    if job_id and 'job-progress-poll.n_intervals' in triggered:
+        job = INGEST_JOBS.get(job_id)
+        if job is None:
+            return dash.no_update, dash.no_update, None, True
+        if job.active:
+            return _job_progress(job), dash.no_update, dash.no_update, dash.no_update
 
-        if DASHBOARD_DATA is not None:
+        if job.status == JOB_DONE:
             success_msg = html.Div([
                 html.Span("✅", style={'fontSize': '14px', 'marginRight': '6px'}),
-                html.Span(f"'{filename}' uploaded successfully! Dashboard ready.",
+                html.Span(f"'{job.source_name}' uploaded successfully! Dashboard ready.",
                           style={'color': '#28a745', 'fontSize': '12px', 'fontWeight': '500'}),
                 html.Br(),
                 html.Small(
-                    f"Loaded data for {len(set([item.get('kunde', 'Unknown') for item in DASHBOARD_DATA]))} customers.",
+                    f"Loaded data for {job.result['customers']} customers "
+                    f"({job.result['samples']['completed']}/{job.result['samples']['planned']} samples taken)."
+                    f"{_describe_changes(job.result['changes'])}",
                     style={'color': '#6c757d', 'fontSize': '11px'})
             ])
+            return success_msg, str(session.data_version), None, True
 
-            return success_msg, str(CONTENT_CACHE['data_version'])
-        else:
-            raise Exception(dashboard_error or "Unknown error processing dashboard data")
-
-    except Exception as e:
         error_msg = html.Div([
             html.Span("❌", style={'fontSize': '14px', 'marginRight': '6px'}),
-            html.Span(f"Error: {str(e)[:50]}...", style={'color': '#dc3545', 'fontSize': '12px'})
+            html.Span(f"Error: {str(job.error)[:50]}...", style={'color': '#dc3545', 'fontSize': '12px'})
         ])
-        return error_msg, ""
+        return error_msg, "", None, True
+
+    # Shared ingest: reload only if another app or session published a newer version
+    # (sessions that uploaded their own workbook keep it)
+    version = current_version()
+    if session.pinned or version == 0 or version == session.data_version:
+        return dash.no_update, dash.no_update, dash.no_update, dash.no_update
+
+    # An ingest job is swapping in a dataset for this session right now
+    if not session.lock.acquire(blocking=False):
+        return dash.no_update, dash.no_update, dash.no_update, dash.no_update
+    try:
+        loaded_version, df = load_frame(exclude=MAP_ONLY_COLUMNS)
+        dashboard_error = _apply_dataset(session, loaded_version, df, current_digest())
+    finally:
+        session.lock.release()
+    if dashboard_error is not None:
+        return dash.no_update, dash.no_update, dash.no_update, dash.no_update
+
+    manifest = read_manifest() or {}
+    return html.Div([
+        html.Span("🔄", style={'fontSize': '14px', 'marginRight': '6px'}),
+        html.Span(f"Loaded data version {loaded_version} ('{manifest.get('source')}')",
+                  style={'color': '#17a2b8', 'fontSize': '12px', 'fontWeight': '500'})
+    ]), str(session.data_version), dash.no_update, dash.no_update
 
 
 @app.callback(
@@ -135,17 +279,22 @@ def handle_file_upload(contents, filename):
     prevent_initial_call=False
 )
 def render_dashboard_content(cache_version):
-    """Render dashboard content with caching"""
-    global DASHBOARD_DATA, CONTENT_CACHE
+    """Render the session's dashboard content with caching"""
+    session = current_session()
 
     # Check cache first
-    if CONTENT_CACHE['dashboard'] is not None:
-        print("🚀 Loading dashboard from cache")
-        return CONTENT_CACHE['dashboard']
+    if session.content is not None:
+        log.debug(f"🚀 Loading dashboard of session {session.id[:8]} from cache")
+        return session.content
 
-    print("⏳ Generating dashboard content...")
-    if DASHBOARD_DATA is not None:
-        dashboard_content = create_dashboard_content(DASHBOARD_DATA)
+    log.debug(f"⏳ Generating dashboard content for session {session.id[:8]}...")
+    if session.data is not None:
+        # The data version the collapsed sections belong to, checked when one is expanded
+        dashboard_content = html.Div([
+            dcc.Store(id='sections-version', data=session.sections['data_version']),
+            create_dashboard_content(session.data, session.matrix, SECTION_CACHE,
+                                     session.sections['versions'])
+        ])
     else:
         dashboard_content = html.Div([
             html.Div([
@@ -158,17 +307,129 @@ def render_dashboard_content(cache_version):
             ], style={'padding': '50px', 'textAlign': 'center'})
         ])
 
-    # Cache the content
-    CONTENT_CACHE['dashboard'] = dashboard_content
-    print("💾 Dashboard content cached")
+    # Cache the content (and account it to the session)
+    session.content = dashboard_content
+    _measure(session)
+    log.info(f"💾 Dashboard content of session {session.id[:8]} cached (data version {session.data_version})")
     return dashboard_content
 
 
+@app.callback(
+    [Output('customer-sections', 'children'),
+     Output('search-summary', 'children')],
+    [Input('search-customer', 'value'),
+     Input('search-location', 'value'),
+     Input('filter-group', 'value'),
+     Input('filter-pn-type', 'value'),
+     Input('filter-status', 'value')],
+    [State('sections-version', 'data')],
+    prevent_initial_call=True
+)
+def filter_customer_sections(customer, location, groups, pn_types, statuses, sections_version):
+    """Show only the customer sections matching the search bar (answered by the search index)"""
+    session = current_session()
+    if session.search_index is None or sections_version != session.sections['data_version']:
+        return dash.no_update, dash.no_update
+
+    start = time.perf_counter()
+    positions = session.search_index.query(customer, location, groups or (), pn_types or (), statuses or ())
+    sections = create_customer_sections(session.data, session.matrix, SECTION_CACHE,
+                                        session.sections['versions'], positions)
+    log.debug(f"🔎 Search matched {len(positions)} customers in {(time.perf_counter() - start) * 1000:.1f}ms")
+    return sections, f"{len(positions)} von {len(session.data)} Kunden"
+
+
+@app.callback(
+    [Output({'type': 'customer-body', 'index': MATCH}, 'children'),
+     Output({'type': 'customer-arrow', 'index': MATCH}, 'children')],
+    [Input({'type': 'customer-toggle', 'index': MATCH}, 'n_clicks')],
+    [State('sections-version', 'data')],
+    prevent_initial_call=True
+)
+def toggle_customer_section(n_clicks, sections_version):
+    """Render a customer's table when its section is expanded (cached until the customer's data changes)"""
+    index = callback_context.triggered_id['index']
+    session = current_session()
+
+    # The page still shows sections of an older dataset; it is re-rendered with the new one
+    stale = sections_version != session.sections['data_version']
+    if session.data is None or stale or index >= len(session.data):
+        return dash.no_update, dash.no_update
+    if not n_clicks or n_clicks % 2 == 0:
+        return None, "▸"
+
+    customer = session.data[index]
+    section = SECTION_CACHE.section(session.sections['versions'][index], customer, ('table',),
+                                    lambda: create_customer_section(customer))
+    return section, "▾"
+
+
+@server.route('/upload', methods=['POST'])
+def upload_file():
+    """Multipart upload: stream the workbook(s) into a background ingest job and return its id"""
+    # One or several workbooks; sheets=all reads every sheet instead of the first one
+    files = [file for file in flask.request.files.getlist('file') if file.filename]
+    if not files:
+        return flask.jsonify({'success': False, 'error': 'No file provided'}), 400
+    if not all(file.filename.lower().endswith(('.xlsx', '.xls')) for file in files):
+        return flask.jsonify({'success': False, 'error': 'Please upload an Excel file (.xlsx or .xls)'}), 400
+
+    # Ingest once into the shared artifact in the background, then build this session's dashboard view from it
+    session = current_session()
+    job = INGEST_JOBS.submit_uploads(files, partial(finish_dashboard_upload, session),
+                                     all_sheets=flask.request.form.get('sheets') == 'all', scope=session.id)
+    return flask.jsonify({'success': True, 'job_id': job.id, 'status_url': f'/jobs/{job.id}'}), 202
+
+
+@server.route('/jobs/<job_id>')
+def job_status(job_id):
+    """Stage and percent done of a background upload"""
+    job = INGEST_JOBS.get(job_id)
+    if job is None:
+        return flask.jsonify({'error': f'Unknown job {job_id}'}), 404
+    return flask.jsonify(job.as_dict())
+
+
+@server.route('/debug')
+def debug_info():
+    """Data version of the request's session, the session store and the cache counters of the dashboard process"""
+    session = current_session()
+    return flask.jsonify({
+        'session': session.id[:8],
+        'data_version': session.data_version,
+        'dashboard_items': len(session.data) if session.data else 0,
+        'content_cached': session.content is not None,
+        'pinned': session.pinned,
+        'last_changes': session.last_changes,
+        'timings': session.last_timings,
+        'sessions': SESSIONS.stats(),
+        'ingest_jobs': INGEST_JOBS.jobs()[:5],
+        'upload_cache': UPLOAD_CACHE.stats(),
+        'section_cache': {key: value for key, value in SECTION_CACHE.stats().items() if key != 'keys'},
+        'date_engine': date_engine_stats(),
+        'sample_tokens': sample_token_stats(),
+        'sample_matrix': session.matrix.summary() if session.matrix is not None else None,
+        'search_index': session.search_index.summary() if session.search_index is not None else None,
+        'parameter_taxonomy': load_taxonomy().summary()
+    })
+
+
+@server.route('/debug/sections')
+def section_cache_info():
+    """Hit rate, memory and keys of the rendered section cache (customers kept for the request's session)"""
+    session = current_session()
+    data_version, versions = session.sections['data_version'], session.sections['versions']
+    rebuilt = sum(1 for version in versions if version == data_version)
+    return flask.jsonify(dict(SECTION_CACHE.stats(), data_version=data_version,
+                              customers_rebuilt=rebuilt, customers_kept=len(versions) - rebuilt))
+
+
 def clear_content_cache():
-    """Manually clear the content cache"""
-    global CONTENT_CACHE
-    CONTENT_CACHE['dashboard'] = None
-    print("🗑️ Content cache cleared")
+    """Manually clear the content cache of all sessions"""
+    for session in SESSIONS.sessions():
+        session.content = None
+    SECTION_CACHE.clear()
+    log.info("🗑️ Content cache cleared")
 
 
 if __name__ == '__main__':
@@ -1,78 +1,95 @@
 # dashboard_module.py
 
+from functools import partial
 from dash import html
 import traceback
 
 # Import your existing utilities
 from utils import (
-    transform_data,
-    create_customer_header,
     create_legend,
+    create_collapsed_customer_section,
+    create_search_bar,
     create_customer_table_with_scroll
 )
+from utils.date_engine import prime_dates
+from utils.incremental import incremental_transform
+from utils.sample_matrix import SampleMatrix, current_month
+from utils.search_index import STATUSES
 
 
-def process_dashboard_data(contents):
-    """Process uploaded Excel data for dashboard functionality"""
+def update_dashboard_frame(df, state):
+    """Process a new workbook frame, rebuilding only the customers that changed since the frame in state"""
     try:
-        transformed_data = transform_data(contents)
-        return transformed_data, None
+        # Parse each distinct Datum value once up front; rendering then only does table lookups
+        prime_dates(df)
+        transformed_data, changes = incremental_transform(df, state)
+        return transformed_data, changes, None
     except Exception as e:
-        return None, str(e)
+        return None, None, str(e)
 
 
-def create_dashboard_content(processed_data):
-    """Create dashboard content from processed data"""
-    if processed_data is None:
-        return html.Div("Please upload a file first", style={'textAlign': 'center', 'padding': '50px'})
+def create_customer_sections(processed_data, matrix, section_cache=None, versions=None, positions=None):
+    """
+    Collapsed sections of the customer entries at the given positions (all by default).
 
-    try:
-        customer_sections = []
+    With a SectionCache (and the data version of every customer) headers of unchanged customers
+    are reused instead of rendered again.
+    """
+    month = current_month()
+    summaries = []
 
-        # Add legend
-        customer_sections.append(create_legend())
+    def render(index):
+        if not summaries:
+            summaries.extend(matrix.customer_summaries(month))
+        return create_collapsed_customer_section(index, processed_data[index].kunde, summaries[index])
 
-        for kunde_data in processed_data:
-            # Customer heading
-            customer_header = create_customer_header(kunde_data["Kunde"])
+    # Tables are rendered per customer when a section is expanded (see create_customer_section)
+    sections = []
+    for index in range(len(processed_data)) if positions is None else positions:
+        if section_cache is None:
+            sections.append(render(index))
+        else:
+            sections.append(section_cache.section(versions[index], processed_data[index], ('header', index, month),
+                                                  partial(render, index)))
+    return sections
 
-            if kunde_data["Rows"]:
-                # Get all parameters
-                all_params = set()
-                for row in kunde_data["Rows"]:
-                    for key in row.keys():
-                        if key not in ["Messstelle", "Zapfstelle"]:
-                            if isinstance(key, str) and key.strip().lower() not in ["", "nan", "none"]:
-                                all_params.add(key.strip())
 
-                # Convert and sort parameters
-                str_params = [str(param) for param in all_params]
-                sorted_params = sorted(str_params)
+def create_dashboard_content(processed_data, matrix=None, section_cache=None, versions=None):
+    """Create dashboard content: the legend, the search bar and a collapsed section per customer"""
+    if processed_data is None:
+        return html.Div("Please upload a file first", style={'textAlign': 'center', 'padding': '50px'})
 
-                # Create table body rows
-                table_body_rows = []
-                for row_data in kunde_data["Rows"]:
-                    table_body_rows.append(row_data)
+    try:
+        matrix = matrix or SampleMatrix.from_customers(processed_data)
+        return html.Div([
+            create_legend(),
+            create_search_bar(matrix.groups, [pn_type for pn_type in matrix.pn_types
+                                              if pn_type and pn_type.lower() not in ["nan", "none"]], STATUSES),
+            html.Div(f"{len(processed_data)} Kunden", id='search-summary', className="search-summary"),
+            html.Div(create_customer_sections(processed_data, matrix, section_cache, versions),
+                     id='customer-sections')
+        ], className="output-container")
 
-                # Create complete table with scroll
-                complete_table_with_scroll = create_customer_table_with_scroll(table_body_rows, sorted_params)
+    except Exception as e:
+        return html.Div([
+            html.H4("❌ Error rendering dashboard:", style={"color": "red"}),
+            html.Pre(str(e), style={"backgroundColor": "#f8d7da", "padding": "15px", "borderRadius": "5px"})
+        ])
 
-                # Wrap in customer section
-                customer_section = html.Div([
-                    customer_header,
-                    complete_table_with_scroll
-                ], className="customer-group-container")
 
-                customer_sections.append(customer_section)
-            else:
-                # If no rows, just add the customer header
-                customer_sections.append(html.Div([customer_header], style={"marginBottom": "20px"}))
+def create_customer_section(customer):
+    """Table of one customer, rendered when its section is expanded"""
+    try:
+        if not customer.rows:
+            return html.Div("Keine Messstellen", style={"color": "#999", "padding": "15px 20px"})
 
-        return html.Div(customer_sections, className="output-container")
+        # Get all parameters, sorted
+        sorted_params = customer.parameter_names()
+        return create_customer_table_with_scroll(customer.rows, sorted_params)
 
     except Exception as e:
         return html.Div([
-            html.H4("❌ Error rendering dashboard:", style={"color": "red"}),
+            html.H4("❌ Error rendering customer:", style={"color": "red"}),
             html.Pre(str(e), style={"backgroundColor": "#f8d7da", "padding": "15px", "borderRadius": "5px"})
         ])
 
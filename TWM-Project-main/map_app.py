@@ -1,5 +1,8 @@
 import json
+import logging
 import os
+import threading
+import time
 import traceback
 from datetime import datetime
 
@@ -7,6 +10,19 @@ import flask
 import numpy as np
 import pandas as pd
 
+from utils.coordinates import COORD_OK, COORD_OUT_OF_RANGE, COORD_UNPARSEABLE, parse_coordinates, coordinate_summary, format_coordinate_summary
+from utils.date_engine import prime_dates, date_engine_stats
+from utils.excel_reader import read_workbook
+from utils.incremental import diff_frames
+from utils.map_processor import derive_map_columns, safe_str_convert
+from utils.ingest_jobs import INGEST_JOBS
+from utils.ingest_store import load_frame, current_version, current_digest, read_manifest
+from utils.upload_cache import UPLOAD_CACHE
+from utils.workbook_schema import MAP_REQUIRED_COLUMNS, get_workbook_schema
+from utils.ingest_log import get_logger, StageTimer
+
+log = get_logger("map")
+
 app = flask.Flask(__name__)
 
 # Create static folders if they don't exist
@@ -15,8 +31,13 @@ os.makedirs('static/js', exist_ok=True)
 
 # Global variables
 MAP_DATA = None
+MAP_DATA_VERSION = 0
+# Frame and per-(Gebiet, Messstelle) points of the last parse, reused by incremental updates
+MAP_STATE = {'frame': None, 'points': {}}
 LAST_ERROR = None
 DEBUG_INFO = {}
+# Held while a dataset is built and swapped in, so uploads and version syncs do not interleave
+DATASET_LOCK = threading.Lock()
 
 # Category colors (from your files)
 CATEGORY_COLORS = {
@@ -31,167 +52,47 @@ CATEGORY_COLORS = {
 DASHBOARD_APP_URL = "http://127.0.0.1:8050"
 
 
-def extract_latest_date(row):
-    """Extract the most recent date from all Datum columns"""
-    import pandas as pd
-    from datetime import datetime
-
-    dates = []
-    month_names = ['Jan', 'Feb', 'Mrz', 'Apr', 'Mai', 'Jun', 'Jul', 'Aug', 'Sep', 'Okt', 'Nov', 'Dez']
-
-    print(f"Extracting date for parameter: {row.get('Parameter', 'Unknown')}")
-
-    # Look through each month's Datum column to find any dates
-    for month in month_names:
-        datum_col = f"{month}\nDatum"
-        datum_value = row.get(datum_col)
-
-        print(f"  {month} Datum: {datum_value} ({type(datum_value)})")
-
-        # Check if this month has a date
-        if pd.notna(datum_value) and datum_value != '':
-            print(f"    ✅ Found date in {month}, parsing...")
-
-            # Parse the date from this month's Datum column
-            parsed_date = parse_date_string(datum_value)
-            if parsed_date:
-                dates.append(parsed_date)
-                print(f"    ✅ Parsed date: {datum_value} -> {parsed_date}")
-            else:
-                print(f"    ❌ Could not parse date: {datum_value}")
-        else:
-            print(f"    ➖ No date in {month}")
-
-    # Also check Start Datum and aktuelles Datum columns if they exist
-    for col_name in ['Start Datum', 'aktuelles Datum']:
-        if col_name in row and pd.notna(row[col_name]) and row[col_name] != '':
-            print(f"  {col_name}: {row[col_name]} ({type(row[col_name])})")
-            parsed_date = parse_date_string(row[col_name])
-            if parsed_date:
-                dates.append(parsed_date)
-                print(f"    ✅ Parsed {col_name}: {row[col_name]} -> {parsed_date}")
-
-    if dates:
-        # Return the most recent date formatted
-        latest_date = max(dates)
-        result = latest_date.strftime("%d.%m.%Y")
-        print(f"  🎯 Latest date found: {result}")
-        return result
-    else:
-        print("  ❌ No dates found in any Datum columns")
-        # Check if there are any samples taken but no dates
-        aktuell_gesamt = row.get('Aktuell\nGesamt', 0)
-        if pd.notna(aktuell_gesamt) and aktuell_gesamt > 0:
-            return "Date missing"
-        else:
-            return None
-
-
-def parse_date_string(date_value):
-    """Parse various date formats commonly found in Excel"""
-    import pandas as pd
-    from datetime import datetime
-    import re
-
-    if pd.isna(date_value) or date_value == '' or date_value is None:
-        return None
+def debug_excel_file(file_path):
+    """Debug function to analyze Excel file structure"""
+    global DEBUG_INFO
+    DEBUG_INFO = {}
 
-    # Handle different Excel date formats
     try:
-        # If it's already a pandas Timestamp
-        if isinstance(date_value, pd.Timestamp):
-            return date_value
-
-        # If it's a Python datetime object
-        if isinstance(date_value, datetime):
-            return date_value
-
-        # If it's an Excel serial date number
-        if isinstance(date_value, (int, float)):
-            if date_value > 25569:  # Valid Excel date range
-                excel_date = pd.to_datetime('1899-12-30') + pd.Timedelta(days=date_value)
-                return excel_date
-            else:
-                return None
-
-        # If it's a string
-        if isinstance(date_value, str):
-            date_str = date_value.strip()
-            if not date_str:
-                return None
-
-            # Handle multiple dates separated by semicolon - take the last one
-            if ';' in date_str:
-                date_parts = [d.strip() for d in date_str.split(';') if d.strip()]
-                if date_parts:
-                    date_str = date_parts[-1]  # Take the last (most recent) date
-
-            # Common German date formats
-            date_formats = [
-                '%d.%m.%Y',  # 13.03.2025
-                '%d/%m/%Y',  # 13/03/2025
-                '%d-%m-%Y',  # 13-03-2025
-                '%Y-%m-%d',  # 2025-03-13
-                '%d.%m.%y',  # 13.03.25
-                '%d/%m/%y',  # 13/03/25
-                '%d-%m-%y',  # 13-03-25
-            ]
-
-            # Try each format
-            for date_format in date_formats:
-                try:
-                    parsed_date = datetime.strptime(date_str, date_format)
-                    return parsed_date
-                except ValueError:
-                    continue
+        log.info(f"\n🔍 DEBUGGING EXCEL FILE: {file_path}")
 
-            # Try pandas parsing as fallback
-            try:
-                parsed_date = pd.to_datetime(date_str, dayfirst=True, errors='coerce')
-                if not pd.isna(parsed_date):
-                    return parsed_date
-            except:
-                pass
-
-            # Try regex extraction for messy formats
-            try:
-                date_pattern = r'(\d{1,2})[./\-](\d{1,2})[./\-](\d{2,4})'
-                match = re.search(date_pattern, date_str)
-                if match:
-                    day, month, year = match.groups()
-                    if len(year) == 2:
-                        year = '20' + year if int(year) <= 50 else '19' + year
-
-                    try:
-                        parsed_date = datetime(int(year), int(month), int(day))
-                        return parsed_date
-                    except ValueError:
-                        pass
-            except:
-                pass
+        # Read Excel file (header first, then only the needed columns)
+        df, reader_info = read_workbook(file_path)
+        log.info(f"✅ File read successfully. Shape: {df.shape}")
 
     except Exception as e:
-        print(f"    ❌ Error parsing date {date_value}: {e}")
-
-    return None
+        error_msg = f"Error reading Excel file: {str(e)}"
+        log.error(f"❌ {error_msg}")
+        DEBUG_INFO['error'] = error_msg
+        DEBUG_INFO['traceback'] = traceback.format_exc()
+        return None, error_msg
 
+    df, error = debug_dataframe(df)
+    DEBUG_INFO['reader'] = reader_info
+    return df, error
 
 
-def debug_excel_file(file_path):
-    """Debug function to analyze Excel file structure"""
+def debug_dataframe(df):
+    """Analyze the structure of an already loaded workbook frame"""
     global DEBUG_INFO
     DEBUG_INFO = {}
 
     try:
-        print(f"\n🔍 DEBUGGING EXCEL FILE: {file_path}")
-
-        # Read Excel file
-        df = pd.read_excel(file_path, engine='openpyxl')
-        print(f"✅ File read successfully. Shape: {df.shape}")
+        # Resolve the header once and normalize column names to the canonical layout
+        schema = get_workbook_schema(df.columns)
+        for warning in schema.warnings:
+            log.warning(f"⚠️  Header: {warning}")
+        df = df.rename(columns=schema.canonical_names())
 
         # Store debug info (convert to basic Python types)
         DEBUG_INFO['file_shape'] = list(df.shape)
         DEBUG_INFO['columns'] = list(df.columns)
+        DEBUG_INFO['schema_fingerprint'] = schema.fingerprint
+        DEBUG_INFO['schema_warnings'] = schema.warnings
 
         # Convert first few rows to safe format
         first_rows = df.head(3)
@@ -206,365 +107,330 @@ def debug_excel_file(file_path):
                     row_dict[col] = str(value)
             DEBUG_INFO['first_few_rows'].append(row_dict)
 
-        print(f"📋 Available columns ({len(df.columns)}):")
+        log.debug(f"📋 Available columns ({len(df.columns)}):")
         for i, col in enumerate(df.columns, 1):
-            print(f"   {i:2d}. '{col}'")
+            log.debug(f"   {i:2d}. '{col}'")
 
         # Check required columns
-        required_columns = ["Gebiet", "Bereich", "Messstelle", "Zapfstelle", "Parameter", "Proben\nGesamt",
-                            "Aktuell\nGesamt"]
-        missing_columns = [col for col in required_columns if col not in df.columns]
+        required_columns = MAP_REQUIRED_COLUMNS
+        missing_columns = schema.missing_columns(required_columns)
 
         DEBUG_INFO['required_columns'] = required_columns
         DEBUG_INFO['missing_columns'] = missing_columns
 
         if missing_columns:
-            print(f"❌ Missing required columns: {missing_columns}")
+            log.error(f"❌ Missing required columns: {missing_columns}")
             return None, f"Missing required columns: {missing_columns}"
         else:
-            print(f"✅ All required columns found!")
+            log.debug(f"✅ All required columns found!")
 
-        # Check Gebiet column for coordinates
-        print(f"\n🗺️ Analyzing 'Gebiet' column for coordinates:")
+        # Check Gebiet column for coordinates (parsed and validated for all rows at once)
+        log.debug(f"\n🗺️ Analyzing 'Gebiet' column for coordinates:")
+        coords = parse_coordinates(df['Gebiet'])
         gebiet_samples = df['Gebiet'].dropna().head(5)
         DEBUG_INFO['gebiet_samples'] = [str(val) for val in gebiet_samples]
 
-        for i, value in enumerate(gebiet_samples, 1):
-            print(f"   {i}. '{value}' (type: {type(value)})")
-            if ',' in str(value):
-                try:
-                    coords_str = str(value).replace(' ', '').replace('\n', '').replace('\r', '')
-                    lat, lon = map(float, coords_str.split(','))
-                    print(f"      → Parsed as coordinates: {lat}, {lon}")
-                except Exception as e:
-                    print(f"      → Failed to parse as coordinates: {e}")
+        for i, (index, value) in enumerate(gebiet_samples.items(), 1):
+            log.debug(f"   {i}. '{value}' (type: {type(value)})")
+            if coords.at[index, 'reason'] in (COORD_OK, COORD_OUT_OF_RANGE):
+                log.debug(f"      → Parsed as coordinates: {coords.at[index, 'lat']}, {coords.at[index, 'lon']}")
+            elif coords.at[index, 'reason'] == COORD_UNPARSEABLE:
+                log.debug(f"      → Failed to parse as coordinates")
 
         # Check for data after cleaning
-        df_clean = df.dropna(subset=["Gebiet", "Messstelle"])
-        print(f"\n📊 After removing rows with missing Gebiet/Messstelle: {len(df_clean)} rows")
-        DEBUG_INFO['rows_after_cleaning'] = len(df_clean)
-
-        # Try to parse some coordinates
-        valid_coords = 0
-        for _, row in df_clean.head(10).iterrows():
-            try:
-                gebiet = str(row['Gebiet']).replace(' ', '').replace('\n', '').replace('\r', '')
-                if ',' in gebiet:
-                    lat, lon = map(float, gebiet.split(','))
-                    if -90 <= lat <= 90 and -180 <= lon <= 180:
-                        valid_coords += 1
-            except:
-                pass
-
-        print(f"✅ Found {valid_coords} valid coordinates in first 10 rows")
+        clean_mask = df[["Gebiet", "Messstelle"]].notna().all(axis=1).to_numpy()
+        log.info(f"\n📊 After removing rows with missing Gebiet/Messstelle: {int(clean_mask.sum())} rows")
+        DEBUG_INFO['rows_after_cleaning'] = int(clean_mask.sum())
+
+        coordinate_check = coordinate_summary(df['Gebiet'].to_numpy(dtype=object)[clean_mask],
+                                              coords['reason'].to_numpy()[clean_mask])
+        DEBUG_INFO['coordinate_check'] = coordinate_check
+        log.info(format_coordinate_summary(coordinate_check))
+
+        valid_coords = int(coords['valid'].to_numpy()[clean_mask][:10].sum())
+        log.debug(f"✅ Found {valid_coords} valid coordinates in first 10 rows")
         DEBUG_INFO['valid_coordinates_sample'] = valid_coords
 
         return df, None
 
     except Exception as e:
-        error_msg = f"Error reading Excel file: {str(e)}"
-        print(f"❌ {error_msg}")
+        error_msg = f"Error analyzing Excel data: {str(e)}"
+        log.error(f"❌ {error_msg}")
         DEBUG_INFO['error'] = error_msg
         DEBUG_INFO['traceback'] = traceback.format_exc()
         return None, error_msg
 
 
-def parse_excel_data_for_map(file_path):
-    """Parse uploaded Excel file for map functionality - ENHANCED with individual parameter sample tracking"""
-    global DEBUG_INFO, LAST_ERROR
+def build_map_point(i, messstelle, lat, lon, rows, derived):
+    """
+    Build the map point of one (Gebiet, Messstelle) group from the pre-pass arrays; None if the group has to be skipped
 
+    lat/lon come from the coordinate stage, rows are the group's row positions in the cleaned frame
+    and derived is the result of derive_map_columns.
+    """
     try:
-        # First, debug the file
-        df, error = debug_excel_file(file_path)
-        if error:
-            LAST_ERROR = error
-            return None, error
-
-        print(f"\n🔄 PROCESSING DATA FOR MAP WITH INDIVIDUAL PARAMETER PROGRESS...")
+        first = rows[0]
+
+        # Get zapfstelle (Zapfstelle is filled with "Not Specified" before grouping)
+        zapfstelle = derived['zapfstellen_raw'][first]
+
+        # Calculate totals across ALL parameters
+        total_proben = sum(derived['total_raw'][rows][derived['total_present'][rows]].tolist())
+        total_aktuell = sum(derived['current_raw'][rows][derived['current_present'][rows]].tolist())
+
+        # Check if zero sample
+        is_zero_sample = (total_proben == 0 and total_aktuell == 0)
+        if is_zero_sample:
+            log.debug(f"   📍 Group {i + 1}: Zero sample point detected - {messstelle}")
+
+        # Check overall completion (first non-complete row decides, as with all())
+        vollständig = True
+        for state in derived['complete'][rows].tolist():
+            if isinstance(state, Exception):
+                raise state
+            if not state:
+                vollständig = False
+                break
+
+        kunde = safe_str_convert(derived['kunden'][first])
+
+        # ENHANCED: Individual parameter details with separate sample tracking (built in the pre-pass)
+        valid_rows = rows[derived['valid'][rows]]
+        for error in derived['latest_dates'][valid_rows[derived['errors'][valid_rows]]].tolist():
+            raise error
+
+        parameter_details = derived['details'][valid_rows].tolist()
+        all_parameters = derived['parameters'][valid_rows].tolist()
+        all_frequencies = derived['frequencies'][valid_rows].tolist()
+        all_pn_types = derived['pn_types'][valid_rows].tolist()  # Keep original for summary
+        all_categories = derived['categories'][valid_rows].tolist()
+
+        # Handle zero sample case
+        if is_zero_sample and not parameter_details:
+            # Create a minimal parameter_details entry for zero sample points
+            bereich = safe_str_convert(derived['bereiche'][first])
+            parameter_details.append({
+                'parameter': 'No Parameters',
+                'category': bereich,
+                'frequency': 'N/A',
+                'type': 'Unknown',
+                'type_filter': 'Unknown',
+                'zapfstelle': zapfstelle,
+                'current': 0,
+                'total': 0,
+                'completion_rate': 0,
+                'status': 'zero_sample',
+                'is_complete': False,
+                'samples_remaining': 0,
+                'has_samples': False,
+                'progress_text': '0/0'
+            })
 
-        # Clean data
-        df_clean = df.dropna(subset=["Gebiet", "Messstelle"])
-        df_clean = df_clean.copy()
-        df_clean["Zapfstelle"] = df_clean["Zapfstelle"].fillna("Not Specified")
+        # For backward compatibility - create summary strings
+        parameter = ', '.join(list(dict.fromkeys(all_parameters))) if all_parameters else "Unknown"
+        häufigkeit = ', '.join(list(dict.fromkeys(all_frequencies))) if all_frequencies else "Unknown"
+        pn_type = ', '.join(list(dict.fromkeys(all_pn_types))) if all_pn_types else "Unknown"
+        bereich = all_categories[0] if all_categories else "Unknown"  # Use first category for map color
 
-        print(f"📊 Processing {len(df_clean)} rows after cleaning")
+        # Create label
+        messstelle_clean = safe_str_convert(messstelle)
+        zapfstelle_clean = safe_str_convert(zapfstelle)
+        kunde_clean = kunde
 
-        # Group by coordinates and messstelle
-        grouped = df_clean.groupby(["Gebiet", "Messstelle"])
-        processed_data = []
-        skipped_count = 0
-        coordinate_clusters = {}
-        zero_sample_count = 0
+        if zapfstelle_clean and zapfstelle_clean != "Not Specified":
+            label = f"{kunde_clean} - {zapfstelle_clean} - {messstelle_clean}"
+        else:
+            label = f"{kunde_clean} - {messstelle_clean}"
+
+        # Calculate statistics for different parameter types
+        internal_params = [p for p in parameter_details if p['type_filter'] == 'I']
+        external_params = [p for p in parameter_details if p['type_filter'] == 'E']
+
+        # Calculate parameter-level statistics
+        completed_params = [p for p in parameter_details if p['is_complete']]
+        in_progress_params = [p for p in parameter_details if not p['is_complete'] and p['current'] > 0]
+        not_started_params = [p for p in parameter_details if p['current'] == 0]
+
+        # Create item data with enhanced parameter details
+        item_data = {
+            'lat': lat,
+            'lon': lon,
+            'label': label,
+            'messstelle': messstelle_clean,
+            'zapfstelle': zapfstelle_clean,
+            'bereich': bereich,
+            'kunde': kunde,
+            'parameter': parameter,  # Summary for backward compatibility
+            'häufigkeit': häufigkeit,  # Summary for backward compatibility
+            'pn_type': pn_type,  # Summary for backward compatibility
+            'vollständig': vollständig,
+            'total_samples': total_proben,
+            'completed_samples': total_aktuell,
+            'completion_rate': (total_aktuell / total_proben * 100) if total_proben > 0 else 0,
+            'parameter_details': parameter_details,  # ENHANCED: Each parameter with individual samples
+            'details': parameter_details,
+            'is_zero_sample': is_zero_sample,
+            'parameter_count': len(parameter_details),
+            'all_parameters': all_parameters,
+            'all_frequencies': all_frequencies,
+            'all_categories': all_categories,
+            # ENHANCED: Separate arrays for filtering with individual sample data
+            'internal_parameters': internal_params,
+            'external_parameters': external_params,
+            # ENHANCED: Parameter status statistics
+            'completed_parameter_count': len(completed_params),
+            'in_progress_parameter_count': len(in_progress_params),
+            'not_started_parameter_count': len(not_started_params),
+            'parameter_completion_percentage': len(completed_params) / len(
+                parameter_details) * 100 if parameter_details else 0,
+        }
+        if derived['sources'] is not None:
+            # Merged multi-sheet/multi-workbook upload: file (and sheet) this Messstelle comes from
+            item_data['sources'] = sorted({str(source) for source in derived['sources'][rows].tolist()})
+
+        if i < 3 and log.isEnabledFor(logging.DEBUG):  # Show details for first 3 groups
+            zero_indicator = " (ZERO SAMPLE)" if is_zero_sample else ""
+            param_count_info = f" ({len(parameter_details)} parameters)"
+            internal_count = len(internal_params)
+            external_count = len(external_params)
+            completed_count = len(completed_params)
+            pn_info = f" [I:{internal_count}, E:{external_count}, Complete:{completed_count}]"
+            log.debug(
+                f"   ✅ Group {i + 1}: {messstelle} at {lat}, {lon}{param_count_info}{pn_info}{zero_indicator}")
+
+            # Show individual parameters with their progress
+            for j, param_detail in enumerate(parameter_details[:3]):
+                type_info = f"[{param_detail['type_filter']}]"
+                progress_info = f"{param_detail['current']}/{param_detail['total']} ({param_detail['completion_rate']:.0f}%)"
+                status_icon = "✅" if param_detail['is_complete'] else "🔄" if param_detail[
+                                                                                 'current'] > 0 else "❌"
+                log.debug(
+                    f"      - {status_icon} {param_detail['parameter']} {type_info} | {progress_info} | {param_detail['frequency']}")
+
+        return item_data
 
-        print(f"🔍 Processing {len(grouped)} groups...")
+    except Exception as e:
+        log.warning(f"   ❌ Group {i + 1}: Error - {str(e)}")
+        return None
 
-        for i, ((gebiet, messstelle), group) in enumerate(grouped):
-            try:
-                # Parse coordinates
-                koordinaten_str = str(gebiet).replace(' ', '').replace('\n', '').replace('\r', '')
 
-                if ',' not in koordinaten_str:
-                    print(f"   ⚠️  Group {i + 1}: No comma in coordinates '{koordinaten_str}'")
-                    skipped_count += 1
-                    continue
+def parse_excel_data_for_map(source, changed_groups=None, timer=None):
+    """
+    Parse an Excel file path or ingested DataFrame for map functionality - ENHANCED with individual parameter sample tracking
 
-                try:
-                    lat, lon = map(float, koordinaten_str.split(','))
-                except ValueError:
-                    print(f"   ⚠️  Group {i + 1}: Cannot parse coordinates '{koordinaten_str}'")
-                    skipped_count += 1
-                    continue
+    With changed_groups (a set of (Gebiet, Messstelle) keys) only those groups are rebuilt; all other
+    points are reused from MAP_STATE, which holds the points of the previously parsed frame.
+    Stage timings are recorded on timer (a StageTimer).
+    """
+    global DEBUG_INFO, LAST_ERROR, MAP_STATE
+    timer = timer or StageTimer()
 
-                # Validate coordinates
-                if not (-90 <= lat <= 90 and -180 <= lon <= 180):
-                    print(f"   ⚠️  Group {i + 1}: Invalid coordinates {lat}, {lon}")
-                    skipped_count += 1
-                    continue
+    try:
+        # First, debug the file (or the frame loaded from the shared ingest artifact)
+        with timer.stage('analyze'):
+            if isinstance(source, pd.DataFrame):
+                df, error = debug_dataframe(source)
+            else:
+                df, error = debug_excel_file(source)
+        if error:
+            LAST_ERROR = error
+            return None, error
 
-                coord_key = f"{lat},{lon}"
-
-                # Get zapfstelle
-                zapfstelle = group["Zapfstelle"].iloc[0] if not group["Zapfstelle"].isna().all() else "Not Specified"
-
-                # Calculate totals across ALL parameters
-                total_proben = sum(row.get("Proben\nGesamt", 0) for _, row in group.iterrows() if
-                                   pd.notna(row.get("Proben\nGesamt", 0)))
-                total_aktuell = sum(row.get("Aktuell\nGesamt", 0) for _, row in group.iterrows() if
-                                    pd.notna(row.get("Aktuell\nGesamt", 0)))
-
-                # Check if zero sample
-                is_zero_sample = (total_proben == 0 and total_aktuell == 0)
-                if is_zero_sample:
-                    zero_sample_count += 1
-                    print(f"   📍 Group {i + 1}: Zero sample point detected - {messstelle}")
-
-                # Check overall completion
-                vollständig = all(
-                    row.get("Aktuell\nGesamt", 0) >= row.get("Proben\nGesamt", 0)
-                    for _, row in group.iterrows()
-                )
-
-                # Safe string conversion
-                def safe_str_convert(value, default="Unknown"):
-                    if pd.isna(value) or value is None:
-                        return default
-                    return str(value).strip()
-
-                kunde = safe_str_convert(group["Kunde"].iloc[0] if "Kunde" in group.columns else None)
-
-                # ENHANCED: Create individual parameter details with separate sample tracking
-                parameter_details = []
-                all_parameters = []
-                all_frequencies = []
-                all_pn_types = []
-                all_categories = []
-
-                for _, row in group.iterrows():
-                    # Get individual parameter data
-                    param = safe_str_convert(row.get('Parameter', ''))
-                    category = safe_str_convert(row.get('Bereich', ''))
-                    frequency = safe_str_convert(row.get('Häufigkeit', ''))
-                    pn_type_raw = safe_str_convert(row.get('PN (I/E)', ''))
-                    zapfstelle_row = safe_str_convert(row.get('Zapfstelle', ''))
-
-                    # ENHANCED: Get individual parameter sample counts
-                    individual_aktuell = row.get('Aktuell\nGesamt', 0) if pd.notna(row.get('Aktuell\nGesamt', 0)) else 0
-                    individual_proben = row.get('Proben\nGesamt', 0) if pd.notna(row.get('Proben\nGesamt', 0)) else 0
-
-                    # Convert to integers safely
-                    try:
-                        individual_aktuell = int(individual_aktuell)
-                    except (ValueError, TypeError):
-                        individual_aktuell = 0
-
-                    try:
-                        individual_proben = int(individual_proben)
-                    except (ValueError, TypeError):
-                        individual_proben = 0
-
-                    if param != "Unknown" and param.strip():
-                        # FIXED: Map PN type to proper format for filtering
-                        if pn_type_raw == 'I':
-                            type_display = 'Internal'
-                            type_filter = 'I'
-                        elif pn_type_raw == 'E':
-                            type_display = 'External'
-                            type_filter = 'E'
-                        else:
-                            type_display = pn_type_raw
-                            type_filter = pn_type_raw
-
-                        # Calculate individual parameter completion rate
-                        individual_completion_rate = (
-                                    individual_aktuell / individual_proben * 100) if individual_proben > 0 else 0
-
-                        # Determine parameter status
-                        param_status = 'complete' if individual_completion_rate >= 100 else 'incomplete' if individual_completion_rate > 0 else 'not_started'
-
-                        print(f"\n=== DEBUG: Processing parameter {param} ===")
-                        print(f"Row columns containing 'Datum': {[col for col in row.index if 'atum' in str(col)]}")
-                        for col in row.index:
-                            if 'atum' in str(col).lower():
-                                print(f"  {col}: {row[col]} (type: {type(row[col])})")
-
-                        # Get the latest date
-                        latest_date = extract_latest_date(row)
-                        print(f"Extracted latest date: {latest_date}")
-
-                        # Each parameter gets its own separate entry with individual sample tracking
-                        parameter_detail = {
-                            'parameter': param,
-                            'category': category,
-                            'frequency': frequency,
-                            'type': type_display,  # For display in popup: 'Internal' or 'External'
-                            'type_filter': type_filter,  # For filtering: 'I' or 'E'
-                            'zapfstelle': zapfstelle_row,
-                            'current': individual_aktuell,  # Individual parameter current samples
-                            'total': individual_proben,  # Individual parameter total samples
-                            'completion_rate': individual_completion_rate,
-                            'status': param_status,
-                            # Additional metadata
-                            'is_complete': individual_completion_rate >= 100,
-                            'samples_remaining': max(0, individual_proben - individual_aktuell),
-                            'has_samples': individual_proben > 0,
-                            'progress_text': f"{individual_aktuell}/{individual_proben}",
-                            'latest_date': extract_latest_date(row)
-                        }
-
-                        parameter_details.append(parameter_detail)
-
-                        # Collect for summary (backward compatibility)
-                        all_parameters.append(param)
-                        all_frequencies.append(frequency)
-                        all_pn_types.append(pn_type_raw)  # Keep original for summary
-                        all_categories.append(category)
-
-                # Handle zero sample case
-                if is_zero_sample and not parameter_details:
-                    # Create a minimal parameter_details entry for zero sample points
-                    bereich = safe_str_convert(group["Bereich"].iloc[0] if "Bereich" in group.columns else "Unknown")
-                    parameter_details.append({
-                        'parameter': 'No Parameters',
-                        'category': bereich,
-                        'frequency': 'N/A',
-                        'type': 'Unknown',
-                        'type_filter': 'Unknown',
-                        'zapfstelle': zapfstelle,
-                        'current': 0,
-                        'total': 0,
-                        'completion_rate': 0,
-                        'status': 'zero_sample',
-                        'is_complete': False,
-                        'samples_remaining': 0,
-                        'has_samples': False,
-                        'progress_text': '0/0'
-                    })
+        log.info(f"\n🔄 PROCESSING DATA FOR MAP WITH INDIVIDUAL PARAMETER PROGRESS...")
+        with timer.stage('clean'):
+            schema = get_workbook_schema(df.columns)
+            prime_dates(df, schema)
 
-                # For backward compatibility - create summary strings
-                parameter = ', '.join(list(dict.fromkeys(all_parameters))) if all_parameters else "Unknown"
-                häufigkeit = ', '.join(list(dict.fromkeys(all_frequencies))) if all_frequencies else "Unknown"
-                pn_type = ', '.join(list(dict.fromkeys(all_pn_types))) if all_pn_types else "Unknown"
-                bereich = all_categories[0] if all_categories else "Unknown"  # Use first category for map color
+            # Clean data
+            df_clean = df.dropna(subset=["Gebiet", "Messstelle"])
+            df_clean = df_clean.copy()
+            df_clean["Zapfstelle"] = df_clean["Zapfstelle"].fillna("Not Specified")
 
-                # Create label
-                messstelle_clean = safe_str_convert(messstelle)
-                zapfstelle_clean = safe_str_convert(zapfstelle)
-                kunde_clean = kunde
+        log.info(f"📊 Processing {len(df_clean)} rows after cleaning")
 
-                if zapfstelle_clean and zapfstelle_clean != "Not Specified":
-                    label = f"{kunde_clean} - {zapfstelle_clean} - {messstelle_clean}"
-                else:
-                    label = f"{kunde_clean} - {messstelle_clean}"
-
-                # Calculate statistics for different parameter types
-                internal_params = [p for p in parameter_details if p['type_filter'] == 'I']
-                external_params = [p for p in parameter_details if p['type_filter'] == 'E']
-
-                # Calculate parameter-level statistics
-                completed_params = [p for p in parameter_details if p['is_complete']]
-                in_progress_params = [p for p in parameter_details if not p['is_complete'] and p['current'] > 0]
-                not_started_params = [p for p in parameter_details if p['current'] == 0]
-
-                # Create item data with enhanced parameter details
-                item_data = {
-                    'lat': lat,
-                    'lon': lon,
-                    'label': label,
-                    'messstelle': messstelle_clean,
-                    'zapfstelle': zapfstelle_clean,
-                    'bereich': bereich,
-                    'kunde': kunde,
-                    'parameter': parameter,  # Summary for backward compatibility
-                    'häufigkeit': häufigkeit,  # Summary for backward compatibility
-                    'pn_type': pn_type,  # Summary for backward compatibility
-                    'vollständig': vollständig,
-                    'total_samples': total_proben,
-                    'completed_samples': total_aktuell,
-                    'completion_rate': (total_aktuell / total_proben * 100) if total_proben > 0 else 0,
-                    'parameter_details': parameter_details,  # ENHANCED: Each parameter with individual samples
-                    'details': parameter_details,
-                    'is_zero_sample': is_zero_sample,
-                    'parameter_count': len(parameter_details),
-                    'all_parameters': all_parameters,
-                    'all_frequencies': all_frequencies,
-                    'all_categories': all_categories,
-                    # ENHANCED: Separate arrays for filtering with individual sample data
-                    'internal_parameters': internal_params,
-                    'external_parameters': external_params,
-                    # ENHANCED: Parameter status statistics
-                    'completed_parameter_count': len(completed_params),
-                    'in_progress_parameter_count': len(in_progress_params),
-                    'not_started_parameter_count': len(not_started_params),
-                    'parameter_completion_percentage': len(completed_params) / len(
-                        parameter_details) * 100 if parameter_details else 0,
-                }
+        # Group by coordinates and messstelle
+        with timer.stage('group'):
+            grouped = df_clean.groupby(["Gebiet", "Messstelle"])
+            group_indices = grouped.indices
+            reusable = {}
+            if changed_groups is not None:
+                reusable = {key: point for key, point in MAP_STATE['points'].items() if key not in changed_groups}
+
+            # Coordinates of every row parsed and range-checked in one go
+            coords = parse_coordinates(df_clean["Gebiet"])
+            lats, lons, reasons = coords['lat'].to_numpy(), coords['lon'].to_numpy(), coords['reason'].to_numpy()
+
+        log.info(f"🔍 Processing {len(group_indices)} groups...")
+
+        # Points are built (or reused) unclustered, keyed by (Gebiet, Messstelle)
+        assemble_start = time.perf_counter()
+        points = {}
+        rebuilt_count = 0
+        derived = None
+        skipped_groups = []
+        for i, ((gebiet, messstelle), positions) in enumerate(group_indices.items()):
+            key = (gebiet, messstelle)
+            first = positions[0]
+            if reasons[first] != COORD_OK:
+                points[key] = None
+                skipped_groups.append(first)
+                continue
+            if key in reusable:
+                points[key] = reusable[key]
+                continue
+            if derived is None:
+                # Per-row values (dates, counts, status, type) for the whole frame, computed once
+                with timer.stage('prepass'):
+                    derived = derive_map_columns(df_clean.reset_index(drop=True), schema)
+            points[key] = build_map_point(i, messstelle, float(lats[first]), float(lons[first]), positions, derived)
+            rebuilt_count += 1
+        timer.record('assemble', time.perf_counter() - assemble_start - timer.stages.get('prepass', 0.0))
+
+        # Groups with unusable coordinates are reported in bulk
+        invalid_coordinates = coordinate_summary(df_clean["Gebiet"].to_numpy(dtype=object)[skipped_groups],
+                                                 reasons[skipped_groups])
+        DEBUG_INFO['invalid_coordinate_groups'] = invalid_coordinates['invalid']
+        if invalid_coordinates['invalid']:
+            log.warning(format_coordinate_summary(invalid_coordinates, unit="groups"))
+
+        MAP_STATE = {'frame': source if isinstance(source, pd.DataFrame) else None, 'points': points}
+        if changed_groups is not None:
+            log.info(f"♻️ Rebuilt {rebuilt_count} changed groups, reused {len(points) - rebuilt_count}")
+
+        with timer.stage('cluster'):
+            # Clustering offsets are applied to copies so the stored points stay reusable
+            processed_data = []
+            skipped_count = 0
+            coordinate_clusters = {}
+            for point in points.values():
+                if point is None:
+                    skipped_count += 1
+                    continue
 
-                # Handle coordinate clustering
+                item_data = dict(point)
+                coord_key = f"{item_data['lat']},{item_data['lon']}"
                 if coord_key not in coordinate_clusters:
                     coordinate_clusters[coord_key] = []
                 coordinate_clusters[coord_key].append(item_data)
-
                 processed_data.append(item_data)
 
-                if i < 3:  # Show details for first 3 groups
-                    zero_indicator = " (ZERO SAMPLE)" if is_zero_sample else ""
-                    param_count_info = f" ({len(parameter_details)} parameters)"
-                    internal_count = len(internal_params)
-                    external_count = len(external_params)
-                    completed_count = len(completed_params)
-                    pn_info = f" [I:{internal_count}, E:{external_count}, Complete:{completed_count}]"
-                    print(
-                        f"   ✅ Group {i + 1}: {messstelle} at {lat}, {lon}{param_count_info}{pn_info}{zero_indicator}")
-
-                    # Show individual parameters with their progress
-                    for j, param_detail in enumerate(parameter_details[:3]):
-                        type_info = f"[{param_detail['type_filter']}]"
-                        progress_info = f"{param_detail['current']}/{param_detail['total']} ({param_detail['completion_rate']:.0f}%)"
-                        status_icon = "✅" if param_detail['is_complete'] else "🔄" if param_detail[
-                                                                                         'current'] > 0 else "❌"
-                        print(
-                            f"      - {status_icon} {param_detail['parameter']} {type_info} | {progress_info} | {param_detail['frequency']}")
-
-            except Exception as e:
-                print(f"   ❌ Group {i + 1}: Error - {str(e)}")
-                skipped_count += 1
-                continue
-
-        # Mark clustered items
-        for coord_key, items in coordinate_clusters.items():
-            if len(items) > 1:
-                for i, item in enumerate(items):
-                    item['is_clustered'] = True
-                    item['cluster_size'] = len(items)
-                    item['cluster_index'] = i
-                    # Slightly offset coordinates to make markers visible
-                    offset = 0.0001 * i
-                    item['lat'] += offset
-                    item['lon'] += offset
-            else:
-                items[0]['is_clustered'] = False
-                items[0]['cluster_size'] = 1
-                items[0]['cluster_index'] = 0
+            zero_sample_count = sum(1 for item in processed_data if item['is_zero_sample'])
+
+            # Mark clustered items
+            for coord_key, items in coordinate_clusters.items():
+                if len(items) > 1:
+                    for i, item in enumerate(items):
+                        item['is_clustered'] = True
+                        item['cluster_size'] = len(items)
+                        item['cluster_index'] = i
+                        # Slightly offset coordinates to make markers visible
+                        offset = 0.0001 * i
+                        item['lat'] += offset
+                        item['lon'] += offset
+                else:
+                    items[0]['is_clustered'] = False
+                    items[0]['cluster_size'] = 1
+                    items[0]['cluster_index'] = 0
 
         # Calculate enhanced statistics
         total_internal_params = sum(len(item['internal_parameters']) for item in processed_data)
@@ -574,16 +440,16 @@ def parse_excel_data_for_map(file_path):
         total_not_started_params = sum(item['not_started_parameter_count'] for item in processed_data)
         total_parameters = sum(item['parameter_count'] for item in processed_data)
 
-        print(f"\n📊 ENHANCED PROCESSING COMPLETE:")
-        print(f"   ✅ Successfully processed: {len(processed_data)} points")
-        print(f"   📍 Zero sample points: {zero_sample_count}")
-        print(f"   🏢 Internal parameters: {total_internal_params}")
-        print(f"   🌐 External parameters: {total_external_params}")
-        print(f"   ✅ Completed parameters: {total_completed_params}")
-        print(f"   🔄 In-progress parameters: {total_in_progress_params}")
-        print(f"   ❌ Not started parameters: {total_not_started_params}")
-        print(f"   📊 Total parameters: {total_parameters}")
-        print(f"   ⚠️  Skipped: {skipped_count} groups")
+        log.info(f"\n📊 ENHANCED PROCESSING COMPLETE:")
+        log.info(f"   ✅ Successfully processed: {len(processed_data)} points")
+        log.info(f"   📍 Zero sample points: {zero_sample_count}")
+        log.info(f"   🏢 Internal parameters: {total_internal_params}")
+        log.info(f"   🌐 External parameters: {total_external_params}")
+        log.info(f"   ✅ Completed parameters: {total_completed_params}")
+        log.info(f"   🔄 In-progress parameters: {total_in_progress_params}")
+        log.info(f"   ❌ Not started parameters: {total_not_started_params}")
+        log.info(f"   📊 Total parameters: {total_parameters}")
+        log.info(f"   ⚠️  Skipped: {skipped_count} groups")
 
         DEBUG_INFO['processed_points'] = len(processed_data)
         DEBUG_INFO['zero_sample_points'] = zero_sample_count
@@ -594,6 +460,7 @@ def parse_excel_data_for_map(file_path):
         DEBUG_INFO['not_started_parameters'] = total_not_started_params
         DEBUG_INFO['total_parameters'] = total_parameters
         DEBUG_INFO['skipped_points'] = skipped_count
+        DEBUG_INFO['map_groups_rebuilt'] = rebuilt_count
 
         if len(processed_data) == 0:
             error_msg = f"No valid map points found. Skipped {skipped_count} groups due to invalid coordinates."
@@ -608,11 +475,112 @@ def parse_excel_data_for_map(file_path):
         LAST_ERROR = error_msg
         DEBUG_INFO['processing_error'] = error_msg
         DEBUG_INFO['processing_traceback'] = traceback.format_exc()
-        print(f"❌ PROCESSING ERROR: {error_msg}")
-        print(f"📋 Full traceback:\n{traceback.format_exc()}")
+        log.error(f"❌ PROCESSING ERROR: {error_msg}")
+        log.error(f"📋 Full traceback:\n{traceback.format_exc()}")
         return None, error_msg
 
 
+def build_map_data(df, digest=None, timer=None):
+    """
+    parse_excel_data_for_map memoized by workbook hash; restores the matching DEBUG_INFO on a hit.
+
+    On a miss the frame is diffed against the last parsed one and only changed groups are rebuilt.
+    Stage timings end up in DEBUG_INFO['timings'].
+    """
+    global DEBUG_INFO
+    timer = timer or StageTimer()
+
+    cached = UPLOAD_CACHE.get('map', digest) if digest else None
+    if cached is not None:
+        log.info(f"⚡ Map data for sha256 {digest[:12]} served from upload cache")
+        map_data, debug_snapshot = cached
+        DEBUG_INFO = dict(debug_snapshot, changes={'mode': 'cached'}, timings=timer.as_dict())
+        log.info(timer.summary())
+        return map_data, None
+
+    # Only rebuild the (Gebiet, Messstelle) groups touched by rows that changed since the last frame
+    start = time.perf_counter()
+    diff = diff_frames(MAP_STATE['frame'], df)
+    schema = get_workbook_schema(df.columns)
+    changed_groups = None
+    if diff is not None and diff.is_incremental() and schema.area_column:
+        changed_groups = diff.affected([schema.area_column, "Messstelle"])
+
+    map_data, error = parse_excel_data_for_map(df, changed_groups, timer)
+    DEBUG_INFO['changes'] = dict(diff.summary() if diff is not None else {},
+                                 mode='incremental' if changed_groups is not None else 'full',
+                                 map_groups_rebuilt=DEBUG_INFO.get('map_groups_rebuilt'),
+                                 map_groups_total=len(MAP_STATE['points']),
+                                 seconds=round(time.perf_counter() - start, 4))
+    DEBUG_INFO['timings'] = timer.as_dict()
+    log.info(timer.summary())
+    if digest and not error:
+        UPLOAD_CACHE.put('map', digest, (map_data, dict(DEBUG_INFO)))
+    return map_data, error
+
+
+def finish_map_upload(job, version, df, digest):
+    """Build the map view of a published upload and swap it in (runs in the ingest job thread)"""
+    global MAP_DATA, MAP_DATA_VERSION
+
+    with DATASET_LOCK:
+        # Process the file with enhanced zero sample detection
+        map_data, error = build_map_data(df, digest, job.timer)
+        if error:
+            raise ValueError(error)
+        job.raise_if_cancelled()
+        MAP_DATA, MAP_DATA_VERSION = map_data, version
+        DEBUG_INFO['reader'] = (read_manifest() or {}).get('reader')
+
+    # Enhanced success response with zero sample info
+    zero_sample_count = DEBUG_INFO.get('zero_sample_points', 0)
+    success_message = f'Successfully loaded {len(map_data)} map points'
+    if zero_sample_count > 0:
+        success_message += f' (including {zero_sample_count} zero sample points)'
+
+    return clean_for_json({
+        'message': success_message,
+        'changes': DEBUG_INFO.get('changes'),
+        'debug_info': {
+            'points_loaded': len(map_data),
+            'zero_sample_points': zero_sample_count,
+            'processing_details': dict(DEBUG_INFO)
+        },
+        'redirect': '/'
+    })
+
+
+def sync_map_data():
+    """Reload MAP_DATA when a newer shared data version was ingested (e.g. by the dashboard)"""
+    global MAP_DATA, MAP_DATA_VERSION
+
+    version = current_version()
+    if version == 0 or version == MAP_DATA_VERSION:
+        return
+
+    # An ingest job is swapping in a dataset right now
+    if not DATASET_LOCK.acquire(blocking=False):
+        return
+    try:
+        log.info(f"🔄 New shared data version {version} found (map has {MAP_DATA_VERSION})")
+        loaded_version, df = load_frame()
+        MAP_DATA, error = build_map_data(df, current_digest())
+        MAP_DATA_VERSION = loaded_version
+        if error:
+            log.error(f"❌ Could not build map view for version {loaded_version}: {error}")
+    finally:
+        DATASET_LOCK.release()
+
+
+@app.route('/jobs/<job_id>')
+def job_status(job_id):
+    """Stage and percent done of a background upload"""
+    job = INGEST_JOBS.get(job_id)
+    if job is None:
+        return flask.jsonify({'error': f'Unknown job {job_id}'}), 404
+    return flask.jsonify(clean_for_json(job.as_dict()))
+
+
 # Enhanced debug endpoint with individual parameter statistics
 @app.route('/debug')
 def debug_info():
@@ -620,8 +588,15 @@ def debug_info():
     global MAP_DATA, DEBUG_INFO, LAST_ERROR
 
     try:
+        sync_map_data()
+
         # Enhanced debug data with individual parameter analysis
         debug_data = {
+            'data_version': MAP_DATA_VERSION,
+            'upload_cache': UPLOAD_CACHE.stats(),
+            'date_engine': date_engine_stats(),
+            'timings': DEBUG_INFO.get('timings'),
+            'ingest_jobs': INGEST_JOBS.jobs()[:5],
             'map_data_count': len(MAP_DATA) if MAP_DATA else 0,
             'debug_info': clean_for_json(DEBUG_INFO),
             'last_error': LAST_ERROR,
@@ -700,6 +675,8 @@ def map_view():
     """Main map page with file upload and enhanced debug info"""
     global MAP_DATA, DEBUG_INFO, LAST_ERROR
 
+    sync_map_data()
+
     # FIXED: Prepare data for JavaScript with proper parameter_details structure
     if MAP_DATA:
         markers_data = []
@@ -772,7 +749,7 @@ def map_view():
                                      timestamp=datetime.now().strftime("%Y-%m-%d %H:%M:%S"))
     except Exception as e:
         # Fallback to inline template if file doesn't exist
-        print(f"Template file not found, using enhanced inline template: {e}")
+        log.warning(f"⚠️ Template file not found, using enhanced inline template: {e}")
         return f"""
         <!DOCTYPE html>
         <html>
@@ -792,67 +769,35 @@ def map_view():
 
 @app.route('/upload', methods=['POST'])
 def upload_file():
-    """Handle file upload with enhanced debugging and zero sample detection"""
-    global MAP_DATA, LAST_ERROR
-
+    """Accept an Excel upload and process it as a background ingest job (poll /jobs/<id>)"""
     try:
-        print(f"\n🔄 ENHANCED UPLOAD REQUEST RECEIVED")
+        log.info(f"\n🔄 ENHANCED UPLOAD REQUEST RECEIVED")
 
-        if 'file' not in flask.request.files:
+        # One or several workbooks; sheets=all reads every sheet instead of the first one
+        files = [file for file in flask.request.files.getlist('file') if file.filename]
+        if not files:
             return flask.jsonify({'success': False, 'error': 'No file provided'}), 400
 
-        file = flask.request.files['file']
-        if file.filename == '':
-            return flask.jsonify({'success': False, 'error': 'No file selected'}), 400
-
-        print(f"📁 File: {file.filename}")
-
-        if file and file.filename.lower().endswith(('.xlsx', '.xls')):
-            # Save file temporarily
-            temp_path = f"temp_{file.filename}"
-            file.save(temp_path)
-            print(f"💾 File saved to: {temp_path}")
-
-            # Process the file with enhanced zero sample detection
-            MAP_DATA, error = parse_excel_data_for_map(temp_path)
-
-            # Clean up temp file
-            try:
-                os.remove(temp_path)
-                print(f"🗑️  Temp file removed")
-            except:
-                pass
-
-            if error:
-                return flask.jsonify({
-                    'success': False,
-                    'error': error,
-                    'debug_info': DEBUG_INFO
-                }), 400
-
-            # Enhanced success response with zero sample info
-            zero_sample_count = DEBUG_INFO.get('zero_sample_points', 0)
-            success_message = f'Successfully loaded {len(MAP_DATA)} map points'
-            if zero_sample_count > 0:
-                success_message += f' (including {zero_sample_count} zero sample points)'
+        names = [file.filename for file in files]
+        log.info(f"📁 File: {', '.join(names)}")
 
+        if all(name.lower().endswith(('.xlsx', '.xls')) for name in names):
+            # The job parses from this request's own upload buffers and closes them when done
+            job = INGEST_JOBS.submit_uploads(files, finish_map_upload,
+                                             all_sheets=flask.request.form.get('sheets') == 'all')
             return flask.jsonify({
                 'success': True,
-                'message': success_message,
-                'debug_info': {
-                    'points_loaded': len(MAP_DATA),
-                    'zero_sample_points': zero_sample_count,
-                    'processing_details': DEBUG_INFO
-                },
-                'redirect': '/'
-            })
+                'message': f"Processing '{job.source_name}'...",
+                'job_id': job.id,
+                'status_url': f'/jobs/{job.id}'
+            }), 202
         else:
             return flask.jsonify({'success': False, 'error': 'Please upload an Excel file (.xlsx or .xls)'}), 400
 
     except Exception as e:
         error_msg = f"Enhanced upload error: {str(e)}"
-        print(f"❌ {error_msg}")
-        print(f"📋 Traceback:\n{traceback.format_exc()}")
+        log.error(f"❌ {error_msg}")
+        log.error(f"📋 Traceback:\n{traceback.format_exc()}")
         return flask.jsonify({
             'success': False,
             'error': error_msg,
@@ -2,6 +2,12 @@ import pandas as pd
 import base64
 import io
 from dash import html, dcc
+from utils.coordinates import COORD_OK, COORD_OUT_OF_RANGE, parse_coordinates
+from utils.excel_reader import read_workbook
+from utils.ingest_log import get_logger
+from utils.workbook_schema import MAP_REQUIRED_COLUMNS, get_workbook_schema
+
+log = get_logger("map_module")
 
 try:
     import dash_leaflet as dl
@@ -9,7 +15,7 @@ try:
     LEAFLET_AVAILABLE = True
 except ImportError:
     LEAFLET_AVAILABLE = False
-    print("Warning: dash_leaflet not available. Install with: pip install dash-leaflet")
+    log.warning("⚠️ dash_leaflet not available. Install with: pip install dash-leaflet")
 
 # Category colors for map
 CATEGORY_COLORS = {
@@ -30,16 +36,18 @@ def parse_excel_data_for_map(contents):
     try:
         content_type, content_string = contents.split(',')
         decoded = base64.b64decode(content_string)
-        df = pd.read_excel(io.BytesIO(decoded), engine='openpyxl')
+        df, reader_info = read_workbook(io.BytesIO(decoded))
+
+        # Resolve the header once and normalize column names to the canonical layout
+        schema = get_workbook_schema(df.columns)
+        df = df.rename(columns=schema.canonical_names())
 
         # Check if this file has geographical data
         if "Gebiet" not in df.columns:
             return None, "No geographical data found"
 
         # Check required columns for map
-        required_columns = ["Gebiet", "Bereich", "Messstelle", "Zapfstelle", "Parameter", "Proben\nGesamt",
-                            "Aktuell\nGesamt"]
-        missing_columns = [col for col in required_columns if col not in df.columns]
+        missing_columns = schema.missing_columns(MAP_REQUIRED_COLUMNS)
 
         if missing_columns:
             return None, f"Missing columns for map: {missing_columns}"
@@ -57,16 +65,17 @@ def parse_excel_data_for_map(contents):
 
         processed_data = []
         coordinate_clusters = {}  # Track items at same coordinates
+        coords = parse_coordinates(df_clean["Gebiet"])
 
         for (gebiet, messstelle), group in grouped:
             # Get zapfstelle from the first row, or use default
             zapfstelle = group["Zapfstelle"].iloc[0] if not group["Zapfstelle"].isna().all() else "Not Specified"
             try:
-                # Parse coordinates
-                koordinaten_str = str(gebiet).replace(' ', '').replace('\n', '').replace('\r', '')
-                if ',' not in koordinaten_str:
+                # Coordinates from the coordinate stage (this view does not apply the range check)
+                first = group.index[0]
+                if coords.at[first, 'reason'] not in (COORD_OK, COORD_OUT_OF_RANGE):
                     continue
-                lat, lon = map(float, koordinaten_str.split(','))
+                lat, lon = float(coords.at[first, 'lat']), float(coords.at[first, 'lon'])
                 coord_key = f"{lat},{lon}"
 
                 # Check completion - now checking ALL parameters for this location
@@ -519,7 +528,7 @@ def create_map(data, show_complete=True, show_incomplete=True, selected_categori
         )
         markers.append(marker)
 
-    print(
+    log.debug(
         f"📍 Created {len(markers)} markers at zoom level {zoom_level} (labels {'shown' if show_labels else 'hidden'})")
 
     # Choose map tiles
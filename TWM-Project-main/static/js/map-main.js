@@ -82,22 +82,23 @@ function initializeFileUpload() {
     const fileInput = document.getElementById('excel-file');
     if (fileInput) {
         fileInput.addEventListener('change', function(e) {
-            const file = e.target.files[0];
-            if (file) {
-                uploadFile(file);
+            if (e.target.files.length) {
+                uploadFile(e.target.files);
             }
         });
     }
 }
 
-function uploadFile(file) {
+function uploadFile(files) {
     const formData = new FormData();
-    formData.append('file', file);
+    for (const file of files) {
+        formData.append('file', file);
+    }
 
     const statusDiv = document.getElementById('upload-status');
     statusDiv.innerHTML = '<span class="loading"></span>Uploading and processing...';
 
-    console.log('📤 Uploading file:', file.name);
+    console.log('📤 Uploading file(s):', Array.from(files, file => file.name));
 
     fetch('/upload', {
         method: 'POST',
@@ -107,7 +108,10 @@ function uploadFile(file) {
     .then(data => {
         console.log('📥 Upload response:', data);
 
-        if (data.success) {
+        if (data.success && data.job_id) {
+            statusDiv.innerHTML = '<span class="loading"></span>' + data.message;
+            pollIngestJob(data.status_url, statusDiv);
+        } else if (data.success) {
             statusDiv.innerHTML = '<span class="upload-success">✅ ' + data.message + '</span>';
             if (data.debug_info) {
                 console.log('🔍 Debug info:', data.debug_info);
@@ -129,6 +133,32 @@ function uploadFile(file) {
     });
 }
 
+/**
+ * Poll a background ingest job until it is done, then reload to show the new data
+ */
+function pollIngestJob(statusUrl, statusDiv) {
+    fetch(statusUrl)
+    .then(response => response.json())
+    .then(job => {
+        if (job.status === 'done') {
+            statusDiv.innerHTML = '<span class="upload-success">✅ ' + job.result.message + '</span>';
+            console.log('🔍 Debug info:', job.result.debug_info, job.timings);
+            setTimeout(() => {
+                window.location.reload();
+            }, 1000);
+        } else if (job.status === 'failed' || job.status === 'cancelled') {
+            statusDiv.innerHTML = '<span class="upload-error">❌ ' + job.error + '</span>';
+        } else {
+            statusDiv.innerHTML = '<span class="loading"></span>Processing (' + job.stage + ', ' + job.percent + '%)...';
+            setTimeout(() => pollIngestJob(statusUrl, statusDiv), 1000);
+        }
+    })
+    .catch(error => {
+        statusDiv.innerHTML = '<span class="upload-error">❌ Lost track of the upload</span>';
+        console.error('❌ Job status error:', error);
+    });
+}
+
 /**
  * Toggle satellite view
  */
@@ -0,0 +1,84 @@
+# tests/conftest.py
+
+import datetime
+import os
+import random
+import sys
+import tempfile
+
+import pandas as pd
+import pytest
+
+# Project modules are imported as in the apps (from utils... / config...)
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+os.environ.setdefault("TWM_DATA_DIR", tempfile.mkdtemp(prefix="twm-tests-"))
+
+MONTHS = ["Jan", "Feb", "Mrz", "Apr", "Mai", "Jun", "Jul", "Aug", "Sep", "Okt", "Nov", "Dez"]
+PARAMETERS = ["Grundwasser (SMP 1)", "Grundwasser Pegel (SMP 2)", "Trubung", "Parametergruppe A TWN",
+              "LHKW + BTEX", "Bakteriologie/Temp. (TrinkwV)", "Klarwasser emin.", " ", None]
+FREQUENCIES = ["monatlich", "Quartalsmäßig", "Halbjährlich", "Jährlich", "Unregelmäßig", " ", None]
+KW_VALUES = [None, None, 0, 1, 2, "m", " ", "KW 3;7", "T5 T19", "T5;T9", "KW 12"]
+IST_VALUES = [None, None, 0, 1, 2, "1", "T5", " "]
+
+
+def _plan_row(rnd, kunde, messstelle, zapfstelle, parameter):
+    row = {
+        "Gebiet": rnd.choice(["52.12345, 11.54321", "52.1,11.1", "kein", None]),
+        "Kunde": kunde,
+        "Messstelle": messstelle,
+        "Zapfstelle": zapfstelle,
+        "Bereich": rnd.choice(["BB", "GW/B", "TWN", None]),
+        "Parameter": parameter,
+        "Häufigkeit": rnd.choice(FREQUENCIES),
+        "PN (I/E)": rnd.choice(["I", "E", " ", None]),
+        "Proben\nGesamt": rnd.choice([0, 1, 2, 4, 12, None]),
+        "Aktuell\nGesamt": rnd.choice([0, 1, 3, None, "2 von 4"]),
+    }
+    for index, month in enumerate(MONTHS):
+        ist = rnd.choice(IST_VALUES)
+        row[f"{month}\nKW"] = rnd.choice(KW_VALUES)
+        row[f"{month}\nIst"] = ist
+        # Mixed Datum cells: real dates, "dd.mm.yyyy; dd.mm.yyyy" lists, two-digit years, blanks
+        row[f"{month}\nDatum"] = rnd.choice([
+            datetime.datetime(2025, index + 1, rnd.randint(1, 28)),
+            f"{rnd.randint(1, 28):02d}.{index + 1:02d}.2025; {rnd.randint(1, 28):02d}.{index + 1:02d}.2025",
+            f"{rnd.randint(1, 28):02d}.{index + 1:02d}.25",
+            " ",
+            None,
+        ]) if ist not in (None, 0) else None
+    return row
+
+
+def build_plan_frame(n_rows=300, seed=7):
+    """Synthetic plan with the edge cases of real workbooks (missing names, token formats, blanks, duplicates)"""
+    rnd = random.Random(seed)
+    kunden = ["TWM GmbH", "Stadtwerke A", "Zweckverband B", None] + [f"Kunde {i}" for i in range(6)]
+    rows = []
+    for _ in range(n_rows):
+        messstelle = rnd.choice([f"MS-{rnd.randint(1, 25)}", f"MS-{rnd.randint(1, 25)}", None, rnd.randint(1, 9)])
+        rows.append(_plan_row(rnd, rnd.choice(kunden), messstelle, rnd.choice([None, "ZS 1", "ZS 2"]),
+                              rnd.choice(PARAMETERS)))
+
+    # Duplicate (Kunde, Messstelle, Zapfstelle, Parameter) rows: later cells overwrite earlier ones,
+    # including whitespace-only KW cells
+    for row in rnd.sample(rows, 20):
+        duplicate = dict(row)
+        duplicate[f"{rnd.choice(MONTHS)}\nKW"] = " "
+        duplicate[f"{rnd.choice(MONTHS)}\nKW"] = "KW 3;7"
+        rows.append(duplicate)
+    return pd.DataFrame(rows)
+
+
+@pytest.fixture(scope="session")
+def make_plan_workbook(tmp_path_factory):
+    """Write the synthetic plan of a seed with openpyxl (whitespace-only cells without xml:space="preserve")"""
+    def make(seed=7, n_rows=300):
+        path = tmp_path_factory.mktemp("workbooks") / f"plan_{seed}.xlsx"
+        build_plan_frame(n_rows, seed).to_excel(path, index=False, engine="openpyxl")
+        return str(path)
+    return make
+
+
+@pytest.fixture(scope="session")
+def plan_workbook(make_plan_workbook):
+    return make_plan_workbook()
@@ -0,0 +1,74 @@
+# tests/test_dashboard_sessions.py
+
+import io
+import time
+
+import pandas as pd
+import pytest
+from dash import html
+
+from utils.ingest_jobs import IngestJob, JobCancelled
+from utils.section_cache import payload_size
+from utils.session_store import DashboardSession
+from utils.upload_cache import estimate_size
+
+dashboard_app = pytest.importorskip("dashboard_app")
+
+
+def _upload(client, data, filename):
+    response = client.post('/upload', data={'file': (io.BytesIO(data), filename)},
+                           content_type='multipart/form-data')
+    assert response.status_code == 202
+    return response.get_json()['job_id']
+
+
+def _wait(client, job_id, timeout=120):
+    deadline = time.time() + timeout
+    while True:
+        job = client.get(f'/jobs/{job_id}').get_json()
+        if job['status'] not in ('queued', 'running'):
+            return job
+        assert time.time() < deadline, f"job {job_id} did not finish"
+        time.sleep(0.1)
+
+
+def test_failed_upload_does_not_pin_session():
+    client = dashboard_app.server.test_client()
+    job = _wait(client, _upload(client, b"not a workbook", "broken.xlsx"))
+
+    assert job['status'] == 'failed'
+    assert client.get('/debug').get_json()['pinned'] is False
+
+
+def test_upload_pins_only_its_own_session(plan_workbook):
+    uploader, other = dashboard_app.server.test_client(), dashboard_app.server.test_client()
+    other.get('/debug')
+    with open(plan_workbook, "rb") as fh:
+        job = _wait(uploader, _upload(uploader, fh.read(), "sessions.xlsx"))
+
+    assert job['status'] == 'done'
+    assert uploader.get('/debug').get_json()['pinned'] is True
+    assert other.get('/debug').get_json()['pinned'] is False
+
+
+def test_cancelled_job_does_not_swap_in_its_dataset():
+    """A job superseded while waiting for the session lock leaves the session as it is"""
+    session = dashboard_app.SESSIONS.get("cancelled-job-test")
+    job = IngestJob("stale.xlsx", "stale.xlsx")
+    job.cancel()
+
+    with pytest.raises(JobCancelled):
+        dashboard_app.finish_dashboard_upload(session, job, 99, None, None)
+    assert session.data is None and session.pinned is False
+
+
+def test_shared_datasets_are_not_charged_to_sessions():
+    """A session pays for its own content, but not for data and frames the caches share with other sessions"""
+    session = DashboardSession("measure-test")
+    session.data = [{"Kunde": f"Kunde {i}", "rows": list(range(50))} for i in range(100)]
+    session.transform_state['frame'] = frame = pd.DataFrame({"Kunde": [f"Kunde {i}" for i in range(1000)]})
+    session.content = html.Div([html.P(f"Kunde {i}") for i in range(100)])
+
+    own = session.measure(shared=[session.data, frame])
+    assert own == payload_size(session.content)
+    assert session.measure() == own + estimate_size(session.data) + estimate_size(frame)
@@ -0,0 +1,66 @@
+# tests/test_excel_reader.py
+
+import io
+
+import pandas as pd
+import pytest
+
+from utils.excel_reader import (CALAMINE_AVAILABLE, TEXT_COLUMNS, _BLANK_TEXT, _PRESERVED_TEXT, _text_chunks,
+                                merge_sheets, pipeline_columns, read_workbook)
+from utils.workbook_schema import SOURCE_COLUMN, TOTAL_COLUMN
+from conftest import build_plan_frame
+
+
+def _read_with_openpyxl(path):
+    """The reference read: pandas' default engine, same columns and dtypes as read_workbook"""
+    header = list(pd.read_excel(path, nrows=0).columns)
+    usecols = pipeline_columns(header)
+    loaded = [header[i] for i in usecols]
+    return pd.read_excel(path, usecols=usecols, dtype={col: object for col in loaded if col.strip() in TEXT_COLUMNS})
+
+
+@pytest.mark.skipif(not CALAMINE_AVAILABLE, reason="python-calamine not installed")
+def test_calamine_matches_openpyxl(plan_workbook):
+    df, info = read_workbook(plan_workbook)
+
+    assert info['backend'] == "calamine"
+    pd.testing.assert_frame_equal(df, _read_with_openpyxl(plan_workbook))
+
+
+@pytest.mark.skipif(not CALAMINE_AVAILABLE, reason="python-calamine not installed")
+def test_whitespace_only_cells_are_kept(plan_workbook):
+    df, info = read_workbook(plan_workbook)
+    kw_columns = [col for col in df.columns if str(col).endswith("\nKW")]
+
+    assert (df[kw_columns] == " ").any().any()
+
+
+@pytest.mark.parametrize("chunk_size", [1, 2, 3, 5, 8, 13, 64])
+def test_blank_text_is_found_across_chunk_boundaries(chunk_size):
+    xml = b'<si><t>a</t></si><si><t> </t></si><si><t xml:space="preserve"> b</t></si><si><t>  \n</t></si>' * 3
+    chunks = list(_text_chunks(io.BytesIO(xml), chunk_size))
+
+    assert b"".join(chunks) == xml
+    assert b"".join(_BLANK_TEXT.sub(_PRESERVED_TEXT, chunk) for chunk in chunks) == \
+        _BLANK_TEXT.sub(_PRESERVED_TEXT, xml)
+
+
+def test_merge_lines_up_header_variants(tmp_path):
+    """Sheets naming the same columns differently ("Kunde " / "Proben Gesamt") merge into one column each"""
+    path = tmp_path / "variants.xlsx"
+    variant = build_plan_frame(40, seed=2).rename(columns={"Kunde": "Kunde ", TOTAL_COLUMN: "Proben Gesamt",
+                                                           "Jan\nKW": "Jan KW"})
+    with pd.ExcelWriter(path, engine="openpyxl") as writer:
+        build_plan_frame(40, seed=1).to_excel(writer, sheet_name="Plan", index=False)
+        variant.to_excel(writer, sheet_name="Variante", index=False)
+
+    parts = [(sheet, *read_workbook(str(path), sheet_name=sheet)) for sheet in ["Plan", "Variante"]]
+    df, info = merge_sheets(parts)
+
+    assert df.columns.is_unique
+    assert not {"Kunde ", "Proben Gesamt", "Jan KW"} & set(df.columns)
+    variant_rows = df[df[SOURCE_COLUMN] == "Variante"]
+    assert len(variant_rows) == len(variant)
+    pd.testing.assert_series_equal(variant_rows["Kunde"].reset_index(drop=True), variant["Kunde "],
+                                   check_names=False, check_dtype=False)
+    assert variant_rows[TOTAL_COLUMN].notna().sum() == variant["Proben Gesamt"].notna().sum()
@@ -0,0 +1,65 @@
+# tests/test_ingest_jobs.py
+
+import threading
+import time
+
+from utils import ingest_jobs
+from utils.ingest_jobs import IngestJobQueue, JOB_CANCELLED, JOB_DONE
+from utils.ingest_store import claim_plan, current_version, ingest_workbook
+
+
+def _wait(job, timeout=60):
+    deadline = time.time() + timeout
+    while job.active:
+        assert time.time() < deadline, f"job {job.id} did not finish"
+        time.sleep(0.05)
+
+
+def test_claim_plan_refuses_older_uploads():
+    assert claim_plan("claim-test.xlsx", 200)
+    assert not claim_plan("claim-test.xlsx", 100)
+    assert claim_plan("claim-test.xlsx", 300)
+
+
+def test_superseded_job_does_not_publish_without_pool(monkeypatch, make_plan_workbook):
+    """An older, slower upload of the same plan must not publish after the newer one (no process pool)"""
+    release = threading.Event()
+    reads = []
+    read_workbook = ingest_jobs.read_workbook
+
+    def slow_first_read(source, sheet_name=0):
+        reads.append(source)
+        if len(reads) == 1:
+            release.wait(30)
+        return read_workbook(source, sheet_name=sheet_name)
+
+    monkeypatch.setattr(ingest_jobs, "read_workbook", slow_first_read)
+    queue = IngestJobQueue(max_workers=0)
+    on_ready = lambda job, version, df, digest: {'rows': len(df)}
+
+    # Workbooks no other test published, so both jobs really read and publish
+    older = queue.submit(open(make_plan_workbook(seed=21), "rb"), "plan.xlsx", on_ready)
+    deadline = time.time() + 30
+    while not reads:
+        assert time.time() < deadline and older.active, "older job never started reading"
+        time.sleep(0.01)
+    newer = queue.submit(open(make_plan_workbook(seed=22), "rb"), "plan.xlsx", on_ready)
+    _wait(newer)
+    # The older read only finishes now; its publish must be refused
+    release.set()
+    _wait(older)
+
+    assert newer.status == JOB_DONE
+    assert older.status == JOB_CANCELLED
+    assert current_version() == newer.version
+
+
+def test_unchanged_upload_still_claims_its_plan(make_plan_workbook):
+    """Re-uploading the current workbook records the submission, so an older upload of the plan is refused"""
+    path = make_plan_workbook(seed=23)
+    ingest_workbook(path, "unchanged.xlsx")
+    version = current_version()
+
+    submitted = time.time_ns()
+    assert ingest_workbook(path, "unchanged.xlsx", claim=lambda: claim_plan("unchanged.xlsx", submitted))[0] == version
+    assert not claim_plan("unchanged.xlsx", submitted - 1)
@@ -0,0 +1,51 @@
+# tests/test_ingest_parity.py
+
+import math
+
+import pandas as pd
+import pytest
+
+from utils.data_processor import transform_frame, transform_data_rowwise
+from utils.excel_reader import read_workbook
+
+
+def _comparable(value):
+    """Nested dicts/lists with NaN (which never equals itself) replaced by a marker, and types kept"""
+    if isinstance(value, dict):
+        return {_comparable_key(key): _comparable(item) for key, item in value.items()}
+    if isinstance(value, list):
+        return [_comparable(item) for item in value]
+    if isinstance(value, float) and math.isnan(value):
+        return "<NaN>"
+    return type(value).__name__, value
+
+
+def _comparable_key(key):
+    return "<NaN>" if isinstance(key, float) and math.isnan(key) else key
+
+
+def _assert_parity(df):
+    expected = transform_data_rowwise(df)
+    actual = [customer.to_dict() for customer in transform_frame(df)]
+
+    assert len(actual) == len(expected)
+    for got, want in zip(actual, expected):
+        assert _comparable(got) == _comparable(want), f"customer {want['Kunde']!r} differs"
+
+
+@pytest.mark.parametrize("reader", ["openpyxl", "read_workbook"])
+def test_transform_frame_matches_rowwise(plan_workbook, reader):
+    if reader == "openpyxl":
+        df = pd.read_excel(plan_workbook)
+    else:
+        df, info = read_workbook(plan_workbook)
+    _assert_parity(df)
+
+
+def test_reader_does_not_change_transform(plan_workbook):
+    """The workbook reader (calamine or openpyxl) must not change what the dashboard shows"""
+    reference = transform_frame(pd.read_excel(plan_workbook))
+    df, info = read_workbook(plan_workbook)
+
+    assert _comparable([customer.to_dict() for customer in transform_frame(df)]) == \
+        _comparable([customer.to_dict() for customer in reference])
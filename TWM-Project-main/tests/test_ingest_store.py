@@ -0,0 +1,27 @@
+# tests/test_ingest_store.py
+
+import numpy as np
+import pandas as pd
+
+from utils import ingest_store
+from utils.excel_reader import read_workbook
+from utils.ingest_store import frame_of, load_frame, loaded_frames, publish_frame
+
+
+def test_snapshot_is_decoded_per_column_and_shared(make_plan_workbook, monkeypatch):
+    """A process that did not publish the snapshot maps it and decodes each column once for all its frames"""
+    df, info = read_workbook(make_plan_workbook(seed=31))
+    version = publish_frame(df, "snapshot.xlsx", info)
+    monkeypatch.setitem(ingest_store._LOADED, 'version', None)
+
+    loaded_version, full = load_frame()
+    assert loaded_version == version
+    pd.testing.assert_frame_equal(full, df, check_dtype=False)
+    assert load_frame()[1] is full
+
+    _, narrowed = load_frame(exclude=["Gebiet"])
+    assert list(narrowed.columns) == [col for col in df.columns if col != "Gebiet"]
+    mixed = next(col for col in narrowed.columns if narrowed[col].dtype == object)
+    assert np.shares_memory(narrowed[mixed].to_numpy(), full[mixed].to_numpy())
+    assert frame_of(version, df, exclude=["Gebiet"]) is narrowed
+    assert any(frame is narrowed for frame in loaded_frames())
@@ -0,0 +1,18 @@
+# tests/test_sample_tokens.py
+
+import pytest
+
+from utils.sample_tokens import parse_count, parse_ist, parse_kw
+
+
+def _fields(tokens):
+    return {name: getattr(tokens, name) for name in getattr(tokens, "__slots__", ())} or tokens
+
+
+@pytest.mark.parametrize("parser", [parse_kw, parse_ist, parse_count])
+def test_equal_values_of_other_types_are_parsed_separately(parser):
+    """1.0 and True are equal memo keys; the memo must not hand one the other's result"""
+    for first, second in [(1.0, True), (True, 1.0), (0.0, False)]:
+        parser.cache_clear()
+        parser(first)
+        assert _fields(parser(second)) == _fields(parser.__wrapped__(second))
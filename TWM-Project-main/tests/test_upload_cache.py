@@ -0,0 +1,43 @@
+# tests/test_upload_cache.py
+
+import hashlib
+import io
+import os
+
+from utils.upload_cache import SpilledUpload, source_digest, source_path, spool_upload
+
+
+def test_small_upload_stays_in_memory():
+    spool = spool_upload(io.BytesIO(b"x" * 100), max_memory=1024)
+
+    assert isinstance(spool, io.BytesIO)
+    assert source_path(spool) is None
+    assert spool.read() == b"x" * 100
+
+
+def test_large_upload_spills_to_a_file_removed_on_close():
+    data = os.urandom(5000)
+    spool = spool_upload(io.BytesIO(data), max_memory=1024)
+
+    assert isinstance(spool, SpilledUpload)
+    path = source_path(spool)
+    with open(path, "rb") as fh:
+        assert fh.read() == data
+    assert spool.read() == data
+
+    spool.close()
+    assert not os.path.exists(path)
+
+
+def test_source_digest_matches_sha256_for_every_source_kind(tmp_path):
+    data = os.urandom(3 * 1024 * 1024 + 17)
+    expected = hashlib.sha256(data).hexdigest()
+    path = tmp_path / "upload.xlsx"
+    path.write_bytes(data)
+    spilled = spool_upload(io.BytesIO(data), max_memory=1024)
+
+    assert source_digest(io.BytesIO(data)) == expected
+    assert source_digest(str(path)) == expected
+    assert source_digest(spilled) == expected
+    assert spilled.tell() == 0
+    spilled.close()
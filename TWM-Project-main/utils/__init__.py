@@ -1,10 +1,12 @@
 # utils/__init__.py
 
-from .data_processor import transform_data, format_date_to_ddmmyyyy
+from .data_processor import transform_data, transform_frame, format_date_to_ddmmyyyy
 from .ui_components import (
     create_progress_bar,
     create_month_value_display,
     create_customer_header,
+    create_collapsed_customer_section,
+    create_search_bar,
     create_legend,
     create_customer_table_with_scroll
 )
@@ -12,19 +14,24 @@ from .display_handlers import (
     handle_semiannual_display,
     handle_quarterly_display,
     handle_m_months_grouping,
+    get_state_for_sample,
     get_colors_for_state
 )
 
 __all__ = [
     'transform_data',
+    'transform_frame',
     'format_date_to_ddmmyyyy',
     'create_progress_bar',
     'create_month_value_display',
     'create_customer_header',
+    'create_collapsed_customer_section',
+    'create_search_bar',
     'create_legend',
     'create_customer_table_with_scroll',
     'handle_semiannual_display',
     'handle_quarterly_display',
     'handle_m_months_grouping',
+    'get_state_for_sample',
     'get_colors_for_state'
 ]
\ No newline at end of file
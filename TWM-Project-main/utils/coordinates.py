@@ -0,0 +1,79 @@
+# utils/coordinates.py
+
+import numpy as np
+import pandas as pd
+
+# Reason codes of the coordinate stage, one per row
+COORD_OK = "ok"
+COORD_MISSING = "missing"
+COORD_NO_COMMA = "no_comma"
+COORD_UNPARSEABLE = "unparseable"
+COORD_OUT_OF_RANGE = "out_of_range"
+
+
+def _parse_gebiet(value):
+    """(lat, lon, reason) of one distinct Gebiet cell; reason is None until the range check"""
+    if pd.isna(value):
+        return np.nan, np.nan, COORD_MISSING
+
+    koordinaten_str = str(value).replace(' ', '').replace('\n', '').replace('\r', '')
+    if ',' not in koordinaten_str:
+        return np.nan, np.nan, COORD_NO_COMMA
+    try:
+        lat, lon = map(float, koordinaten_str.split(','))
+    except ValueError:
+        return np.nan, np.nan, COORD_UNPARSEABLE
+    return lat, lon, None
+
+
+def parse_coordinates(gebiet):
+    """
+    Parse a whole Gebiet column ("lat, lon") at once.
+
+    Each distinct cell is split once, the lat/lon range check runs on the full arrays. Returns a
+    DataFrame with the column's index and lat, lon, valid and reason columns.
+    """
+    gebiet = gebiet if isinstance(gebiet, pd.Series) else pd.Series(gebiet, dtype=object)
+    codes, uniques = pd.factorize(gebiet)
+    parsed = [_parse_gebiet(value) for value in pd.Index(uniques).tolist()]
+    parsed.append((np.nan, np.nan, COORD_MISSING))  # code -1 marks missing values
+
+    lat = np.array([p[0] for p in parsed], dtype=float)[codes]
+    lon = np.array([p[1] for p in parsed], dtype=float)[codes]
+    reason = np.array([p[2] for p in parsed], dtype=object)[codes]
+
+    split_ok = np.array([r is None for r in reason], dtype=bool)
+    with np.errstate(invalid='ignore'):
+        in_range = (lat >= -90) & (lat <= 90) & (lon >= -180) & (lon <= 180)
+    reason[split_ok & in_range] = COORD_OK
+    reason[split_ok & ~in_range] = COORD_OUT_OF_RANGE
+
+    return pd.DataFrame({
+        'lat': lat,
+        'lon': lon,
+        'valid': split_ok & in_range,
+        'reason': reason
+    }, index=gebiet.index)
+
+
+def coordinate_summary(gebiet, reasons, max_examples=3):
+    """Bulk report of unusable coordinates: count and a few example values per reason code"""
+    gebiet = np.asarray(gebiet, dtype=object)
+    reasons = np.asarray(reasons, dtype=object)
+    invalid = {}
+    for reason in pd.unique(reasons[reasons != COORD_OK]):
+        mask = reasons == reason
+        invalid[reason] = {
+            'count': int(mask.sum()),
+            'examples': [str(value) for value in pd.unique(gebiet[mask])[:max_examples]]
+        }
+    return {'valid': int((reasons == COORD_OK).sum()), 'invalid': invalid}
+
+
+def format_coordinate_summary(summary, unit="rows"):
+    """One log line for a coordinate_summary"""
+    if not summary['invalid']:
+        return f"✅ All {summary['valid']} {unit} have valid coordinates"
+    details = ", ".join(f"{reason}: {info['count']} (e.g. {', '.join(repr(e) for e in info['examples'])})"
+                        for reason, info in summary['invalid'].items())
+    return f"⚠️  {sum(info['count'] for info in summary['invalid'].values())} {unit} with unusable coordinates - {details}"
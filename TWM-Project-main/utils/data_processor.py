@@ -4,98 +4,98 @@ import pandas as pd
 import base64
 import io
 import re
-from config.constants import KW_RANGES, PARAMETER_GROUPS
+from config.constants import KW_RANGES
+from utils.date_engine import format_date
+from utils.excel_reader import read_workbook
+from utils.ingest_log import get_logger
+from utils.ingest_engine import build_customers
+from utils.parameter_taxonomy import load_taxonomy
+from utils.plan_model import Customer, PlanRow, customer_from_dict
+from utils.workbook_schema import get_workbook_schema
 
+log = get_logger("data_processor")
 
-def format_date_to_ddmmyyyy(date_str):
-    """Helper to safely format dates from Timestamp or strings"""
-    if pd.isna(date_str):
-        return ""
 
-    try:
-        parsed_date = pd.to_datetime(date_str, dayfirst=True, errors='coerce')
-        if not pd.isna(parsed_date):
-            return parsed_date.strftime("%d.%m.%Y")
-        else:
-            return str(date_str)  # if parsing fails, return as string
-    except:
-        return str(date_str)
+def format_date_to_ddmmyyyy(date_str):
+    """Helper to safely format dates from Timestamp or strings (served from the date engine's lookup table)"""
+    return format_date(date_str)
 
 
 def get_parameter_group(parameter_name):
     """Find which group a parameter belongs to"""
-    for group_name, parameters in PARAMETER_GROUPS.items():
-        if parameter_name in parameters:
-            return group_name
-    return "Sonstige"  # Default group for unmatched parameters
+    return load_taxonomy().group_of(parameter_name)
 
 
-def should_split_customer(kunde_dict):
-    """Check if a customer should be split into parameter groups"""
-    kunde_name = kunde_dict["Kunde"]
+def should_split_customer(customer):
+    """Check if a customer should be split into parameter groups (split_customers of the taxonomy)"""
+    return load_taxonomy().splits(customer.kunde)
 
-    # Only split "TWM GmbH" company specifically
-    companies_to_split = ["TWM GmbH"]
 
-    return kunde_name in companies_to_split
+def split_customer_by_parameter_groups(customer, taxonomy=None):
+    """Split a customer into multiple groups based on parameter categories"""
+    taxonomy = taxonomy or load_taxonomy()
+    if not taxonomy.splits(customer.kunde):
+        return [customer]  # Return as-is if no splitting needed
 
+    # One pass over all parameters; rows share the customer's ParameterCells
+    grouped_customers = {}
 
-def split_customer_by_parameter_groups(kunde_dict):
-    """Split a customer into multiple groups based on parameter categories"""
-    kunde_name = kunde_dict["Kunde"]
+    for row in customer.rows:
+        group_rows = {}
 
-    if not should_split_customer(kunde_dict):
-        return [kunde_dict]  # Return as-is if no splitting needed
+        for param_name, param_cell in row.parameters.items():
+            group_name = taxonomy.group_of(param_name)
 
-    # Create separate customer groups
-    grouped_customers = {}
+            group_row = group_rows.get(group_name)
+            if group_row is None:
+                customer_group_name = f"{customer.kunde} ({group_name})"
+                if customer_group_name not in grouped_customers:
+                    grouped_customers[customer_group_name] = Customer(customer_group_name, sources=customer.sources)
 
-    for row in kunde_dict["Rows"]:
-        # Group parameters in this row by their categories
-        grouped_params = {}
+                group_row = group_rows[group_name] = PlanRow(row.messstelle, row.zapfstelle, {})
+                grouped_customers[customer_group_name].rows.append(group_row)
 
-        for param_name, param_data in row.items():
-            if param_name in ["Messstelle", "Zapfstelle"]:
-                continue
+            group_row.parameters[param_name] = param_cell
 
-            group_name = get_parameter_group(param_name)
+    return list(grouped_customers.values())
 
-            if group_name not in grouped_params:
-                grouped_params[group_name] = {}
 
-            grouped_params[group_name][param_name] = param_data
+def transform_data(contents):
+    """Transform uploaded Excel data into structured format"""
+    content_type, content_string = contents.split(',')
+    decoded = base64.b64decode(content_string)
+    data, reader_info = read_workbook(io.BytesIO(decoded))
+    return transform_frame(data)
 
-        # Create separate rows for each parameter group
-        for group_name, params in grouped_params.items():
-            if not params:  # Skip empty groups
-                continue
 
-            customer_group_name = f"{kunde_name} ({group_name})"
+def transform_frame(data):
+    """Transform an already loaded plan DataFrame into structured format"""
+    # Header variations are reported once per upload instead of silently per row
+    schema = get_workbook_schema(data.columns)
+    for warning in schema.warnings:
+        log.warning(f"⚠️ Header: {warning}")
 
-            if customer_group_name not in grouped_customers:
-                grouped_customers[customer_group_name] = {
-                    "Kunde": customer_group_name,
-                    "Rows": []
-                }
+    transformed_data = []
+    for entries in transform_customers(data, schema).values():
+        transformed_data.extend(entries)
 
-            # Create a new row for this group
-            new_row = {
-                "Messstelle": row["Messstelle"],
-                "Zapfstelle": row["Zapfstelle"]
-            }
-            new_row.update(params)
+    return transformed_data
 
-            grouped_customers[customer_group_name]["Rows"].append(new_row)
 
-    return list(grouped_customers.values())
+def transform_customers(data, schema=None, customers=None):
+    """Kunde -> transformed (possibly split) entries, for all customers or only the given ones"""
+    if schema is None:
+        schema = get_workbook_schema(data.columns)
+    if customers is not None:
+        data = data[data["Kunde"].isin(list(customers))]
 
+    taxonomy = load_taxonomy()
+    return {customer.kunde: split_customer_by_parameter_groups(customer, taxonomy)
+            for customer in build_customers(data, schema)}
 
-def transform_data(contents):
-    """Transform uploaded Excel data into structured format"""
-    content_type, content_string = contents.split(',')
-    decoded = base64.b64decode(content_string)
-    data = pd.read_excel(io.BytesIO(decoded))
 
+def transform_data_rowwise(data):
+    """Reference row-by-row transform of a plan DataFrame into the original nested dicts (kept for parity checks)"""
     transformed_data = []
     for kunde, kunde_group in data.groupby('Kunde'):
         kunde_dict = {"Kunde": kunde, "Rows": []}
@@ -224,7 +224,7 @@ def transform_data(contents):
                     kunde_dict["Rows"].append(row_dict)
 
         # After processing all rows for this customer, check if it should be split
-        split_customers = split_customer_by_parameter_groups(kunde_dict)
-        transformed_data.extend(split_customers)
+        split_customers = split_customer_by_parameter_groups(customer_from_dict(kunde_dict))
+        transformed_data.extend(customer.to_dict() for customer in split_customers)
 
     return transformed_data
\ No newline at end of file
@@ -0,0 +1,201 @@
+# utils/date_engine.py
+
+import re
+import threading
+import time
+from datetime import datetime
+import pandas as pd
+from utils.ingest_log import get_logger
+from utils.workbook_schema import get_workbook_schema
+
+log = get_logger("date_engine")
+
+# Common German date formats, in the order they are tried
+DATE_FORMATS = [
+    '%d.%m.%Y',  # 13.03.2025
+    '%d/%m/%Y',  # 13/03/2025
+    '%d-%m-%Y',  # 13-03-2025
+    '%Y-%m-%d',  # 2025-03-13
+    '%d.%m.%y',  # 13.03.25
+    '%d/%m/%y',  # 13/03/25
+    '%d-%m-%y',  # 13-03-25
+]
+
+# Shape of each format, so a string goes straight to the one strptime call that can match it
+_FORMAT_SHAPES = [(re.compile(pattern), date_format) for pattern, date_format in [
+    (r'\d{1,2}\.\d{1,2}\.\d{4}', '%d.%m.%Y'),
+    (r'\d{1,2}/\d{1,2}/\d{4}', '%d/%m/%Y'),
+    (r'\d{1,2}-\d{1,2}-\d{4}', '%d-%m-%Y'),
+    (r'\d{4}-\d{1,2}-\d{1,2}', '%Y-%m-%d'),
+    (r'\d{1,2}\.\d{1,2}\.\d{2}', '%d.%m.%y'),
+    (r'\d{1,2}/\d{1,2}/\d{2}', '%d/%m/%y'),
+    (r'\d{1,2}-\d{1,2}-\d{2}', '%d-%m-%y'),
+]]
+
+_DATE_PATTERN = re.compile(r'(\d{1,2})[./\-](\d{1,2})[./\-](\d{2,4})')
+
+# Lookup tables: raw cell value -> parsed date / display string
+MAX_TABLE_SIZE = 50000
+_PARSED = {}
+_FORMATTED = {}
+_STATS = {'hits': 0, 'misses': 0, 'primed': 0, 'prime_seconds': 0.0}
+_LOCK = threading.Lock()
+
+
+def _key(value):
+    # 1, 1.0 and True compare equal but are different cells
+    return value if isinstance(value, str) else (type(value), value)
+
+
+def _strptime_any(date_str):
+    """Try the detected format first, then every format in order"""
+    for shape, date_format in _FORMAT_SHAPES:
+        if shape.fullmatch(date_str):
+            try:
+                return datetime.strptime(date_str, date_format)
+            except ValueError:
+                break
+
+    for date_format in DATE_FORMATS:
+        try:
+            return datetime.strptime(date_str, date_format)
+        except ValueError:
+            continue
+    return None
+
+
+def _parse_uncached(date_value):
+    """Parse various date formats commonly found in Excel"""
+    try:
+        # Already a pandas Timestamp or a Python datetime object
+        if isinstance(date_value, (pd.Timestamp, datetime)):
+            return date_value
+
+        # Excel serial date number
+        if isinstance(date_value, (int, float)):
+            if date_value > 25569:  # Valid Excel date range
+                return pd.to_datetime('1899-12-30') + pd.Timedelta(days=date_value)
+            return None
+
+        if isinstance(date_value, str):
+            date_str = date_value.strip()
+            if not date_str:
+                return None
+
+            # Multiple dates separated by semicolon - take the last one
+            if ';' in date_str:
+                date_parts = [d.strip() for d in date_str.split(';') if d.strip()]
+                if date_parts:
+                    date_str = date_parts[-1]
+
+            parsed_date = _strptime_any(date_str)
+            if parsed_date is not None:
+                return parsed_date
+
+            # Pandas parsing as fallback
+            try:
+                parsed_date = pd.to_datetime(date_str, dayfirst=True, errors='coerce')
+                if not pd.isna(parsed_date):
+                    return parsed_date
+            except Exception:
+                pass
+
+            # Regex extraction for messy formats
+            match = _DATE_PATTERN.search(date_str)
+            if match:
+                day, month, year = match.groups()
+                if len(year) == 2:
+                    year = '20' + year if int(year) <= 50 else '19' + year
+                try:
+                    return datetime(int(year), int(month), int(day))
+                except ValueError:
+                    pass
+
+    except Exception as e:
+        log.debug(f"❌ Error parsing date {date_value}: {e}")
+
+    return None
+
+
+def _format_uncached(date_value):
+    """Format a Timestamp or date string as dd.mm.yyyy (unparseable values are returned as string)"""
+    try:
+        parsed_date = pd.to_datetime(date_value, dayfirst=True, errors='coerce')
+        if not pd.isna(parsed_date):
+            return parsed_date.strftime("%d.%m.%Y")
+        return str(date_value)
+    except Exception:
+        return str(date_value)
+
+
+def _lookup(table, value, compute):
+    key = _key(value)
+    try:
+        result = table[key]
+        _STATS['hits'] += 1
+        return result
+    except KeyError:
+        pass
+    except TypeError:  # unhashable cell
+        return compute(value)
+
+    result = compute(value)
+    with _LOCK:
+        if len(table) >= MAX_TABLE_SIZE:
+            table.clear()
+        table[key] = result
+        _STATS['misses'] += 1
+    return result
+
+
+def parse_date(date_value):
+    """Parsed datetime of a Datum cell (last date of a ';' list), or None"""
+    if date_value is None or (not isinstance(date_value, str) and pd.isna(date_value)) or date_value == '':
+        return None
+    return _lookup(_PARSED, date_value, _parse_uncached)
+
+
+def format_date(date_value):
+    """dd.mm.yyyy display string of a single date value ("" for missing values)"""
+    if date_value is None or (not isinstance(date_value, str) and pd.isna(date_value)):
+        return ""
+    return _lookup(_FORMATTED, date_value, _format_uncached)
+
+
+def date_columns(df, schema=None):
+    """Datum columns of a plan frame, including Start Datum / aktuelles Datum"""
+    if schema is None:
+        schema = get_workbook_schema(df.columns)
+    columns = schema.datum_columns() + [col for col in ['Start Datum', 'aktuelles Datum'] if col in df.columns]
+    return [col for col in dict.fromkeys(columns) if col in df.columns]
+
+
+def prime_dates(df, schema=None):
+    """Parse every distinct Datum value of an upload once (including each part of ';' lists)"""
+    start = time.perf_counter()
+    distinct = {}
+    for col in date_columns(df, schema):
+        for value in df[col].dropna().unique().tolist():
+            try:
+                distinct[_key(value)] = value
+            except TypeError:
+                continue
+
+    for value in distinct.values():
+        parse_date(value)
+        if isinstance(value, str) and ";" in value:
+            for part in value.split(";"):
+                format_date(part.strip())
+        else:
+            format_date(value)
+
+    seconds = time.perf_counter() - start
+    _STATS['primed'] += len(distinct)
+    _STATS['prime_seconds'] = round(_STATS['prime_seconds'] + seconds, 4)
+    log.info(f"📅 Primed {len(distinct)} distinct date values in {seconds:.2f}s")
+    return len(distinct)
+
+
+def date_engine_stats():
+    """Table sizes and hit/miss counters for the /debug endpoints"""
+    return dict(_STATS, parsed=len(_PARSED), formatted=len(_FORMATTED))
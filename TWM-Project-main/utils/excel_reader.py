@@ -0,0 +1,234 @@
+# utils/excel_reader.py
+
+import re
+import shutil
+import tempfile
+import time
+import zipfile
+import pandas as pd
+from utils.ingest_log import get_logger
+from utils.workbook_schema import SOURCE_COLUMN, get_workbook_schema
+
+log = get_logger("excel_reader")
+
+try:
+    import python_calamine  # noqa: F401  (Rust-based reader used by pandas' "calamine" engine)
+
+    CALAMINE_AVAILABLE = True
+except ImportError:
+    CALAMINE_AVAILABLE = False
+
+# Columns outside the month/total layout that the dashboard or the map look at
+BASE_COLUMNS = ["Gebiet", "Kunde", "Messstelle", "Zapfstelle", "Bereich", "Parameter",
+                "Start Datum", "aktuelles Datum"]
+
+# Always-text columns: skip type inference for them
+TEXT_COLUMNS = ["Kunde", "Parameter", "Bereich", "Gebiet"]
+
+# A sheet without these columns is not a plan sheet (legend, notes, ...) and is left out of a merge
+PLAN_SHEET_COLUMNS = ["Kunde", "Messstelle"]
+
+# Whitespace-only text without xml:space="preserve" (as openpyxl writes " " cells): calamine reads it
+# as an empty cell, openpyxl as the string itself
+_BLANK_TEXT = re.compile(rb"<t>(\s+)</t>")
+_PRESERVED_TEXT = rb'<t xml:space="preserve">\1</t>'
+XML_CHUNK_SIZE = 1024 * 1024
+
+
+def reader_backends():
+    """Engines to try in order: calamine when installed, then pandas' default (openpyxl, read-only)"""
+    backends = []
+    if CALAMINE_AVAILABLE:
+        backends.append("calamine")
+    backends.append(None)
+    return backends
+
+
+def pipeline_columns(header):
+    """Header positions of the columns the dashboard and map pipelines need"""
+    schema = get_workbook_schema(header)
+    needed = set(BASE_COLUMNS)
+    needed.update(col for col in [schema.total_column, schema.current_column, schema.pn_column,
+                                  schema.frequency_column, schema.area_column] if col)
+    needed.update(mc.column for mc in schema.month_columns)
+    for columns in schema.months.values():
+        needed.update(col for col in [columns.ist, columns.datum] if col)
+    return [position for position, col in enumerate(header) if col in needed or _strip_name(col) in needed]
+
+
+def _strip_name(col):
+    return col.strip() if isinstance(col, str) else col
+
+
+def canonical_header(df):
+    """
+    A sheet under the canonical column names: surrounding whitespace stripped ("Kunde " -> "Kunde")
+    and header variants renamed by the sheet's own schema ("Proben Gesamt" -> "Proben\nGesamt").
+    """
+    stripped = {col: _strip_name(col) for col in df.columns if _strip_name(col) != col}
+    df = df.rename(columns={col: name for col, name in stripped.items() if name not in df.columns})
+    return df.rename(columns=get_workbook_schema(df.columns).canonical_names())
+
+
+def _rewind(source):
+    if hasattr(source, "seek"):
+        source.seek(0)
+
+
+def _string_parts(archive):
+    """Parts that can hold cell text: the shared strings table and the sheets (inline strings)"""
+    return [info for info in archive.infolist()
+            if info.filename == "xl/sharedStrings.xml"
+            or (info.filename.startswith("xl/worksheets/") and info.filename.endswith(".xml"))]
+
+
+def _text_chunks(stream, chunk_size=XML_CHUNK_SIZE):
+    """An XML stream in chunks cut so that no <t>...</t> element is split between two chunks"""
+    carry = b""
+    while chunk := stream.read(chunk_size):
+        buffer = carry + chunk
+        start = buffer.rfind(b"<t>")
+        end = buffer.find(b"</t>", start) if start != -1 else -1
+        if start == -1:
+            cut = max(len(buffer) - 2, 0)  # keep a trailing "<t" for the next chunk
+        elif end == -1:
+            cut = start  # open element: carry it over whole
+        else:
+            cut = max(len(buffer) - 2, end + 4)
+        yield buffer[:cut]
+        carry = buffer[cut:]
+    if carry:
+        yield carry
+
+
+def _has_blank_text(archive, info):
+    with archive.open(info) as stream:
+        return any(_BLANK_TEXT.search(chunk) for chunk in _text_chunks(stream))
+
+
+def _calamine_source(source):
+    """
+    The workbook as calamine should read it: an .xlsx whose whitespace-only strings lack
+    xml:space="preserve" is copied with the attribute added, so both backends return " " cells
+    as " " (the openpyxl result is the reference). Other workbooks are returned unchanged.
+    """
+    _rewind(source)
+    if not zipfile.is_zipfile(source):
+        return source
+    _rewind(source)
+    with zipfile.ZipFile(source) as archive:
+        blank_parts = {info.filename for info in _string_parts(archive) if _has_blank_text(archive, info)}
+        if not blank_parts:
+            return source
+
+        # Streamed part by part into a temp file; only the matching parts are rewritten
+        patched = tempfile.TemporaryFile()
+        with zipfile.ZipFile(patched, "w", zipfile.ZIP_DEFLATED, compresslevel=1) as out:
+            for info in archive.infolist():
+                # By name, so the parts get this archive's fast compression level
+                with archive.open(info) as src, out.open(info.filename, "w") as dst:
+                    if info.filename in blank_parts:
+                        for chunk in _text_chunks(src):
+                            dst.write(_BLANK_TEXT.sub(_PRESERVED_TEXT, chunk))
+                    else:
+                        shutil.copyfileobj(src, dst)
+    log.debug(f"🔧 Marked whitespace-only strings as preserved in {sorted(blank_parts)} for calamine")
+    patched.seek(0)
+    return patched
+
+
+def read_workbook(source, sheet_name=0, prune=True):
+    """
+    Read a plan workbook: header row first, then only the needed columns.
+
+    Returns (DataFrame, info) where info reports the backend used and the time taken.
+    """
+    last_error = None
+    for engine in reader_backends():
+        start = time.perf_counter()
+        workbook_source = source
+        try:
+            if engine == "calamine":
+                workbook_source = _calamine_source(source)
+            _rewind(workbook_source)
+            with pd.ExcelFile(workbook_source, engine=engine) as workbook:
+                header = list(workbook.parse(sheet_name, nrows=0).columns)
+                header_seconds = time.perf_counter() - start
+
+                usecols = pipeline_columns(header) if prune else None
+                loaded = [header[i] for i in usecols] if usecols is not None else header
+                dtype = {col: object for col in loaded if _strip_name(col) in TEXT_COLUMNS}
+
+                df = workbook.parse(sheet_name, usecols=usecols, dtype=dtype or None)
+                backend = workbook.engine
+        except Exception as e:
+            last_error = e
+            log.warning(f"⚠️ Excel reader '{engine or 'default'}' failed, trying next backend: {e}")
+            continue
+        finally:
+            if workbook_source is not source:
+                workbook_source.close()
+
+        info = {
+            'backend': backend,
+            'seconds': round(time.perf_counter() - start, 4),
+            'header_seconds': round(header_seconds, 4),
+            'columns_loaded': len(df.columns),
+            'columns_total': len(header),
+            'rows': len(df)
+        }
+        log.info(f"📥 Read workbook with {backend} in {info['seconds']:.2f}s "
+                 f"({info['columns_loaded']}/{info['columns_total']} columns, {info['rows']} rows)")
+        return df, info
+
+    raise last_error
+
+
+def list_sheets(source):
+    """Sheet names of a workbook, in workbook order"""
+    last_error = None
+    for engine in reader_backends():
+        try:
+            _rewind(source)
+            with pd.ExcelFile(source, engine=engine) as workbook:
+                return list(workbook.sheet_names)
+        except Exception as e:
+            last_error = e
+    raise last_error
+
+
+def merge_sheets(parts):
+    """
+    One plan frame from several sheets: parts is a list of (source tag, DataFrame, info).
+
+    Each sheet is brought to the canonical column names first, so header variants of the same
+    column line up. Rows keep their sheet's tag in SOURCE_COLUMN (only when more than one sheet
+    is merged); sheets that are not plan sheets are skipped. Returns (DataFrame, info).
+    """
+    plan_parts = []
+    for tag, df, info in parts:
+        df = canonical_header(df)
+        missing = [col for col in PLAN_SHEET_COLUMNS if col not in df.columns]
+        if missing:
+            log.warning(f"⚠️ Skipping '{tag}': not a plan sheet (missing {missing})")
+            continue
+        plan_parts.append((tag, df, info))
+    if not plan_parts:
+        raise ValueError("None of the uploaded sheets is a plan sheet (Kunde/Messstelle columns missing)")
+
+    if len(plan_parts) == 1:
+        merged = plan_parts[0][1]
+    else:
+        merged = pd.concat([df.assign(**{SOURCE_COLUMN: tag}) for tag, df, info in plan_parts],
+                           ignore_index=True, sort=False)
+
+    info = {
+        'backend': plan_parts[0][2]['backend'],
+        'seconds': round(max(info['seconds'] for tag, df, info in plan_parts), 4),
+        'columns_loaded': len(merged.columns),
+        'rows': len(merged),
+        'sources': [{'source': tag, 'rows': info['rows'], 'seconds': info['seconds']}
+                    for tag, df, info in plan_parts]
+    }
+    log.info(f"🧩 Merged {len(plan_parts)} sheets into {len(merged)} rows")
+    return merged, info
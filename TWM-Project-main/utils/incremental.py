@@ -0,0 +1,131 @@
+# utils/incremental.py
+
+import time
+import numpy as np
+import pandas as pd
+from utils.data_processor import transform_customers
+from utils.ingest_log import get_logger
+from utils.parameter_taxonomy import load_taxonomy
+from utils.workbook_schema import SOURCE_COLUMN, get_workbook_schema
+
+log = get_logger("incremental")
+
+# Rows are matched across workbook versions by this key (repeated keys are matched in order)
+ROW_KEY = ["Kunde", "Messstelle", "Zapfstelle", "Parameter", SOURCE_COLUMN]
+
+# Above this share of added/removed/changed rows a full rebuild is cheaper than patching
+FULL_REBUILD_FRACTION = 0.5
+
+
+def _keyed_row_hashes(df):
+    """Per row: hash of the ROW_KEY cells, occurrence of that key so far and hash of the whole row"""
+    key_columns = [col for col in ROW_KEY if col in df.columns]
+    key_hash = pd.util.hash_pandas_object(df[key_columns], index=False).to_numpy()
+    return pd.DataFrame({
+        'key': key_hash,
+        'occurrence': pd.Series(key_hash).groupby(key_hash).cumcount().to_numpy(),
+        'row': pd.util.hash_pandas_object(df, index=False).to_numpy(),
+        'position': np.arange(len(df))
+    })
+
+
+class RowDiff:
+    """Added, removed and changed rows between two versions of a plan frame"""
+
+    def __init__(self, old, new):
+        self.old = old.reset_index(drop=True)
+        self.new = new.reset_index(drop=True)
+
+        matched = _keyed_row_hashes(self.old).merge(
+            _keyed_row_hashes(self.new), on=['key', 'occurrence'], suffixes=('_old', '_new'))
+        changed = matched['row_old'].to_numpy() != matched['row_new'].to_numpy()
+
+        in_old = np.zeros(len(self.old), dtype=bool)
+        in_old[matched['position_old'].to_numpy()] = True
+        in_new = np.zeros(len(self.new), dtype=bool)
+        in_new[matched['position_new'].to_numpy()] = True
+
+        self.removed = np.flatnonzero(~in_old)
+        self.added = np.flatnonzero(~in_new)
+        self.changed_old = matched['position_old'].to_numpy()[changed]
+        self.changed_new = matched['position_new'].to_numpy()[changed]
+        self.unchanged = int(len(matched) - changed.sum())
+
+    @property
+    def changed_fraction(self):
+        touched = len(self.added) + len(self.removed) + len(self.changed_new)
+        return touched / max(len(self.old), len(self.new), 1)
+
+    def is_incremental(self):
+        """True if patching the previous result is worth it"""
+        return self.changed_fraction <= FULL_REBUILD_FRACTION
+
+    def affected(self, columns):
+        """Values (one column) or value tuples (several columns) of every touched row, old and new"""
+        single = isinstance(columns, str)
+        columns = [columns] if single else list(columns)
+        old_rows = np.concatenate([self.removed, self.changed_old])
+        new_rows = np.concatenate([self.added, self.changed_new])
+
+        values = set()
+        for frame, rows in [(self.old, old_rows), (self.new, new_rows)]:
+            if not rows.size:
+                continue
+            cells = [frame[col].to_numpy(dtype=object)[rows] for col in columns]
+            values.update(cells[0] if single else zip(*cells))
+        return values
+
+    def summary(self):
+        return {
+            'rows_added': int(len(self.added)),
+            'rows_removed': int(len(self.removed)),
+            'rows_changed': int(len(self.changed_new)),
+            'rows_unchanged': self.unchanged
+        }
+
+
+def diff_frames(old, new):
+    """RowDiff of two plan frames, or None if there is no comparable previous frame"""
+    if old is None or list(old.columns) != list(new.columns):
+        return None
+    return RowDiff(old, new)
+
+
+def incremental_transform(data, state):
+    """
+    Dashboard transform that only rebuilds customers whose rows changed since the previous frame.
+
+    state holds the previous 'frame', its 'customers' (Kunde -> transformed entries) and the
+    'taxonomy' fingerprint they were split with, and is updated in place. Returns
+    (transformed_data, change summary).
+    """
+    start = time.perf_counter()
+    schema = get_workbook_schema(data.columns)
+    diff = diff_frames(state.get('frame'), data)
+    # Edited parameter groups / split rules change every customer
+    taxonomy = load_taxonomy().fingerprint
+
+    if diff is not None and diff.is_incremental() and state.get('taxonomy') == taxonomy:
+        previous = state['customers']
+        # Same customer order as build_customers
+        kunden = pd.Index(pd.factorize(data["Kunde"], sort=True)[1]).tolist()
+        affected = {k for k in diff.affected("Kunde") if not pd.isna(k)}
+        affected.update(k for k in kunden if k not in previous)
+
+        rebuilt = transform_customers(data, schema, affected) if affected else {}
+        customers = {kunde: rebuilt[kunde] if kunde in affected else previous[kunde] for kunde in kunden}
+        summary = dict(diff.summary(), mode='incremental', customers_rebuilt=len(rebuilt))
+    else:
+        for warning in schema.warnings:
+            log.warning(f"⚠️ Header: {warning}")
+        customers = transform_customers(data, schema)
+        summary = dict(diff.summary() if diff is not None else {}, mode='full', customers_rebuilt=len(customers))
+
+    state['frame'], state['customers'], state['taxonomy'] = data, customers, taxonomy
+    summary['customers_total'] = len(customers)
+    summary['seconds'] = round(time.perf_counter() - start, 4)
+    log.info(f"🧮 Dashboard transform ({summary['mode']}): rebuilt {summary['customers_rebuilt']}"
+             f"/{summary['customers_total']} customers in {summary['seconds']:.2f}s")
+
+    transformed_data = [entry for entries in customers.values() for entry in entries]
+    return transformed_data, summary
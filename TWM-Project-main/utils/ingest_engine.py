@@ -0,0 +1,191 @@
+# utils/ingest_engine.py
+
+import numpy as np
+import pandas as pd
+from utils.period_buckets import PeriodTable
+from utils.sample_tokens import parse_count
+from utils.plan_model import Customer, MonthCell, ParameterCell, PlanRow
+from utils.workbook_schema import SOURCE_COLUMN, get_workbook_schema
+
+
+def map_distinct(series, func, dtype=object):
+    """Apply func once per distinct value of a column and broadcast the results back to every row"""
+    codes, uniques = pd.factorize(series)
+    # Index.tolist() hands out Python scalars / Timestamps, the same objects iterrows() would see
+    mapped = [func(value) for value in pd.Index(uniques).tolist()]
+    mapped.append(func(np.nan))  # code -1 marks missing values
+    return np.array(mapped, dtype=dtype)[codes]
+
+
+def is_blank(value):
+    """True for NaN/None or whitespace-only cells"""
+    return pd.isna(value) or str(value).strip() == ""
+
+
+def _clean_str(value):
+    return str(value).strip()
+
+
+def _to_int_or_zero(value):
+    try:
+        return int(value) if not pd.isna(value) else 0
+    except Exception:
+        return 0
+
+
+def _is_kw_zero(value):
+    return pd.isna(value) or (isinstance(value, (int, float)) and value == 0)
+
+
+def _column_or_default(data, column, default):
+    """Return a column as a Series, or a constant Series when the sheet does not have it"""
+    if column is not None and column in data.columns:
+        return data[column]
+    return pd.Series([default] * len(data), index=data.index, dtype=object)
+
+
+def _sorted_codes(series, na_last=False):
+    """Factorize a key column in sorted order; missing values get -1 (or the last code if na_last)"""
+    codes, uniques = pd.factorize(series, sort=True)
+    keys = pd.Index(uniques).tolist()
+    if na_last:
+        codes = np.where(codes < 0, len(keys), codes)
+        keys.append(np.nan)
+    return codes, keys
+
+
+def _excluded_months(data, schema):
+    """Per month, a row mask of months to hide: KW empty/0 *and* no Ist and no Datum entry"""
+    n_rows = len(data)
+    blank_cache = {}
+
+    def blank_mask(column):
+        if column is None:
+            return np.ones(n_rows, dtype=bool)
+        if column not in blank_cache:
+            blank_cache[column] = map_distinct(data[column], is_blank, dtype=bool)
+        return blank_cache[column]
+
+    excluded = {}
+    for month, columns in schema.months.items():
+        for kw_col in columns.kw:
+            kw_zero = map_distinct(data[kw_col], _is_kw_zero, dtype=bool)
+            mask = kw_zero & blank_mask(columns.ist) & blank_mask(columns.datum)
+            excluded[month] = excluded[month] | mask if month in excluded else mask
+    return excluded
+
+
+def build_customers(data, schema=None):
+    """
+    Vectorized transform of a plan sheet into Customer -> PlanRow -> ParameterCell records.
+
+    Holds the same data as the row-by-row transform (Customer.to_dict() gives its structure back):
+    month columns are melted into one long table and exclusions, completed counts and month cells
+    are computed per column. Customer splitting into parameter groups is left to the caller.
+    """
+    data = data.reset_index(drop=True)
+    n_rows = len(data)
+    if schema is None:
+        schema = get_workbook_schema(data.columns)
+
+    # Group keys in the same order as the nested Kunde -> Messstelle -> Zapfstelle groupby
+    kunde_codes, kunde_keys = _sorted_codes(data["Kunde"])
+    mess_codes, mess_keys = _sorted_codes(data["Messstelle"])
+    zapf_codes, zapf_keys = _sorted_codes(data["Zapfstelle"], na_last=True)
+
+    # Row filters: Proben/Häufigkeit both empty, or no usable Parameter name
+    proben_raw = _column_or_default(data, schema.total_column, None)
+    freq_raw = _column_or_default(data, schema.frequency_column, None)
+    no_plan = map_distinct(proben_raw, is_blank, dtype=bool) & map_distinct(freq_raw, is_blank, dtype=bool)
+
+    parameters = map_distinct(_column_or_default(data, "Parameter", ""), _clean_str)
+    valid_name = ~np.isin(np.char.lower(parameters.astype(str)), ["", "nan", "none"])
+
+    keep = (kunde_codes >= 0) & (mess_codes >= 0) & ~no_plan & valid_name
+    rows = np.flatnonzero(keep)
+    if rows.size:
+        group_order = np.lexsort((rows, zapf_codes[rows], mess_codes[rows], kunde_codes[rows]))
+        rows = rows[group_order]
+
+    # One entry per (Messstelle/Zapfstelle group, Parameter); scalar fields come from its first row
+    kunde_sorted, mess_sorted, zapf_sorted = kunde_codes[rows], mess_codes[rows], zapf_codes[rows]
+    new_group = np.ones(rows.size, dtype=bool)
+    new_group[1:] = ((kunde_sorted[1:] != kunde_sorted[:-1]) | (mess_sorted[1:] != mess_sorted[:-1])
+                     | (zapf_sorted[1:] != zapf_sorted[:-1]))
+    group_ids = np.cumsum(new_group) - 1
+    entry_ids = pd.DataFrame({"group": group_ids, "parameter": parameters[rows]}).groupby(
+        ["group", "parameter"], sort=False).ngroup().to_numpy()
+    _, first_pos = np.unique(entry_ids, return_index=True)
+    first_rows = rows[first_pos]
+
+    completed_raw = data[schema.current_column] if schema.current_column else pd.Series(0, index=data.index)
+
+    proben_gesamt = map_distinct(proben_raw, _to_int_or_zero)[first_rows]
+    completed = map_distinct(completed_raw, parse_count)[first_rows]
+    pn_type = map_distinct(_column_or_default(data, schema.pn_column, ""), _clean_str)[first_rows]
+    haeufigkeit = map_distinct(_column_or_default(data, schema.frequency_column, ""), _clean_str)[first_rows]
+    entry_valid = ~((proben_gesamt == 0) & (completed == 0))
+
+    month_data = [{} for _ in range(len(first_rows))]
+
+    # Melt month cells into a long table (row position, column position, entry) of non-empty values
+    excluded = _excluded_months(data, schema)
+    row_entry = np.full(n_rows, -1)
+    row_entry[rows] = entry_ids
+    row_usable = np.zeros(n_rows, dtype=bool)
+    row_usable[rows] = entry_valid[entry_ids]
+
+    long_rows, long_cols = [], []
+    column_values = {}
+    for position, col, month, col_type in schema.month_columns:
+        mask = row_usable & data[col].notna().to_numpy()
+        if month in excluded:
+            mask &= ~excluded[month]
+        hit = np.flatnonzero(mask)
+        if hit.size:
+            long_rows.append(hit)
+            long_cols.append(np.full(hit.size, position))
+            column_values[position] = (month, col_type, data[col].tolist())
+
+    long_row = np.concatenate(long_rows) if long_rows else np.zeros(0, dtype=np.int64)
+    long_col = np.concatenate(long_cols) if long_cols else np.zeros(0, dtype=np.int64)
+    # Later rows and later columns overwrite earlier ones, exactly as in the row loop
+    order = np.lexsort((long_col, long_row))
+    long_row, long_col = long_row[order], long_col[order]
+    if long_rows:
+        for row, position in zip(long_row.tolist(), long_col.tolist()):
+            month, col_type, values = column_values[position]
+            value = values[row]
+            months = month_data[row_entry[row]]
+            if month not in months:
+                months[month] = MonthCell(month)
+            months[month].set(col_type, value)
+
+    # Samples and dates per month / quarter / half-year, for all entries at once
+    periods = PeriodTable.from_records(len(first_rows), row_entry[long_row], long_row, long_col, column_values)
+
+    # Assemble customers -> rows -> parameters
+    entry_params = parameters[first_rows].tolist()
+    entry_groups = group_ids[first_pos].tolist()
+    entry_kunden = kunde_sorted[first_pos].tolist()
+
+    customers = [Customer(kunde) for kunde in kunde_keys]
+    if SOURCE_COLUMN in data.columns:
+        # Merged multi-sheet/multi-workbook upload: files (and sheets) each customer comes from
+        tagged = kunde_codes >= 0
+        sources = pd.Series(data[SOURCE_COLUMN].to_numpy(dtype=object)[tagged]).groupby(kunde_codes[tagged]).unique()
+        for code, kunde_sources in sources.items():
+            customers[code].sources = sorted(str(source) for source in kunde_sources)
+    current_group, plan_row = None, None
+    for entry in np.flatnonzero(entry_valid).tolist():
+        if entry_groups[entry] != current_group:
+            current_group = entry_groups[entry]
+            row = first_rows[entry]
+            plan_row = PlanRow(mess_keys[mess_codes[row]], zapf_keys[zapf_codes[row]])
+            customers[entry_kunden[entry]].rows.append(plan_row)
+        cell = ParameterCell(proben_gesamt[entry], completed[entry], pn_type[entry], haeufigkeit[entry],
+                             month_data[entry].values())
+        cell.attach_periods(periods, entry)
+        plan_row.parameters[entry_params[entry]] = cell
+
+    return customers
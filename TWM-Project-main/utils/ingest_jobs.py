@@ -0,0 +1,253 @@
+# utils/ingest_jobs.py
+
+import io
+import multiprocessing
+import os
+import threading
+import time
+import uuid
+from collections import OrderedDict
+from concurrent.futures import ProcessPoolExecutor, wait, FIRST_EXCEPTION
+from concurrent.futures.process import BrokenProcessPool
+from config.constants import INGEST_WORKERS, INGEST_JOB_HISTORY
+from utils.excel_reader import read_workbook
+from utils.ingest_log import get_logger, StageTimer
+from utils.ingest_store import ingest_workbook, ingest_sources, claim_plan
+from utils.upload_cache import source_bytes, source_path, spool_upload
+
+log = get_logger("ingest_jobs")
+
+JOB_QUEUED = "queued"
+JOB_RUNNING = "running"
+JOB_DONE = "done"
+JOB_FAILED = "failed"
+JOB_CANCELLED = "cancelled"
+
+# Percent done when a stage starts (dashboard: read -> transform, map: read -> analyze ... cluster)
+STAGE_PROGRESS = {
+    'queued': 0,
+    'read': 5,
+    'analyze': 55,
+    'clean': 60,
+    'group': 70,
+    'prepass': 75,
+    'assemble': 85,
+    'cluster': 95,
+    'transform': 60,
+    'done': 100
+}
+
+
+class JobCancelled(Exception):
+    """Raised inside a job that was superseded by a newer upload of the same plan"""
+
+
+def _read_in_worker(source, sheet_name=0):
+    """Excel read of one sheet in a pool process: source is a file path or the bytes of a small upload"""
+    return read_workbook(io.BytesIO(source) if isinstance(source, bytes) else source, sheet_name=sheet_name)
+
+
+def plan_key(*source_names, scope=None):
+    """Uploads with the same file name(s) (in the same scope, e.g. dashboard session) are versions of the same plan"""
+    plan = "+".join(sorted(os.path.basename(name or "").strip().lower() for name in source_names))
+    return plan if scope is None else f"{scope}:{plan}"
+
+
+class IngestJob:
+    """One background upload: state, stage and percent done as reported on /jobs/<id>"""
+
+    def __init__(self, source_name, plan):
+        self.id = uuid.uuid4().hex[:12]
+        self.source_name = source_name
+        self.plan = plan
+        self.status = JOB_QUEUED
+        self.stage = 'queued'
+        self.percent = 0
+        self.error = None
+        self.version = None
+        self.result = None
+        self.created = time.time()
+        # Orders uploads of the same plan across app processes (see claim_plan)
+        self.submitted = time.time_ns()
+        self.finished = None
+        self.timer = StageTimer(on_stage=self.enter_stage)
+        self._cancelled = threading.Event()
+        self._futures = []
+
+    def enter_stage(self, name):
+        self.stage = name
+        self.percent = max(self.percent, STAGE_PROGRESS.get(name, self.percent))
+
+    @property
+    def active(self):
+        return self.status in (JOB_QUEUED, JOB_RUNNING)
+
+    def cancel(self):
+        """Ask the job to stop; reads that have not started in the pool are dropped right away"""
+        self._cancelled.set()
+        for future in self._futures:
+            future.cancel()
+
+    def raise_if_cancelled(self):
+        if self._cancelled.is_set():
+            raise JobCancelled(f"superseded by a newer upload of '{self.source_name}'")
+
+    def claim(self):
+        """Run under the publish lock: refuse to publish once a newer upload of the plan exists"""
+        self.raise_if_cancelled()
+        if not claim_plan(self.plan, self.submitted):
+            raise JobCancelled(f"a newer upload of '{self.source_name}' was published already")
+
+    def as_dict(self, with_result=True):
+        return {
+            'id': self.id,
+            'source': self.source_name,
+            'status': self.status,
+            'stage': self.stage,
+            'percent': self.percent,
+            'error': self.error,
+            'data_version': self.version,
+            'result': self.result if with_result else None,
+            'timings': self.timer.as_dict() if self.finished else None,
+            'seconds': round((self.finished or time.time()) - self.created, 2)
+        }
+
+
+class IngestJobQueue:
+    """
+    Runs uploads in the background: the Excel read in a process pool, publishing and building the
+    app's view in a job thread. A newer upload of the same plan cancels the older, unfinished job.
+    """
+
+    def __init__(self, max_workers=INGEST_WORKERS, history=INGEST_JOB_HISTORY):
+        self.max_workers = max_workers
+        self.history = history
+        self._jobs = OrderedDict()
+        self._lock = threading.Lock()
+        self._pool = None
+
+    def _get_pool(self):
+        if self.max_workers <= 0:
+            return None
+        with self._lock:
+            if self._pool is None:
+                self._pool = ProcessPoolExecutor(max_workers=self.max_workers,
+                                                 mp_context=multiprocessing.get_context("spawn"))
+            return self._pool
+
+    def submit(self, source, source_name, on_ready, scope=None):
+        """
+        Start ingesting source (a file-like buffer the job closes when done) in the background.
+
+        on_ready(job, version, df, digest) builds and swaps in the app's dataset once the upload
+        is published; whatever it returns is reported as the job's result. Only uploads in the
+        same scope supersede each other.
+        """
+        job = IngestJob(source_name, plan_key(source_name, scope=scope))
+        reader = lambda src: self._read_sheets(job, [(source_name, src, 0)])[0]
+        return self._start(job, lambda: ingest_workbook(source, source_name, reader=reader, claim=job.claim),
+                           [source], on_ready)
+
+    def submit_sources(self, sources, on_ready, all_sheets=False, scope=None):
+        """
+        Like submit, for several (name, file-like) workbooks merged into one dataset; with
+        all_sheets every sheet of every workbook is read. Sheets are parsed in parallel.
+        """
+        names = [name for name, source in sources]
+        job = IngestJob(" + ".join(names), plan_key(*names, scope=scope))
+        ingest = lambda: ingest_sources(sources, all_sheets,
+                                        read_sheets=lambda tasks: self._read_sheets(job, tasks), claim=job.claim)
+        return self._start(job, ingest, [source for name, source in sources], on_ready)
+
+    def submit_uploads(self, files, on_ready, all_sheets=False, scope=None):
+        """Submit uploaded files (with .filename and .stream): a single workbook as is, several merged"""
+        sources = [(file.filename, spool_upload(file.stream)) for file in files]
+        if len(sources) == 1 and not all_sheets:
+            return self.submit(sources[0][1], sources[0][0], on_ready, scope)
+        return self.submit_sources(sources, on_ready, all_sheets, scope)
+
+    def _start(self, job, ingest, buffers, on_ready):
+        with self._lock:
+            for other in self._jobs.values():
+                if other.active and other.plan == job.plan:
+                    log.info(f"🛑 Cancelling job {other.id}: superseded by job {job.id}")
+                    other.cancel()
+            self._jobs[job.id] = job
+            while len(self._jobs) > self.history:
+                oldest = next(iter(self._jobs.values()))
+                if oldest.active:
+                    break
+                self._jobs.popitem(last=False)
+
+        thread = threading.Thread(target=self._run, args=(job, ingest, buffers, on_ready),
+                                  name=f"ingest-{job.id}", daemon=True)
+        thread.start()
+        log.info(f"📨 Ingest job {job.id} queued for '{job.source_name}'")
+        return job
+
+    def _read_sheets(self, job, tasks):
+        """
+        Excel reads of (tag, file-like, sheet) tasks: spread over the pool if there is one, polling
+        for cancellation and counting finished sheets into the job's percent done.
+        """
+        pool = self._get_pool()
+        if pool is None:
+            return [read_workbook(source, sheet_name=sheet) for tag, source, sheet in tasks]
+
+        try:
+            # Spilled uploads reach the workers by path; only in-memory ones (below the spool limit) as bytes
+            payloads = {}
+            for tag, source, sheet in tasks:
+                if id(source) not in payloads:
+                    payloads[id(source)] = source_path(source) or source_bytes(source)
+            job._futures = [pool.submit(_read_in_worker, payloads[id(source)], sheet) for tag, source, sheet in tasks]
+            start_percent = job.percent
+            while True:
+                done, pending = wait(job._futures, timeout=0.2, return_when=FIRST_EXCEPTION)
+                job.raise_if_cancelled()
+                job.percent = max(job.percent, start_percent + (STAGE_PROGRESS['analyze'] - start_percent)
+                                  * len(done) // len(job._futures))
+                if not pending or any(future.exception() for future in done):
+                    return [future.result() for future in job._futures]
+        except BrokenProcessPool as e:
+            log.warning(f"⚠️ Ingest worker pool failed, reading in the job thread: {e}")
+            with self._lock:
+                self._pool = None
+            return [read_workbook(source, sheet_name=sheet) for tag, source, sheet in tasks]
+
+    def _run(self, job, ingest, buffers, on_ready):
+        job.status = JOB_RUNNING
+        try:
+            job.raise_if_cancelled()
+            with job.timer.stage('read'):
+                version, df, digest = ingest()
+            job.version = version
+            job.raise_if_cancelled()
+            job.result = on_ready(job, version, df, digest)
+            job.status = JOB_DONE
+            job.enter_stage('done')
+            log.info(f"✅ Ingest job {job.id} finished: {job.timer.summary()}")
+        except JobCancelled as e:
+            job.status, job.stage, job.error = JOB_CANCELLED, 'cancelled', str(e)
+            log.info(f"🛑 Ingest job {job.id} cancelled ({e})")
+        except Exception as e:
+            job.status, job.error = JOB_FAILED, str(e)
+            log.error(f"❌ Ingest job {job.id} failed: {e}")
+        finally:
+            job.finished = time.time()
+            for source in buffers:
+                if hasattr(source, "close"):
+                    source.close()
+
+    def get(self, job_id):
+        with self._lock:
+            return self._jobs.get(job_id)
+
+    def jobs(self):
+        """Known jobs (without their results), newest first"""
+        with self._lock:
+            return [job.as_dict(with_result=False) for job in reversed(self._jobs.values())]
+
+
+# One queue per app process
+INGEST_JOBS = IngestJobQueue()
@@ -0,0 +1,60 @@
+# utils/ingest_log.py
+
+import logging
+import sys
+import time
+from contextlib import contextmanager
+from config.constants import LOG_LEVEL
+
+ROOT_LOGGER = "twm"
+
+
+def get_logger(name):
+    """Logger below the shared 'twm' logger: plain messages on stdout, level from TWM_LOG_LEVEL"""
+    root = logging.getLogger(ROOT_LOGGER)
+    if not root.handlers:
+        handler = logging.StreamHandler(sys.stdout)
+        handler.setFormatter(logging.Formatter("%(message)s"))
+        root.addHandler(handler)
+        root.setLevel(LOG_LEVEL)
+        root.propagate = False
+    return root.getChild(name)
+
+
+def set_log_level(level):
+    """Change the level of every TWM logger at runtime (e.g. "DEBUG" while investigating an upload)"""
+    logging.getLogger(ROOT_LOGGER).setLevel(level.upper() if isinstance(level, str) else level)
+
+
+class StageTimer:
+    """Wall-clock timings of the ingest stages of one upload, in the order they ran (on_stage(name) is called as each starts)"""
+
+    def __init__(self, on_stage=None):
+        self.stages = {}
+        self.on_stage = on_stage
+        self._started = time.perf_counter()
+
+    @contextmanager
+    def stage(self, name):
+        if self.on_stage is not None:
+            self.on_stage(name)
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.record(name, time.perf_counter() - start)
+
+    def record(self, name, seconds):
+        self.stages[name] = round(self.stages.get(name, 0.0) + seconds, 4)
+
+    def as_dict(self):
+        """Stage seconds plus the total time since the timer was created"""
+        return {
+            'stages': dict(self.stages),
+            'total_seconds': round(time.perf_counter() - self._started, 4)
+        }
+
+    def summary(self):
+        """One log line with every stage"""
+        stages = " | ".join(f"{name} {seconds:.2f}s" for name, seconds in self.stages.items())
+        return f"⏱️ {stages} (total {time.perf_counter() - self._started:.2f}s)"
@@ -0,0 +1,413 @@
+# utils/ingest_store.py
+
+import datetime
+import json
+import os
+import threading
+from contextlib import contextmanager
+import numpy as np
+import pandas as pd
+from config.constants import DATA_DIR, ARTIFACT_KEEP_VERSIONS
+from utils.excel_reader import read_workbook, list_sheets, merge_sheets
+from utils.ingest_log import get_logger
+from utils.upload_cache import UPLOAD_CACHE, content_digest, source_digest
+
+log = get_logger("ingest_store")
+
+try:
+    import pyarrow as pa
+
+    ARROW_AVAILABLE = True
+except ImportError:
+    ARROW_AVAILABLE = False
+    log.warning("⚠️ pyarrow not available, ingest artifacts fall back to pickle. Install with: pip install pyarrow")
+
+try:
+    import fcntl
+except ImportError:  # Windows: single-process dev server only
+    fcntl = None
+
+MANIFEST_NAME = "manifest.json"
+PUBLISH_LOCK_NAME = ".publish.lock"
+# Plan -> submission time of the last upload published for it (shared by all app processes)
+PLANS_NAME = "plans.json"
+PLAN_HISTORY = 256
+
+# The last snapshot loaded or published in this process: its encoded columns (for Arrow snapshots
+# the memory-mapped table), their specs, the columns decoded so far and the frames handed out
+_LOADED = {'version': None, 'encoded': None, 'specs': [], 'rows': 0, 'columns': {}, 'frames': {}}
+_LOAD_LOCK = threading.Lock()
+_MANIFEST_CACHE = {'mtime': None, 'manifest': None}
+# Background ingest jobs may publish concurrently; versions are assigned one at a time
+_PUBLISH_LOCK = threading.Lock()
+
+
+def _manifest_path():
+    return os.path.join(DATA_DIR, MANIFEST_NAME)
+
+
+def _value_kind(value):
+    """Storage kind of a single cell in an object column"""
+    if isinstance(value, str):
+        return "str"
+    if isinstance(value, (bool, np.bool_)):
+        return "bool"
+    if isinstance(value, (int, np.integer)):
+        return "int"
+    if isinstance(value, (float, np.floating)):
+        return "float"
+    if isinstance(value, datetime.datetime):
+        return "datetime"
+    return "repr"
+
+
+def _encode_frame(df):
+    """
+    Encode a workbook frame into Parquet-friendly columns.
+
+    Excel columns often mix cell types (Datum holds dates and "13.03.2025; 20.03.2025" strings),
+    so object columns are split into one typed part per kind and put back together on load.
+    """
+    encoded = {}
+    specs = []
+    for position, name in enumerate(df.columns):
+        series = df[name]
+        key = f"c{position}"
+
+        if series.dtype != object:
+            encoded[key] = series.reset_index(drop=True)
+            specs.append({'name': name, 'parts': ['native']})
+            continue
+
+        present = series.notna().to_numpy()
+        kinds = np.array([_value_kind(v) if ok else "" for v, ok in zip(series.tolist(), present)], dtype=object)
+        parts = sorted(set(kinds[present].tolist()))
+
+        if parts in ([], ['str']):
+            encoded[key] = series.reset_index(drop=True).astype(object)
+            specs.append({'name': name, 'parts': ['native']})
+            continue
+
+        values = series.to_numpy(dtype=object)
+        for kind in parts:
+            mask = kinds == kind
+            part_values = np.where(mask, values, None)
+            if kind == "int":
+                part = pd.array([int(v) if v is not None else None for v in part_values], dtype="Int64")
+            elif kind == "float":
+                part = pd.array([float(v) if v is not None else None for v in part_values], dtype="Float64")
+            elif kind == "bool":
+                part = pd.array([bool(v) if v is not None else None for v in part_values], dtype="boolean")
+            elif kind == "datetime":
+                part = pd.to_datetime(pd.Series(part_values, dtype=object))
+            else:
+                part = pd.Series([str(v) if v is not None else None for v in part_values], dtype=object)
+            encoded[f"{key}__{kind}"] = part
+        specs.append({'name': name, 'parts': parts})
+
+    return pd.DataFrame(encoded), specs
+
+
+def _encoded_parts(encoded, keys):
+    """Encoded columns as pandas; numeric Arrow columns without nulls stay views of the mapped file"""
+    if isinstance(encoded, pd.DataFrame):
+        return encoded[keys]
+    return encoded.select(keys).to_pandas(split_blocks=True, self_destruct=True)
+
+
+def _part_keys(position, spec):
+    key = f"c{position}"
+    return [key] if spec['parts'] == ['native'] else [f"{key}__{kind}" for kind in spec['parts']]
+
+
+def _decode_columns(encoded, columns, n_rows):
+    """Rebuild workbook columns, given as (position, spec) pairs, from their typed parts"""
+    if not columns:
+        return {}
+    parts = _encoded_parts(encoded, [key for position, spec in columns for key in _part_keys(position, spec)])
+    decoded = {}
+    for position, spec in columns:
+        key = f"c{position}"
+        if spec['parts'] == ['native']:
+            decoded[spec['name']] = parts[key]
+            continue
+
+        values = np.full(n_rows, np.nan, dtype=object)
+        for kind in spec['parts']:
+            part = parts[f"{key}__{kind}"]
+            mask = part.notna().to_numpy()
+            if kind == "datetime":
+                values[mask] = [ts.to_pydatetime() for ts in part[mask]]
+            elif kind == "str" or kind == "repr":
+                values[mask] = part[mask].tolist()
+            else:
+                values[mask] = part[mask].astype(object).tolist()
+        decoded[spec['name']] = pd.Series(values, dtype=object)
+    return decoded
+
+
+def read_manifest():
+    """Current artifact manifest, or None if nothing has been ingested yet"""
+    path = _manifest_path()
+    try:
+        mtime = os.path.getmtime(path)
+    except OSError:
+        return None
+
+    if _MANIFEST_CACHE['mtime'] != mtime:
+        with open(path, encoding="utf-8") as fh:
+            _MANIFEST_CACHE['manifest'] = json.load(fh)
+        _MANIFEST_CACHE['mtime'] = mtime
+    return _MANIFEST_CACHE['manifest']
+
+
+def current_version():
+    """Version number of the latest ingested workbook (0 if none)"""
+    manifest = read_manifest()
+    return manifest['version'] if manifest else 0
+
+
+def current_digest():
+    """SHA-256 of the workbook behind the latest artifact (None if unknown)"""
+    manifest = read_manifest()
+    return manifest.get('sha256') if manifest else None
+
+
+def _write_artifact(encoded, path):
+    if ARROW_AVAILABLE:
+        # Uncompressed Arrow IPC file: readers memory-map it instead of decompressing it
+        table = pa.Table.from_pandas(encoded, preserve_index=False)
+        with pa.OSFile(path, "wb") as sink, pa.ipc.new_file(sink, table.schema) as writer:
+            writer.write_table(table)
+    else:
+        encoded.to_pickle(path)
+
+
+def _read_artifact(path, artifact_format):
+    """Encoded columns of an artifact: the memory-mapped table of an Arrow snapshot, else a DataFrame"""
+    if artifact_format == "arrow":
+        with pa.memory_map(path, "r") as source:
+            # The table's buffers keep the mapping alive once the file is closed (or pruned)
+            return pa.ipc.open_file(source).read_all()
+    if artifact_format == "parquet":
+        # Artifacts published before the switch to Arrow IPC snapshots
+        return pd.read_parquet(path)
+    return pd.read_pickle(path)
+
+
+@contextmanager
+def _publish_lock():
+    """Serialize publishing across threads and, where file locks exist, across worker processes"""
+    with _PUBLISH_LOCK:
+        if fcntl is None:
+            yield
+            return
+        with open(os.path.join(DATA_DIR, PUBLISH_LOCK_NAME), "a") as lock_file:
+            fcntl.flock(lock_file, fcntl.LOCK_EX)
+            try:
+                yield
+            finally:
+                fcntl.flock(lock_file, fcntl.LOCK_UN)
+
+
+def claim_plan(plan, submitted):
+    """
+    Record that an upload of plan submitted at submitted (time.time_ns) is being published; False if a
+    newer upload of the same plan was published already. Call under the publish lock (see publish_frame).
+    """
+    path = os.path.join(DATA_DIR, PLANS_NAME)
+    try:
+        with open(path, encoding="utf-8") as fh:
+            plans = json.load(fh)
+    except (OSError, ValueError):
+        plans = {}
+
+    if plans.get(plan, 0) > submitted:
+        return False
+
+    plans[plan] = submitted
+    if len(plans) > PLAN_HISTORY:
+        plans = dict(sorted(plans.items(), key=lambda item: item[1])[-PLAN_HISTORY:])
+    tmp_path = path + ".tmp"
+    with open(tmp_path, "w", encoding="utf-8") as fh:
+        json.dump(plans, fh, ensure_ascii=False)
+    os.replace(tmp_path, path)
+    return True
+
+
+def _prune_old_artifacts(keep_version):
+    """Remove artifacts older than the last ARTIFACT_KEEP_VERSIONS versions"""
+    for filename in os.listdir(DATA_DIR):
+        if not filename.startswith("plan_v"):
+            continue
+        try:
+            version = int(filename[len("plan_v"):].split(".")[0])
+        except ValueError:
+            continue
+        if version <= keep_version - ARTIFACT_KEEP_VERSIONS:
+            try:
+                os.remove(os.path.join(DATA_DIR, filename))
+            except OSError:
+                pass
+
+
+def publish_frame(df, source_name=None, reader_info=None, digest=None, claim=None):
+    """
+    Write a workbook frame as the next (immutable) artifact version and return that version.
+
+    claim() runs under the publish lock right before anything is written and raises to refuse
+    publishing (e.g. when a newer upload of the same plan exists).
+    """
+    os.makedirs(DATA_DIR, exist_ok=True)
+    with _publish_lock():
+        if claim is not None:
+            claim()
+        version = current_version() + 1
+        artifact_format = "arrow" if ARROW_AVAILABLE else "pickle"
+        artifact_name = f"plan_v{version}.{artifact_format}"
+
+        encoded, specs = _encode_frame(df)
+        tmp_path = os.path.join(DATA_DIR, f".{artifact_name}.tmp")
+        _write_artifact(encoded, tmp_path)
+        os.replace(tmp_path, os.path.join(DATA_DIR, artifact_name))
+
+        manifest = {
+            'version': version,
+            'artifact': artifact_name,
+            'format': artifact_format,
+            'source': source_name,
+            'sha256': digest,
+            'created': datetime.datetime.now().isoformat(timespec="seconds"),
+            'rows': int(len(df)),
+            'reader': reader_info,
+            'columns': specs
+        }
+        tmp_manifest = _manifest_path() + ".tmp"
+        with open(tmp_manifest, "w", encoding="utf-8") as fh:
+            json.dump(manifest, fh, ensure_ascii=False, indent=1)
+        os.replace(tmp_manifest, _manifest_path())
+
+        with _LOAD_LOCK:
+            _LOADED.update(version=version, encoded=None, specs=specs, rows=len(df),
+                           columns={name: df[name] for name in df.columns}, frames={tuple(df.columns): df})
+        _prune_old_artifacts(version)
+        log.info(f"💾 Ingested '{source_name}' as artifact v{version} ({len(df)} rows, {artifact_format})")
+        return version
+
+
+def _ingest(digest, source_name, read, claim=None):
+    """Publish the workbook(s) behind digest, reading them with read() only if not seen before"""
+    if digest == current_digest():
+        # Nothing is rewritten, but the upload still claims its plan, so older uploads of it are refused
+        with _publish_lock():
+            if claim is not None:
+                claim()
+            unchanged = digest == current_digest()
+        if unchanged:
+            version, df = load_frame()
+            log.info(f"♻️ '{source_name}' is unchanged (sha256 {digest[:12]}), keeping artifact v{version}")
+            return version, df, digest
+
+    cached = UPLOAD_CACHE.get('frame', digest)
+    if cached is not None:
+        df, reader_info = cached
+        reader_info = dict(reader_info, cached=True)
+        log.info(f"⚡ '{source_name}' found in upload cache (sha256 {digest[:12]}), skipping Excel read")
+    else:
+        df, reader_info = read()
+        UPLOAD_CACHE.put('frame', digest, (df, reader_info))
+
+    version = publish_frame(df, source_name, reader_info, digest, claim)
+    return version, df, digest
+
+
+def ingest_workbook(source, source_name=None, reader=read_workbook, claim=None):
+    """
+    Read a workbook (path or file-like) once and publish it; returns (version, DataFrame, digest).
+
+    Re-uploading the workbook behind the current artifact reuses that version, and a workbook
+    seen recently by this process is republished from the upload cache without re-reading it.
+    reader(source) -> (DataFrame, info) does the actual Excel read (e.g. in a worker process);
+    claim is passed on to publish_frame.
+    """
+    return _ingest(source_digest(source), source_name, lambda: reader(source), claim)
+
+
+def _read_sheets_in_order(tasks):
+    return [read_workbook(source, sheet_name=sheet) for tag, source, sheet in tasks]
+
+
+def ingest_sources(sources, all_sheets=False, read_sheets=_read_sheets_in_order, claim=None):
+    """
+    Read several workbooks (and with all_sheets every sheet of each) into one dataset and publish it.
+
+    sources is a list of (name, file-like). Rows are tagged with their file (and sheet) in
+    SOURCE_COLUMN. read_sheets(tasks) -> [(DataFrame, info)] reads a list of (tag, file-like,
+    sheet) tasks, e.g. in parallel; claim is passed on to publish_frame. Returns (version,
+    DataFrame, digest).
+    """
+    digests = [source_digest(source) for name, source in sources]
+    digest = content_digest("|".join(digests + [f"all_sheets={all_sheets}"]).encode())
+    source_name = " + ".join(name for name, source in sources)
+
+    def read():
+        tasks = []
+        for name, source in sources:
+            sheets = list_sheets(source) if all_sheets else [0]
+            for sheet in sheets:
+                tasks.append((name if len(sheets) == 1 else f"{name}:{sheet}", source, sheet))
+        results = read_sheets(tasks)
+        return merge_sheets([(tag, df, info) for (tag, source, sheet), (df, info) in zip(tasks, results)])
+
+    return _ingest(digest, source_name, read, claim)
+
+
+def _loaded_frame(exclude=()):
+    """Frame of the loaded snapshot without the excluded columns, decoding each column once"""
+    names = tuple(spec['name'] for spec in _LOADED['specs'] if spec['name'] not in exclude)
+    frame = _LOADED['frames'].get(names)
+    if frame is None:
+        decoded = _LOADED['columns']
+        missing = [(position, spec) for position, spec in enumerate(_LOADED['specs'])
+                   if spec['name'] in names and spec['name'] not in decoded]
+        decoded.update(_decode_columns(_LOADED['encoded'], missing, _LOADED['rows']))
+        frame = _LOADED['frames'][names] = pd.DataFrame({name: decoded[name] for name in names}, copy=False)
+    return frame
+
+
+def frame_of(version, df, exclude=()):
+    """df without the excluded columns; the frame every caller shares if df is the loaded version"""
+    with _LOAD_LOCK:
+        if _LOADED['version'] == version:
+            return _loaded_frame(exclude)
+    return df.drop(columns=[name for name in exclude if name in df.columns])
+
+
+def loaded_frames():
+    """Frames of the loaded snapshot handed out in this process (shared by all their users)"""
+    with _LOAD_LOCK:
+        return list(_LOADED['frames'].values())
+
+
+def load_frame(exclude=()):
+    """
+    Load the current artifact; returns (version, DataFrame) or (0, None) if nothing was ingested.
+
+    Every process (e.g. each gunicorn worker) checks the manifest version and memory-maps a newer
+    Arrow snapshot itself, so the pages of the snapshot are shared between processes. Only the
+    columns a frame needs (all but exclude) are converted to pandas, each once per process:
+    numeric columns without gaps stay read-only views of the mapped file, text and mixed-type
+    columns are decoded into Python objects.
+    """
+    manifest = read_manifest()
+    if not manifest:
+        return 0, None
+
+    version = manifest['version']
+    with _LOAD_LOCK:
+        if _LOADED['version'] != version:
+            path = os.path.join(DATA_DIR, manifest['artifact'])
+            _LOADED.update(version=version, encoded=_read_artifact(path, manifest['format']),
+                           specs=manifest['columns'], rows=manifest['rows'], columns={}, frames={})
+            log.info(f"📂 Loaded artifact v{version} ({manifest['rows']} rows, {manifest['format']})")
+        return version, _loaded_frame(exclude)
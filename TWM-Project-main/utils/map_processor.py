@@ -0,0 +1,188 @@
+# utils/map_processor.py
+
+import numpy as np
+import pandas as pd
+from config.constants import KW_RANGES
+from utils.date_engine import parse_date
+from utils.ingest_engine import map_distinct
+from utils.workbook_schema import TOTAL_COLUMN, CURRENT_COLUMN, PN_COLUMN, FREQUENCY_COLUMN, SOURCE_COLUMN
+
+EXTRA_DATE_COLUMNS = ['Start Datum', 'aktuelles Datum']
+
+
+def safe_str_convert(value, default="Unknown"):
+    """Stripped string of a cell, default for missing values"""
+    if pd.isna(value) or value is None:
+        return default
+    return str(value).strip()
+
+
+def _to_int(value):
+    value = value if pd.notna(value) else 0
+    try:
+        return int(value)
+    except (ValueError, TypeError):
+        return 0
+
+
+def _pn_type(pn_type_raw):
+    """(display, filter) for a PN (I/E) cell"""
+    if pn_type_raw == 'I':
+        return 'Internal', 'I'
+    if pn_type_raw == 'E':
+        return 'External', 'E'
+    return pn_type_raw, pn_type_raw
+
+
+def _date_sort_key(value):
+    """Sortable number for a parsed date (datetime or Timestamp); -inf if nothing was parsed"""
+    if not value:
+        return -np.inf
+    return (value.toordinal() * 86400.0 + value.hour * 3600 + value.minute * 60 + value.second
+            + value.microsecond / 1e6)
+
+
+def _usable_date(value):
+    return pd.notna(value) and value != ''
+
+
+def _text_column(df, column):
+    """safe_str_convert of a column ("" if the sheet does not have it)"""
+    if column not in df.columns:
+        return np.full(len(df), "", dtype=object)
+    return map_distinct(df[column], safe_str_convert)
+
+
+def _raw_column(df, column, default=0):
+    if column not in df.columns:
+        return np.full(len(df), default, dtype=object)
+    return df[column].to_numpy(dtype=object)
+
+
+def _latest_dates(df, schema, current_raw):
+    """
+    Per row: most recent date over all Datum columns (dd.mm.yyyy), "Date missing" if samples were
+    taken without any date, else None. Rows whose check fails carry the exception instead.
+    """
+    columns = [schema.datum_column(month) for month in KW_RANGES]
+    columns = [col for col in columns if col and col in df.columns]
+    columns += [col for col in EXTRA_DATE_COLUMNS if col in df.columns]
+
+    n_rows = len(df)
+    best_key = np.full(n_rows, -np.inf)
+    best_text = np.full(n_rows, None, dtype=object)
+    for col in columns:
+        # Parse, sort key and display text once per distinct cell value
+        codes, uniques = pd.factorize(df[col])
+        parsed = [parse_date(value) if _usable_date(value) else None for value in pd.Index(uniques).tolist()]
+        parsed.append(None)  # code -1 marks missing values
+        keys = np.array([_date_sort_key(value) for value in parsed], dtype=float)[codes]
+        texts = np.array([value.strftime("%d.%m.%Y") if value else None for value in parsed], dtype=object)[codes]
+
+        newer = keys > best_key
+        best_key[newer] = keys[newer]
+        best_text[newer] = texts[newer]
+
+    def missing_date(aktuell_gesamt):
+        try:
+            return "Date missing" if pd.notna(aktuell_gesamt) and aktuell_gesamt > 0 else None
+        except Exception as e:
+            return e
+
+    no_date = best_key == -np.inf
+    if no_date.any():
+        fallback = map_distinct(pd.Series(current_raw[no_date], dtype=object), missing_date)
+        best_text[no_date] = fallback
+    return best_text
+
+
+def _completion_states(current_raw, total_raw, current_numeric, total_numeric):
+    """Per row: current >= total as the group completeness check sees it (the exception if it fails)"""
+    if current_numeric and total_numeric:
+        return (current_raw.astype(float) >= total_raw.astype(float)).astype(object)
+
+    states = np.empty(len(current_raw), dtype=object)
+    for position, (current, total) in enumerate(zip(current_raw.tolist(), total_raw.tolist())):
+        try:
+            states[position] = bool(current >= total)
+        except Exception as e:
+            states[position] = e
+    return states
+
+
+def derive_map_columns(df, schema):
+    """
+    Pre-pass over the cleaned map frame: every per-row value a map point needs, computed once.
+
+    Returns a dict of arrays aligned with df's rows; 'details' holds the finished parameter_detail
+    dict of every row with a usable Parameter (None otherwise).
+    """
+    n_rows = len(df)
+    current_raw = _raw_column(df, CURRENT_COLUMN)
+    total_raw = _raw_column(df, TOTAL_COLUMN)
+    current_present = pd.notna(pd.Series(current_raw, dtype=object)).to_numpy()
+    total_present = pd.notna(pd.Series(total_raw, dtype=object)).to_numpy()
+
+    def is_numeric(column):
+        return column in df.columns and pd.api.types.is_numeric_dtype(df[column]) \
+            and not pd.api.types.is_bool_dtype(df[column])
+
+    parameters = _text_column(df, 'Parameter')
+    categories = _text_column(df, 'Bereich')
+    frequencies = _text_column(df, FREQUENCY_COLUMN)
+    pn_types = _text_column(df, PN_COLUMN)
+    zapfstellen = _text_column(df, 'Zapfstelle')
+
+    current_int = map_distinct(pd.Series(current_raw, dtype=object), _to_int)
+    total_int = map_distinct(pd.Series(total_raw, dtype=object), _to_int)
+    valid = np.array([param != "Unknown" and bool(param.strip()) for param in parameters], dtype=bool)
+
+    latest_dates = np.full(n_rows, None, dtype=object)
+    if valid.any():
+        latest_dates[valid] = _latest_dates(df[valid], schema, current_raw[valid])
+
+    details = np.full(n_rows, None, dtype=object)
+    for position in np.flatnonzero(valid).tolist():
+        current, total = current_int[position], total_int[position]
+        type_display, type_filter = _pn_type(pn_types[position])
+        completion_rate = (current / total * 100) if total > 0 else 0
+        latest_date = latest_dates[position]
+
+        details[position] = {
+            'parameter': parameters[position],
+            'category': categories[position],
+            'frequency': frequencies[position],
+            'type': type_display,  # For display in popup: 'Internal' or 'External'
+            'type_filter': type_filter,  # For filtering: 'I' or 'E'
+            'zapfstelle': zapfstellen[position],
+            'current': current,  # Individual parameter current samples
+            'total': total,  # Individual parameter total samples
+            'completion_rate': completion_rate,
+            'status': 'complete' if completion_rate >= 100 else 'incomplete' if completion_rate > 0 else 'not_started',
+            # Additional metadata
+            'is_complete': completion_rate >= 100,
+            'samples_remaining': max(0, total - current),
+            'has_samples': total > 0,
+            'progress_text': f"{current}/{total}",
+            'latest_date': latest_date if not isinstance(latest_date, Exception) else None
+        }
+
+    return {
+        'valid': valid,
+        'details': details,
+        'errors': np.array([isinstance(value, Exception) for value in latest_dates], dtype=bool),
+        'latest_dates': latest_dates,
+        'parameters': parameters,
+        'categories': categories,
+        'frequencies': frequencies,
+        'pn_types': pn_types,
+        'current_raw': current_raw,
+        'total_raw': total_raw,
+        'current_present': current_present,
+        'total_present': total_present,
+        'complete': _completion_states(current_raw, total_raw, is_numeric(CURRENT_COLUMN), is_numeric(TOTAL_COLUMN)),
+        'kunden': _raw_column(df, 'Kunde', None),
+        'bereiche': _raw_column(df, 'Bereich', "Unknown"),
+        'zapfstellen_raw': _raw_column(df, 'Zapfstelle', None),
+        'sources': _raw_column(df, SOURCE_COLUMN) if SOURCE_COLUMN in df.columns else None,
+    }
@@ -0,0 +1,100 @@
+# utils/parameter_taxonomy.py
+
+import hashlib
+import json
+import os
+import re
+import unicodedata
+from config.constants import PARAMETER_TAXONOMY_FILE
+from utils.ingest_log import get_logger
+
+log = get_logger("parameter_taxonomy")
+
+_WHITESPACE = re.compile(r"\s+")
+
+# Last taxonomy loaded, reloaded when the config file changes
+_TAXONOMY_CACHE = {'path': None, 'mtime': None, 'taxonomy': None}
+
+
+def _fold(text):
+    """Case-, accent- and whitespace-insensitive form of a name"""
+    decomposed = unicodedata.normalize("NFKD", text)
+    stripped = "".join(char for char in decomposed if not unicodedata.combining(char))
+    return _WHITESPACE.sub("", stripped.casefold())
+
+
+class ParameterTaxonomy:
+    """Parameter groups and customer split rules with a precompiled normalized-name reverse index"""
+
+    def __init__(self, groups, default_group="Sonstige", split_customers=(), spelling=(), fingerprint=None):
+        self.groups = groups
+        self.default_group = default_group
+        self.fingerprint = fingerprint
+        self._spelling = [(re.compile(pattern), replacement) for pattern, replacement in spelling]
+        self._split = {self.normalize(name) for name in split_customers}
+
+        # Normalized parameter name -> group; the first group listing a name wins, as in the old list scan
+        self._index = {}
+        for group_name, parameters in groups.items():
+            for parameter in parameters:
+                key = self.normalize(parameter)
+                if key in self._index and self._index[key] != group_name:
+                    log.warning(f"⚠️ Parameter '{parameter}' is listed in '{self._index[key]}' and "
+                                f"'{group_name}', keeping '{self._index[key]}'")
+                    continue
+                self._index.setdefault(key, group_name)
+
+        # Raw parameter name -> group, so each distinct name is normalized once
+        self._memo = {}
+
+    def normalize(self, name):
+        text = str(name)
+        for pattern, replacement in self._spelling:
+            text = pattern.sub(replacement, text)
+        return _fold(text)
+
+    def group_of(self, parameter_name):
+        """Group a parameter belongs to (default_group for unmatched parameters)"""
+        try:
+            return self._memo[parameter_name]
+        except KeyError:
+            group = self._index.get(self.normalize(parameter_name), self.default_group)
+            self._memo[parameter_name] = group
+            return group
+        except TypeError:  # unhashable name
+            return self._index.get(self.normalize(parameter_name), self.default_group)
+
+    def splits(self, customer_name):
+        """True if the customer is shown split into one section per parameter group"""
+        return self.normalize(customer_name) in self._split
+
+    def summary(self):
+        return {
+            'groups': len(self.groups),
+            'parameters': len(self._index),
+            'split_customers': len(self._split),
+            'fingerprint': self.fingerprint
+        }
+
+
+def load_taxonomy(path=None):
+    """The taxonomy of the config file (cached, reloaded when the file changes)"""
+    path = path or PARAMETER_TAXONOMY_FILE
+    mtime = os.path.getmtime(path)
+    if _TAXONOMY_CACHE['path'] == path and _TAXONOMY_CACHE['mtime'] == mtime:
+        return _TAXONOMY_CACHE['taxonomy']
+
+    with open(path, "rb") as fh:
+        raw = fh.read()
+    config = json.loads(raw.decode("utf-8"))
+    taxonomy = ParameterTaxonomy(
+        config["groups"],
+        default_group=config.get("default_group", "Sonstige"),
+        split_customers=config.get("split_customers", []),
+        spelling=config.get("spelling", []),
+        fingerprint=hashlib.sha256(raw).hexdigest()[:12]
+    )
+    _TAXONOMY_CACHE.update(path=path, mtime=mtime, taxonomy=taxonomy)
+    log.info(f"🏷️ Loaded parameter taxonomy: {len(taxonomy.groups)} groups, "
+             f"{len(taxonomy._index)} parameters ({os.path.basename(path)})")
+    return taxonomy
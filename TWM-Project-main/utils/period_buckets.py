@@ -0,0 +1,190 @@
+# utils/period_buckets.py
+
+from itertools import chain
+import numpy as np
+import pandas as pd
+from config.constants import KW_RANGES, QUARTERS, HALFYEARS
+from utils.date_engine import format_date
+from utils.sample_tokens import parse_ist
+
+MONTHS = list(KW_RANGES.keys())
+MONTH_INDEX = {month: position for position, month in enumerate(MONTHS)}
+
+# Period kinds: name -> [{"name", "months"}] (a "month" period is each calendar month on its own)
+PERIODS = {
+    'month': [{"name": month, "months": [month]} for month in MONTHS],
+    'quarter': QUARTERS,
+    'halfyear': HALFYEARS
+}
+
+_NO_DATES = ()
+
+
+def month_dates(datum_val):
+    """dd.mm.yyyy dates of a Datum cell (each part of a ';' list)"""
+    if isinstance(datum_val, str) and ";" in datum_val:
+        return tuple(format_date(d.strip()) for d in datum_val.split(";"))
+    elif isinstance(datum_val, pd.Timestamp):
+        return (format_date(datum_val),)
+    elif datum_val and not pd.isna(datum_val):
+        return (format_date(datum_val),)
+    return _NO_DATES
+
+
+def _membership(periods):
+    """Months x periods 0/1 matrix, so per-period sums are one matrix product"""
+    matrix = np.zeros((len(MONTHS), len(periods)), dtype=np.int64)
+    for column, period in enumerate(periods):
+        for month in period["months"]:
+            matrix[MONTH_INDEX[month], column] = 1
+    return matrix
+
+
+class PeriodBucket:
+    """Samples of one parameter in one period: months with data, samples taken and their dates"""
+
+    __slots__ = ("name", "months", "taken", "dates")
+
+    def __init__(self, name, months, taken, dates):
+        self.name = name
+        self.months = months
+        self.taken = taken
+        self.dates = dates
+
+    def to_dict(self):
+        return {'name': self.name, 'months': list(self.months), 'taken': self.taken, 'dates': list(self.dates)}
+
+
+def _last_per_cell(entries, months):
+    """Positions of the last record of every (entry, month) pair (later cells overwrite earlier ones)"""
+    keys = entries * len(MONTHS) + months
+    _, first_from_end = np.unique(keys[::-1], return_index=True)
+    return len(keys) - 1 - first_from_end
+
+
+class PeriodTable:
+    """
+    Sample counts and dates per month, quarter and half-year for a batch of ParameterCells.
+
+    Built once at ingest from (parameter x month) arrays: every period is reduced from them with
+    one matrix product. Each ParameterCell keeps its row in the table.
+    """
+
+    __slots__ = ("present", "taken", "dates", "remaining")
+
+    def __init__(self, present, taken, by_month):
+        self.present = {}
+        self.taken = {}
+        self.dates = {}
+        n_cells = len(present)
+        has_dates = np.not_equal(by_month, None)
+        month_lists = by_month.tolist()
+
+        for kind, periods in PERIODS.items():
+            membership = _membership(periods)
+            self.present[kind] = (present.astype(np.int64) @ membership) > 0
+            self.taken[kind] = taken @ membership
+            if kind == 'month':
+                self.dates[kind] = by_month
+                continue
+            period_dates = np.full((n_cells, len(periods)), None, dtype=object)
+            for column, period in enumerate(periods):
+                positions = [MONTH_INDEX[month] for month in period["months"]]
+                for row in np.flatnonzero(has_dates[:, positions].any(axis=1)).tolist():
+                    cells = month_lists[row]
+                    period_dates[row, column] = tuple(chain.from_iterable(
+                        cells[position] for position in positions if cells[position] is not None))
+            self.dates[kind] = period_dates
+
+        # Months without samples after the last month with samples (all months if none has any)
+        sampled = present & (taken > 0)
+        any_sampled = sampled.any(axis=1)
+        last_sampled = np.where(any_sampled, len(MONTHS) - 1 - np.argmax(sampled[:, ::-1], axis=1), -1)
+        self.remaining = present & ~sampled & (np.arange(len(MONTHS)) > last_sampled[:, None])
+
+    @classmethod
+    def from_records(cls, n_entries, entries, rows, columns, column_values):
+        """
+        Table of the ingest engine's melted month cells: per record (in overwrite order) its entry,
+        sheet row and column position; column_values is position -> (month, col_type, values).
+        """
+        positions = sorted(column_values)
+        lookup = np.full(max(positions) + 1 if positions else 1, -1)
+        month_of, type_of = lookup.copy(), lookup.copy()
+        for position in positions:
+            month, col_type, values = column_values[position]
+            month_of[position] = MONTH_INDEX.get(month, -1)
+            type_of[position] = {"Ist": 1, "Datum": 2}.get(col_type, 0)
+
+        present = np.zeros((n_entries, len(MONTHS)), dtype=bool)
+        taken = np.zeros((n_entries, len(MONTHS)), dtype=np.int64)
+        by_month = np.full((n_entries, len(MONTHS)), None, dtype=object)
+
+        months = month_of[columns]
+        shown = months >= 0
+        present[entries[shown], months[shown]] = True
+
+        for col_type, cell_value in [(1, lambda value: parse_ist(value).count), (2, month_dates)]:
+            selected = np.flatnonzero(shown & (type_of[columns] == col_type))
+            last = selected[_last_per_cell(entries[selected], months[selected])]
+            memo = {}
+            for entry, month, row, position in zip(entries[last].tolist(), months[last].tolist(),
+                                                   rows[last].tolist(), columns[last].tolist()):
+                value = column_values[position][2][row]
+                key = (type(value), value)
+                if key not in memo:
+                    memo[key] = cell_value(value)
+                if col_type == 1:
+                    taken[entry, month] = memo[key]
+                elif memo[key]:
+                    by_month[entry, month] = memo[key]
+
+        return cls(present, taken, by_month)
+
+    @classmethod
+    def from_cells(cls, cells):
+        """Table of ParameterCells built outside the ingest engine; attaches each cell to its row"""
+        present = np.zeros((len(cells), len(MONTHS)), dtype=bool)
+        taken = np.zeros((len(cells), len(MONTHS)), dtype=np.int64)
+        by_month = np.full((len(cells), len(MONTHS)), None, dtype=object)
+        for row, cell in enumerate(cells):
+            for month_cell in cell.months:
+                column = MONTH_INDEX.get(month_cell.month)
+                if column is not None:
+                    present[row, column] = True
+                    taken[row, column] = month_cell.ist_tokens.count
+                    by_month[row, column] = month_dates(month_cell.datum) or None
+
+        table = cls(present, taken, by_month)
+        for row, cell in enumerate(cells):
+            cell.attach_periods(table, row)
+        return table
+
+    def buckets(self, row, kind):
+        """PeriodBuckets of a parameter, one per period of the kind (months: only months with data)"""
+        periods = PERIODS[kind]
+        present, taken, dates = self.present[kind][row], self.taken[kind][row], self.dates[kind][row]
+        buckets = []
+        for column, period in enumerate(periods):
+            if kind == 'month' and not present[column]:
+                continue
+            months = tuple(m for m in period["months"] if self.present['month'][row, MONTH_INDEX[m]])
+            buckets.append(PeriodBucket(period["name"], months, int(taken[column]), dates[column] or _NO_DATES))
+        return buckets
+
+    def month_dates(self, row, month):
+        column = MONTH_INDEX.get(month)
+        return _NO_DATES if column is None else self.dates['month'][row, column] or _NO_DATES
+
+    def remaining_months(self, row):
+        return [month for month, remaining in zip(MONTHS, self.remaining[row].tolist()) if remaining]
+
+
+def aggregate_periods(customers):
+    """Build the PeriodTable of all ParameterCells of the given customers"""
+    cells = {}
+    for customer in customers:
+        for row in customer.rows:
+            for cell in row.parameters.values():
+                cells[id(cell)] = cell
+    return PeriodTable.from_cells(list(cells.values()))
@@ -0,0 +1,203 @@
+# utils/plan_model.py
+
+import sys
+from utils.period_buckets import PeriodTable, aggregate_periods
+from utils.sample_tokens import parse_ist, parse_kw
+
+# Marks a month column type (KW / Ist / Datum) that has no cell for a month
+_MISSING = object()
+
+# Month column types in the order a MonthCell stores them ("" is a month column of no known type)
+COL_TYPES = ("KW", "Ist", "Datum", "")
+
+
+def _intern(value):
+    """Share repeated strings (months, Häufigkeit, PN types, location names) across the whole plan"""
+    return sys.intern(value) if type(value) is str else value
+
+
+class MonthCell:
+    """The KW / Ist / Datum cells of one parameter in one month, with the KW and Ist cells parsed"""
+
+    __slots__ = ("month", "_kw", "_ist", "_datum", "_other", "kw_tokens", "ist_tokens")
+
+    def __init__(self, month):
+        self.month = _intern(month)
+        self._kw = self._ist = self._datum = self._other = _MISSING
+        self.kw_tokens = parse_kw("")
+        self.ist_tokens = parse_ist("")
+
+    def set(self, col_type, value):
+        """Store the cell of a month column; a later column of the same type overwrites it"""
+        if col_type == "KW":
+            self._kw = value
+            self.kw_tokens = parse_kw(value)
+        elif col_type == "Ist":
+            self._ist = value
+            self.ist_tokens = parse_ist(value)
+        elif col_type == "Datum":
+            self._datum = value
+        else:
+            self._other = value
+
+    def _slot(self, col_type):
+        if col_type == "KW":
+            return self._kw
+        if col_type == "Ist":
+            return self._ist
+        if col_type == "Datum":
+            return self._datum
+        return self._other if col_type == "" else _MISSING
+
+    def get(self, col_type, default=""):
+        value = self._slot(col_type)
+        return default if value is _MISSING else value
+
+    def has(self, col_type):
+        return self._slot(col_type) is not _MISSING
+
+    @property
+    def kw(self):
+        return "" if self._kw is _MISSING else self._kw
+
+    @property
+    def ist(self):
+        return "" if self._ist is _MISSING else self._ist
+
+    @property
+    def datum(self):
+        return "" if self._datum is _MISSING else self._datum
+
+    @property
+    def value(self):
+        """The Ist value, or None if the month has no Ist cell"""
+        return None if self._ist is _MISSING else self._ist
+
+    def to_dict(self):
+        return {"value": self.value,
+                "col_type": {col_type: self._slot(col_type) for col_type in COL_TYPES if self.has(col_type)}}
+
+
+class ParameterCell:
+    """Plan figures and month cells of one parameter at one Messstelle/Zapfstelle"""
+
+    __slots__ = ("proben_gesamt", "completed", "pn_type", "haeufigkeit", "months", "_periods", "_period_row")
+
+    def __init__(self, proben_gesamt, completed, pn_type, haeufigkeit, months=()):
+        self.proben_gesamt = int(proben_gesamt)
+        self.completed = int(completed)
+        self.pn_type = _intern(pn_type)
+        self.haeufigkeit = _intern(haeufigkeit)
+        self.months = tuple(months)
+        self._periods = None
+        self._period_row = None
+
+    @property
+    def remaining(self):
+        return max(0, self.proben_gesamt - self.completed)
+
+    def month_names(self):
+        return [cell.month for cell in self.months]
+
+    def month(self, name):
+        """MonthCell of a month, or None if the parameter has nothing in that month"""
+        for cell in self.months:
+            if cell.month == name:
+                return cell
+        return None
+
+    def attach_periods(self, table, row):
+        """Link the cell to its row of the PeriodTable built at ingest"""
+        self._periods, self._period_row = table, row
+
+    def _period_table(self):
+        if self._periods is None:
+            PeriodTable.from_cells([self])
+        return self._periods
+
+    def periods(self, kind):
+        """PeriodBuckets per 'month' (months with data), 'quarter' or 'halfyear'"""
+        return self._period_table().buckets(self._period_row, kind)
+
+    def month_dates(self, month):
+        """dd.mm.yyyy dates of a month's Datum cell"""
+        return self._period_table().month_dates(self._period_row, month)
+
+    def remaining_months(self):
+        """Months with data but no samples after the last month with samples"""
+        return self._period_table().remaining_months(self._period_row)
+
+    def to_dict(self):
+        return {
+            "proben_gesamt": self.proben_gesamt,
+            "completed": self.completed,
+            "pn_type": self.pn_type,
+            "haeufigkeit": self.haeufigkeit,
+            "remaining": self.remaining,
+            "month_data": {cell.month: cell.to_dict() for cell in self.months}
+        }
+
+
+class PlanRow:
+    """One Messstelle/Zapfstelle of a customer with its parameters (name -> ParameterCell)"""
+
+    __slots__ = ("messstelle", "zapfstelle", "parameters")
+
+    def __init__(self, messstelle, zapfstelle, parameters=None):
+        self.messstelle = _intern(messstelle)
+        self.zapfstelle = _intern(zapfstelle)
+        self.parameters = {} if parameters is None else parameters
+
+    def to_dict(self):
+        row = {"Messstelle": self.messstelle, "Zapfstelle": self.zapfstelle}
+        row.update((name, cell.to_dict()) for name, cell in self.parameters.items())
+        return row
+
+
+class Customer:
+    """A customer (or one parameter group of a split customer) of the transformed plan"""
+
+    __slots__ = ("kunde", "rows", "sources")
+
+    def __init__(self, kunde, rows=None, sources=None):
+        self.kunde = kunde
+        self.rows = [] if rows is None else rows
+        self.sources = sources
+
+    def parameter_names(self):
+        """Sorted names of all parameters in the customer's rows (the table's columns)"""
+        names = set()
+        for row in self.rows:
+            for name in row.parameters:
+                if isinstance(name, str) and name.strip().lower() not in ["", "nan", "none"]:
+                    names.add(name.strip())
+        return sorted(str(name) for name in names)
+
+    def to_dict(self):
+        """The nested dict structure of the original transform (Kunde -> Rows -> Parameter)"""
+        customer = {"Kunde": self.kunde, "Rows": [row.to_dict() for row in self.rows]}
+        if self.sources is not None:
+            customer["Quellen"] = self.sources
+        return customer
+
+
+def customer_from_dict(kunde_dict):
+    """Build a Customer from the nested dict structure (e.g. of the row-by-row reference transform)"""
+    rows = []
+    for row in kunde_dict["Rows"]:
+        parameters = {}
+        for name, param in row.items():
+            if name in ["Messstelle", "Zapfstelle"]:
+                continue
+            months = []
+            for month, month_info in param["month_data"].items():
+                cell = MonthCell(month)
+                for col_type, value in month_info["col_type"].items():
+                    cell.set(col_type, value)
+                months.append(cell)
+            parameters[name] = ParameterCell(param["proben_gesamt"], param["completed"],
+                                             param["pn_type"], param["haeufigkeit"], months)
+        rows.append(PlanRow(row["Messstelle"], row["Zapfstelle"], parameters))
+    customer = Customer(kunde_dict["Kunde"], rows, kunde_dict.get("Quellen"))
+    aggregate_periods([customer])
+    return customer
@@ -0,0 +1,181 @@
+# utils/sample_matrix.py
+
+import datetime
+import numpy as np
+from utils.parameter_taxonomy import load_taxonomy
+from utils.period_buckets import MONTHS, MONTH_INDEX
+
+# Sample counts fit easily; int16 keeps the dense tensors small for wide plans
+COUNT_DTYPE = np.int16
+
+
+def current_month():
+    """Month name (as in KW_RANGES) of today's date; overdue figures count up to this month by default"""
+    return MONTHS[datetime.date.today().month - 1]
+
+
+def _codes(values, categories):
+    """Category codes of values, adding unseen values to the categories dict (value -> code)"""
+    return [categories.setdefault(value, len(categories)) for value in values]
+
+
+class SampleMatrix:
+    """
+    Required and taken samples of the whole plan as dense (row x parameter x month) arrays.
+
+    A row is one Messstelle/Zapfstelle of a (possibly split) customer entry. Kunde and parameter
+    group are categorical codes per row / parameter, PN type and Häufigkeit per (row, parameter)
+    (-1 where a row has no such parameter), so progress and workload figures are array reductions.
+    """
+
+    def __init__(self, kunden, locations, parameters, groups, pn_types, frequencies,
+                 row_kunde, param_group, planned, completed, pn_type, haeufigkeit, required, taken):
+        self.kunden = kunden
+        self.locations = locations
+        self.parameters = parameters
+        self.groups = groups
+        self.pn_types = pn_types
+        self.frequencies = frequencies
+        self.row_kunde = row_kunde
+        self.param_group = param_group
+        self.planned = planned
+        self.completed = completed
+        self.pn_type = pn_type
+        self.haeufigkeit = haeufigkeit
+        self.required = required
+        self.taken = taken
+
+    @classmethod
+    def from_customers(cls, customers, taxonomy=None):
+        """Matrix of transformed customers (the entries shown on the dashboard)"""
+        taxonomy = taxonomy or load_taxonomy()
+        kunden = [customer.kunde for customer in customers]
+        parameters = sorted({name for customer in customers for row in customer.rows for name in row.parameters},
+                            key=str)
+        parameter_index = {name: column for column, name in enumerate(parameters)}
+
+        locations, row_kunde = [], []
+        cell_rows, cell_params, cell_list = [], [], []
+        for code, customer in enumerate(customers):
+            for row in customer.rows:
+                row_position = len(locations)
+                locations.append((row.messstelle, row.zapfstelle))
+                row_kunde.append(code)
+                for name, cell in row.parameters.items():
+                    cell_rows.append(row_position)
+                    cell_params.append(parameter_index[name])
+                    cell_list.append(cell)
+
+        shape = (len(locations), len(parameters))
+        planned = np.zeros(shape, dtype=np.int32)
+        completed = np.zeros(shape, dtype=np.int32)
+        pn_type = np.full(shape, -1, dtype=np.int32)
+        haeufigkeit = np.full(shape, -1, dtype=np.int32)
+        required = np.zeros(shape + (len(MONTHS),), dtype=COUNT_DTYPE)
+        taken = np.zeros(shape + (len(MONTHS),), dtype=COUNT_DTYPE)
+
+        pn_types, frequencies = {}, {}
+        if cell_list:
+            rows, params = np.array(cell_rows), np.array(cell_params)
+            planned[rows, params] = [cell.proben_gesamt for cell in cell_list]
+            completed[rows, params] = [cell.completed for cell in cell_list]
+            pn_type[rows, params] = _codes([cell.pn_type for cell in cell_list], pn_types)
+            haeufigkeit[rows, params] = _codes([cell.haeufigkeit for cell in cell_list], frequencies)
+
+            month_rows, month_params, month_columns, month_required, month_taken = [], [], [], [], []
+            for row, param, cell in zip(cell_rows, cell_params, cell_list):
+                for month_cell in cell.months:
+                    column = MONTH_INDEX.get(month_cell.month)
+                    if column is not None:
+                        month_rows.append(row)
+                        month_params.append(param)
+                        month_columns.append(column)
+                        month_required.append(month_cell.kw_tokens.required)
+                        month_taken.append(month_cell.ist_tokens.taken)
+            limit = np.iinfo(COUNT_DTYPE).max
+            required[month_rows, month_params, month_columns] = np.clip(month_required, 0, limit)
+            taken[month_rows, month_params, month_columns] = np.clip(month_taken, 0, limit)
+
+        group_codes = {}
+        param_group = np.array(_codes([taxonomy.group_of(name) for name in parameters], group_codes), dtype=np.int32)
+
+        return cls(kunden, locations, parameters, list(group_codes), list(pn_types), list(frequencies),
+                   np.array(row_kunde, dtype=np.int32), param_group, planned, completed, pn_type, haeufigkeit,
+                   required, taken)
+
+    @property
+    def nbytes(self):
+        return sum(array.nbytes for array in [self.row_kunde, self.param_group, self.planned, self.completed,
+                                              self.pn_type, self.haeufigkeit, self.required, self.taken])
+
+    def _per_kunde(self, per_row):
+        return np.bincount(self.row_kunde, weights=per_row, minlength=len(self.kunden)).astype(np.int64)
+
+    def customer_progress(self):
+        """Kunde -> (completed, planned) samples"""
+        completed = self._per_kunde(self.completed.sum(axis=1))
+        planned = self._per_kunde(self.planned.sum(axis=1))
+        return {kunde: (int(done), int(total)) for kunde, done, total in zip(self.kunden, completed, planned)}
+
+    def parameter_progress(self):
+        """Parameter -> (completed, planned) samples over all customers"""
+        return {name: (int(done), int(total)) for name, done, total in
+                zip(self.parameters, self.completed.sum(axis=0), self.planned.sum(axis=0))}
+
+    def group_progress(self):
+        """Parameter group -> (completed, planned) samples"""
+        completed = np.bincount(self.param_group, weights=self.completed.sum(axis=0), minlength=len(self.groups))
+        planned = np.bincount(self.param_group, weights=self.planned.sum(axis=0), minlength=len(self.groups))
+        return {group: (int(done), int(total)) for group, done, total in zip(self.groups, completed, planned)}
+
+    def missing(self, through_month=None):
+        """(row x parameter) samples still missing in the months up to and including through_month"""
+        last = MONTH_INDEX[through_month or current_month()] + 1
+        due = self.required[:, :, :last].astype(np.int32) - self.taken[:, :, :last]
+        return np.maximum(due, 0).sum(axis=2)
+
+    def overdue(self, through_month=None):
+        """Kunde -> (parameters with missing samples, missing samples) up to through_month (default: now)"""
+        missing = self.missing(through_month)
+        cells = self._per_kunde((missing > 0).sum(axis=1))
+        samples = self._per_kunde(missing.sum(axis=1))
+        return {kunde: (int(count), int(total)) for kunde, count, total in zip(self.kunden, cells, samples)
+                if count}
+
+    def customer_summaries(self, through_month=None):
+        """Per customer entry (in order): rows, parameters, completed/planned and overdue figures"""
+        parameter_rows = np.zeros((len(self.kunden), len(self.parameters)), dtype=np.int32)
+        np.add.at(parameter_rows, self.row_kunde, (self.pn_type >= 0).astype(np.int32))
+        missing = self.missing(through_month)
+        columns = zip(
+            np.bincount(self.row_kunde, minlength=len(self.kunden)).tolist(),
+            (parameter_rows > 0).sum(axis=1).tolist(),
+            self._per_kunde(self.completed.sum(axis=1)).tolist(),
+            self._per_kunde(self.planned.sum(axis=1)).tolist(),
+            self._per_kunde((missing > 0).sum(axis=1)).tolist(),
+            self._per_kunde(missing.sum(axis=1)).tolist()
+        )
+        keys = ('rows', 'parameters', 'completed', 'planned', 'overdue_parameters', 'overdue_samples')
+        return [dict(zip(keys, values)) for values in columns]
+
+    def month_workload(self):
+        """Month -> (required, taken, still open) samples over the whole plan"""
+        required = self.required.sum(axis=(0, 1), dtype=np.int64)
+        taken = self.taken.sum(axis=(0, 1), dtype=np.int64)
+        open_samples = np.maximum(self.required.astype(np.int32) - self.taken, 0).sum(axis=(0, 1), dtype=np.int64)
+        return {month: (int(req), int(done), int(remaining))
+                for month, req, done, remaining in zip(MONTHS, required, taken, open_samples)}
+
+    def summary(self):
+        """Shape, size and plan-wide totals for the /debug endpoints"""
+        overdue = self.overdue()
+        return {
+            'shape': list(self.required.shape),
+            'mb': round(self.nbytes / 1e6, 2),
+            'customers': len(self.kunden),
+            'completed': int(self.completed.sum(dtype=np.int64)),
+            'planned': int(self.planned.sum(dtype=np.int64)),
+            'customers_overdue': len(overdue),
+            'samples_overdue': sum(samples for _, samples in overdue.values()),
+            'month_workload': self.month_workload()
+        }
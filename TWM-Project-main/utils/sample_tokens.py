@@ -0,0 +1,124 @@
+# utils/sample_tokens.py
+
+import re
+from functools import lru_cache
+import pandas as pd
+
+# Distinct raw cell values kept per memo (KW, Ist and count cells repeat heavily across a plan).
+# Typed: 1.0 and True are equal keys but do not parse alike (str(True) has a "T")
+TOKEN_CACHE_SIZE = 8192
+
+_KW_PATTERN = re.compile(r'KW[\s:]*([\d;]+)')
+_T_DAY_PATTERN = re.compile(r'T(\d+)')
+_IST_PATTERN = re.compile(r'T?(\d+)')
+_NUMBER_PATTERN = re.compile(r'\d+')
+
+
+class KwTokens:
+    """
+    Parsed KW cell ("KW 3;7", "T5 T19", "m", 2, ...).
+
+    kind is how the month is drawn: 'kw' (one box per calendar week), 't' (one box per T-day)
+    or 'standard' (one box for the month with required samples).
+    """
+
+    __slots__ = ("kind", "required", "kw_numbers", "t_days", "is_m")
+
+    def __init__(self, kind, required, kw_numbers=(), t_days=(), is_m=False):
+        self.kind = kind
+        self.required = required
+        self.kw_numbers = kw_numbers
+        self.t_days = t_days
+        self.is_m = is_m
+
+
+class IstTokens:
+    """
+    Parsed Ist cell ("T2;T9", 3, "3", ...).
+
+    taken counts a digit string as its value (month boxes), count counts the numbers in a string
+    (quarter/half-year/month-range boxes).
+    """
+
+    __slots__ = ("taken", "count")
+
+    def __init__(self, taken, count):
+        self.taken = taken
+        self.count = count
+
+
+def _required_samples(kw_value_raw):
+    """Required number of samples of a KW cell"""
+    required_samples = 1  # Default value
+    try:
+        if isinstance(kw_value_raw, (int, float)) and not pd.isna(kw_value_raw):
+            required_samples = int(kw_value_raw)
+        elif isinstance(kw_value_raw, str):
+            if kw_value_raw.strip().lower() == "m":
+                required_samples = 1
+            elif kw_value_raw.strip().isdigit():
+                required_samples = int(kw_value_raw.strip())
+            elif "kw" in kw_value_raw.lower():
+                match = _KW_PATTERN.findall(kw_value_raw)
+                if match:
+                    kw_numbers = [k.strip() for k in match[0].split(';') if k.strip().isdigit()]
+                    required_samples = len(kw_numbers) if len(kw_numbers) > 0 else 1
+            elif 't' in kw_value_raw.lower():
+                t_days = _T_DAY_PATTERN.findall(kw_value_raw)
+                required_samples = len(t_days) if len(t_days) > 0 else 1
+            else:
+                match = _NUMBER_PATTERN.findall(kw_value_raw)
+                if match:
+                    if len(match) == 1:
+                        required_samples = int(match[0])
+                    elif ';' in kw_value_raw:
+                        required_samples = len(match)
+    except Exception:
+        required_samples = 1
+
+    return required_samples
+
+
+@lru_cache(maxsize=TOKEN_CACHE_SIZE, typed=True)
+def parse_kw(kw_value_raw):
+    """KwTokens of a KW cell ("" for a month without KW cell)"""
+    text = str(kw_value_raw)
+    if "kw" in text.lower():
+        match = _KW_PATTERN.findall(text)
+        kw_numbers = tuple(k.strip() for k in match[0].split(';') if k.strip().isdigit()) if match else ()
+        return KwTokens('kw', _required_samples(kw_value_raw), kw_numbers=kw_numbers)
+    is_m = isinstance(kw_value_raw, str) and kw_value_raw.strip().lower() == "m"
+    if 'T' in text:
+        return KwTokens('t', _required_samples(kw_value_raw), t_days=tuple(_T_DAY_PATTERN.findall(text)), is_m=is_m)
+    return KwTokens('standard', _required_samples(kw_value_raw), is_m=is_m)
+
+
+@lru_cache(maxsize=TOKEN_CACHE_SIZE, typed=True)
+def parse_ist(ist_value_raw):
+    """IstTokens of an Ist cell ("" for a month without Ist cell)"""
+    taken, count = 0, 0
+    try:
+        if isinstance(ist_value_raw, (int, float)) and not pd.isna(ist_value_raw):
+            taken = count = int(ist_value_raw)
+        elif isinstance(ist_value_raw, str):
+            count = len(_IST_PATTERN.findall(ist_value_raw))
+            taken = int(ist_value_raw.strip()) if ist_value_raw.strip().isdigit() else count
+    except Exception:
+        taken, count = 0, 0
+    return IstTokens(taken, count)
+
+
+@lru_cache(maxsize=TOKEN_CACHE_SIZE, typed=True)
+def parse_count(value):
+    """Sample count of an Aktuell/Gesamt cell: the number, or the first number in a string (0 if none)"""
+    try:
+        return int(value) if not pd.isna(value) else 0
+    except (ValueError, TypeError):
+        match = _NUMBER_PATTERN.search(str(value))
+        return int(match.group()) if match else 0
+
+
+def sample_token_stats():
+    """Memo hit/miss counters for the /debug endpoints"""
+    return {name: parser.cache_info()._asdict() for name, parser in
+            [('kw', parse_kw), ('ist', parse_ist), ('count', parse_count)]}
@@ -0,0 +1,164 @@
+# utils/search_index.py
+
+import sys
+import time
+import numpy as np
+from utils.ingest_log import get_logger
+
+log = get_logger("search_index")
+
+# Substrings are looked up by their character trigrams; shorter queries scan the distinct strings
+NGRAM = 3
+
+# Customer status filters (a customer can be incomplete and over at the same time)
+STATUSES = {
+    'complete': "Vollständig",
+    'incomplete': "Unvollständig",
+    'over': "Mehr Proben als nötig"
+}
+
+
+def normalize_text(value):
+    """Case- and whitespace-insensitive form of a search text or indexed name"""
+    return " ".join(str(value).casefold().split())
+
+
+def _searchable(value):
+    """False for missing (None/NaN) and blank names"""
+    return value is not None and value == value and str(value).strip() != ""
+
+
+def _ngrams(text):
+    return {text[i:i + NGRAM] for i in range(len(text) - NGRAM + 1)}
+
+
+class SubstringIndex:
+    """Trigram inverted index of strings, each owned by one or more customer entries"""
+
+    def __init__(self, owned_strings, n_owners):
+        """owned_strings: (string, owner position) pairs"""
+        owners = {}
+        for text, owner in owned_strings:
+            owners.setdefault(normalize_text(text), set()).add(owner)
+
+        self.strings = list(owners)
+        self.owners = [np.array(sorted(owners[text]), dtype=np.int64) for text in self.strings]
+        self.n_owners = n_owners
+
+        postings = {}
+        for string_id, text in enumerate(self.strings):
+            for gram in _ngrams(text):
+                postings.setdefault(gram, []).append(string_id)
+        self.postings = {gram: np.array(ids, dtype=np.int64) for gram, ids in postings.items()}
+
+    @property
+    def nbytes(self):
+        """Approximate memory of the indexed strings, owner arrays and posting lists"""
+        return (sum(sys.getsizeof(text) for text in self.strings) + sum(ids.nbytes for ids in self.owners)
+                + sum(sys.getsizeof(gram) + ids.nbytes for gram, ids in self.postings.items()))
+
+    def match(self, query):
+        """Owner mask of all strings containing the query"""
+        query = normalize_text(query)
+        mask = np.zeros(self.n_owners, dtype=bool)
+
+        if len(query) < NGRAM:
+            candidates = range(len(self.strings))
+        else:
+            lists = sorted((self.postings.get(gram) for gram in _ngrams(query)),
+                           key=lambda ids: -1 if ids is None else len(ids))
+            if lists[0] is None:
+                return mask
+            candidates = lists[0]
+            for ids in lists[1:]:
+                candidates = np.intersect1d(candidates, ids, assume_unique=True)
+            candidates = candidates.tolist()
+
+        hits = [self.owners[string_id] for string_id in candidates if query in self.strings[string_id]]
+        if hits:
+            mask[np.concatenate(hits)] = True
+        return mask
+
+
+class SearchIndex:
+    """
+    Filter index of the dashboard's customer entries, built once per data version.
+
+    Names and Messstelle/Zapfstelle are trigram-indexed; parameter group, PN type and status are
+    boolean (value x customer) masks from the SampleMatrix, so a query is a few mask ANDs.
+    """
+
+    def __init__(self, customers, matrix):
+        start = time.perf_counter()
+        n_customers = len(customers)
+        self.n_customers = n_customers
+
+        self.names = SubstringIndex(((customer.kunde, position) for position, customer in enumerate(customers)),
+                                    n_customers)
+        self.locations = SubstringIndex(
+            ((name, position) for position, customer in enumerate(customers) for row in customer.rows
+             for name in (row.messstelle, row.zapfstelle) if _searchable(name)),
+            n_customers)
+
+        # (row x parameter) cells of the plan, reduced to customers per value
+        has_cell = matrix.pn_type >= 0
+        self.groups = {group: self._per_customer(matrix, has_cell[:, matrix.param_group == code])
+                       for code, group in enumerate(matrix.groups)}
+        self.pn_types = {pn_type: self._per_customer(matrix, matrix.pn_type == code)
+                         for code, pn_type in enumerate(matrix.pn_types)}
+
+        short = self._per_customer(matrix, has_cell & (matrix.completed < matrix.planned))
+        self.statuses = {
+            'complete': ~short,
+            'incomplete': short,
+            'over': self._per_customer(matrix, has_cell & (matrix.completed > matrix.planned))
+        }
+        self.seconds = round(time.perf_counter() - start, 4)
+        log.info(f"🔎 Built search index for {n_customers} customers, {len(self.locations.strings)} "
+                 f"Messstellen/Zapfstellen in {self.seconds:.2f}s")
+
+    def _per_customer(self, matrix, cells):
+        """Customer mask of entries with at least one matching (row x parameter) cell"""
+        rows = cells.any(axis=1) if cells.ndim == 2 else cells
+        mask = np.zeros(self.n_customers, dtype=bool)
+        mask[matrix.row_kunde[rows]] = True
+        return mask
+
+    def _any_of(self, masks, values):
+        """Union of the masks of the selected values (an unknown value matches nothing)"""
+        result = np.zeros(self.n_customers, dtype=bool)
+        for value in values:
+            if value in masks:
+                result |= masks[value]
+        return result
+
+    def query(self, customer="", location="", groups=(), pn_types=(), statuses=()):
+        """Positions of the customer entries matching all given filters (empty filters match everything)"""
+        mask = np.ones(self.n_customers, dtype=bool)
+        if customer and customer.strip():
+            mask &= self.names.match(customer)
+        if location and location.strip():
+            mask &= self.locations.match(location)
+        if groups:
+            mask &= self._any_of(self.groups, groups)
+        if pn_types:
+            mask &= self._any_of(self.pn_types, pn_types)
+        if statuses:
+            mask &= self._any_of(self.statuses, statuses)
+        return np.flatnonzero(mask).tolist()
+
+    @property
+    def nbytes(self):
+        """Approximate memory of the index (the customer records it points into are not counted)"""
+        masks = [*self.groups.values(), *self.pn_types.values(), *self.statuses.values()]
+        return self.names.nbytes + self.locations.nbytes + sum(mask.nbytes for mask in masks)
+
+    def summary(self):
+        return {
+            'customers': self.n_customers,
+            'locations': len(self.locations.strings),
+            'trigrams': len(self.locations.postings),
+            'groups': len(self.groups),
+            'pn_types': sorted(map(str, self.pn_types)),
+            'seconds': self.seconds
+        }
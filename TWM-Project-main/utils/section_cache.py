@@ -0,0 +1,84 @@
+# utils/section_cache.py
+
+from dash._utils import to_json
+from config.constants import SECTION_CACHE_MAX_ENTRIES, SECTION_CACHE_MAX_BYTES
+from utils.upload_cache import UploadCache
+
+
+def payload_size(component):
+    """Bytes of a rendered component as sent to the browser"""
+    return len(to_json(component))
+
+
+class SectionCache(UploadCache):
+    """
+    Bounded LRU of rendered dashboard sections keyed by (data version, customer, render options).
+
+    The data version of a customer is the version its records were built in: customers an
+    incremental update kept (the same Customer objects) keep their version and cached sections.
+    Datasets are tracked per owner (dashboard session); sessions showing the same data version
+    share its sections.
+    """
+
+    def __init__(self, max_entries=SECTION_CACHE_MAX_ENTRIES, max_bytes=SECTION_CACHE_MAX_BYTES):
+        super().__init__(max_entries, max_bytes)
+        # Owner -> Kunde -> (Customer records, data version they came with)
+        self._versions = {}
+        self.renders = 0
+
+    def track(self, owner, customers, version):
+        """Data version of each customer entry of an owner's new dataset (in order)"""
+        versions = {}
+        with self._lock:
+            previous_versions = self._versions.get(owner, {})
+            for customer in customers:
+                previous = previous_versions.get(customer.kunde)
+                kept = previous is not None and previous[0] is customer
+                versions[customer.kunde] = previous if kept else (customer, version)
+            self._versions[owner] = versions
+            self._drop_untracked()
+        return [versions[customer.kunde][1] for customer in customers]
+
+    def forget(self, owner):
+        """Stop tracking an owner's dataset (e.g. an evicted session)"""
+        with self._lock:
+            if self._versions.pop(owner, None) is not None:
+                self._drop_untracked()
+
+    def _drop_untracked(self):
+        # Sections of customers no owner shows any more can never be hit again
+        current = {(kunde, kept_version) for versions in self._versions.values()
+                   for kunde, (_, kept_version) in versions.items()}
+        for key in [key for key in self._entries if (key[0][1], key[0][0]) not in current]:
+            self.total_bytes -= self._entries.pop(key)[1]
+
+    def section(self, version, customer, options, render):
+        """Cached section of a customer, rendered with render() on a miss"""
+        key = (version, customer.kunde, options)
+        section = self.get(*key)
+        if section is None:
+            section = render()
+            self.renders += 1
+            self.put(*key, section, size=payload_size(section))
+        return section
+
+    def get(self, version, kunde, options):
+        return super().get((version, kunde), options)
+
+    def put(self, version, kunde, options, value, size=None):
+        super().put((version, kunde), options, value, size)
+
+    def stats(self):
+        stats = super().stats()
+        stats['renders'] = self.renders
+        stats['owners_tracked'] = len(self._versions)
+        stats['customers_tracked'] = sum(len(versions) for versions in self._versions.values())
+        return stats
+
+    def _key_label(self, key):
+        (version, kunde), options = key
+        return f"v{version}:{kunde}:{'/'.join(str(option) for option in options)}"
+
+
+# One cache per dashboard process
+SECTION_CACHE = SectionCache()
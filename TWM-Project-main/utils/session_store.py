@@ -0,0 +1,158 @@
+# utils/session_store.py
+
+import threading
+import time
+import uuid
+from collections import OrderedDict
+from config.constants import SESSION_MAX_COUNT, SESSION_MAX_BYTES, SESSION_IDLE_SECONDS
+from utils.ingest_log import get_logger
+from utils.section_cache import payload_size
+from utils.upload_cache import estimate_size
+
+log = get_logger("session_store")
+
+
+def new_session_id():
+    return uuid.uuid4().hex
+
+
+class DashboardSession:
+    """Dataset, rendered content and incremental transform state of one browser session"""
+
+    def __init__(self, session_id):
+        self.id = session_id
+        self.data = None
+        # Upload cache key of data (None if it is not cached)
+        self.data_key = None
+        # Required/taken samples of data as (row x parameter x month) arrays
+        self.matrix = None
+        # Customer/Messstelle/group/PN type/status filter index of data
+        self.search_index = None
+        # Rendered dashboard page and the data version it shows
+        self.content = None
+        self.data_version = 0
+        # Version data came with and the data version of each of its customers (kept by incremental updates)
+        self.sections = {'data_version': None, 'versions': []}
+        # Last transformed frame per customer, so a new workbook version only rebuilds changed customers
+        self.transform_state = {'frame': None, 'customers': {}}
+        self.last_changes = None
+        self.last_timings = None
+        # Set once the session uploads its own workbook: it then no longer follows shared data versions
+        self.pinned = False
+        # Held while a dataset is built and swapped in, so uploads and version syncs do not interleave
+        self.lock = threading.Lock()
+        self.created = self.last_used = time.time()
+        self.bytes = 0
+
+    def measure(self, shared=()):
+        """
+        Account what the session holds: rendered content, search index and matrix, plus its dataset
+        and transformed frame unless they are among shared (held by a cache for every session).
+        """
+        shared_ids = {id(obj) for obj in shared if obj is not None}
+        size = sum(estimate_size(obj) for obj in [self.data, self.transform_state.get('frame')]
+                   if obj is not None and id(obj) not in shared_ids)
+        if self.matrix is not None:
+            size += self.matrix.nbytes
+        if self.search_index is not None:
+            size += self.search_index.nbytes
+        if self.content is not None:
+            size += payload_size(self.content)
+        self.bytes = size
+        return size
+
+    def as_dict(self):
+        return {
+            'session': self.id[:8],
+            'data_version': self.data_version,
+            'customers': len(self.data) if self.data else 0,
+            'pinned': self.pinned,
+            'bytes': self.bytes,
+            'idle_seconds': round(time.time() - self.last_used, 1)
+        }
+
+
+class SessionStore:
+    """
+    Dashboard sessions in an LRU bounded by count and total accounted memory.
+
+    Sessions idle for longer than idle_seconds are evicted first; on_evict(session_id) lets
+    shared caches drop what only that session used.
+    """
+
+    def __init__(self, max_sessions=SESSION_MAX_COUNT, max_bytes=SESSION_MAX_BYTES,
+                 idle_seconds=SESSION_IDLE_SECONDS, on_evict=None):
+        self.max_sessions = max_sessions
+        self.max_bytes = max_bytes
+        self.idle_seconds = idle_seconds
+        self.on_evict = on_evict
+        self._sessions = OrderedDict()
+        self._lock = threading.Lock()
+        self.evictions = 0
+
+    def get(self, session_id):
+        """The session (created on first use), marked as most recently used"""
+        with self._lock:
+            session = self._sessions.get(session_id)
+            if session is None:
+                session = self._sessions[session_id] = DashboardSession(session_id)
+                log.info(f"👤 New dashboard session {session_id[:8]} ({len(self._sessions)} active)")
+            self._sessions.move_to_end(session_id)
+            session.last_used = time.time()
+            evicted = self._evict(keep=session_id)
+        self._notify(evicted)
+        return session
+
+    def resized(self, session):
+        """Re-check the limits after a session's dataset changed (session.bytes is up to date)"""
+        with self._lock:
+            evicted = self._evict(keep=session.id)
+        self._notify(evicted)
+
+    def sessions(self):
+        """Snapshot of the active sessions (least recently used first)"""
+        with self._lock:
+            return list(self._sessions.values())
+
+    @property
+    def total_bytes(self):
+        return sum(session.bytes for session in self._sessions.values())
+
+    def _evict(self, keep):
+        now = time.time()
+        evicted = [session_id for session_id, session in self._sessions.items()
+                   if session_id != keep and now - session.last_used > self.idle_seconds]
+        for session_id in evicted:
+            del self._sessions[session_id]
+
+        # Least recently used sessions beyond the count / memory limits (never the one in use)
+        while len(self._sessions) > 1 and (len(self._sessions) > self.max_sessions
+                                           or self.total_bytes > self.max_bytes):
+            session_id = next(iter(self._sessions))
+            if session_id == keep:
+                self._sessions.move_to_end(session_id)
+                session_id = next(iter(self._sessions))
+            del self._sessions[session_id]
+            evicted.append(session_id)
+
+        self.evictions += len(evicted)
+        return evicted
+
+    def _notify(self, evicted):
+        for session_id in evicted:
+            log.info(f"🧹 Evicted dashboard session {session_id[:8]}")
+            if self.on_evict is not None:
+                self.on_evict(session_id)
+
+    def stats(self):
+        """Counters and per-session figures for the /debug endpoints"""
+        with self._lock:
+            return {
+                'sessions': len(self._sessions),
+                'max_sessions': self.max_sessions,
+                'bytes': self.total_bytes,
+                'max_bytes': self.max_bytes,
+                'idle_seconds': self.idle_seconds,
+                'evictions': self.evictions,
+                'active': [session.as_dict() for session in reversed(self._sessions.values())]
+            }
@@ -1,21 +1,19 @@
 # utils/ui_components.py
 
 import pandas as pd
-import re
-from dash import html
-from config.constants import KW_RANGES, COLORS
-from utils.data_processor import format_date_to_ddmmyyyy
+from dash import html, dcc
+from config.constants import KW_RANGES
 from utils.display_handlers import (
     handle_semiannual_display,
     handle_quarterly_display,
     handle_m_months_grouping,
     create_sample_box,
-    get_colors_for_state
+    get_state_for_sample
 )
 
 
 def create_progress_bar(completed, total, haeufigkeit=""):
-    """Create a progress bar component"""
+    """Create a progress bar component (only the fill width is an inline style)"""
     try:
         completed = int(completed)
         total = int(total)
@@ -25,51 +23,24 @@ def create_progress_bar(completed, total, haeufigkeit=""):
         total = 0
         percent = 0
 
-    is_complete = percent >= 100
-    bar_color = COLORS['progress_complete'] if is_complete else COLORS['progress_incomplete']
-    text_color = "#ffffff" if is_complete else "#212529"
+    state = "complete" if percent >= 100 else "incomplete"
 
     return html.Div([
         html.Div([
             # Filled bar
-            html.Div(style={
-                "width": f"{percent}%",
-                "backgroundColor": bar_color,
-                "height": "100%",
-                "borderRadius": "4px"
-            }),
+            html.Div(className=f"progress-fill {state}", style={"width": f"{percent}%"}),
             # Overlayed text
-            html.Div(f"{completed}/{total} | {haeufigkeit}", style={
-                "position": "absolute",
-                "left": "50%",
-                "top": "50%",
-                "transform": "translate(-50%, -50%)",
-                "fontSize": "14px",
-                "fontWeight": "600",
-                "color": text_color,
-                "whiteSpace": "nowrap",
-                "textShadow": "0 0 1px rgba(0,0,0,0.2)",
-                "-webkit-font-smoothing": "antialiased",
-                "letterSpacing": "0.2px"
-            })
-        ], style={
-            "position": "relative",
-            "height": "22px",
-            "backgroundColor": "#e9ecef",
-            "borderRadius": "4px",
-            "overflow": "hidden",
-            "textAlign": "center",
-            "lineHeight": "22px"
-        })
-    ], style={"marginBottom": "6px"})
+            html.Div(f"{completed}/{total} | {haeufigkeit}", className=f"progress-text {state}")
+        ], className="progress-bar")
+    ], className="progress-container")
 
 
 def create_month_value_display(param_data):
     """Create month value display based on frequency type"""
-    if not param_data or not param_data.get("month_data"):
-        return html.Div("-", style={"textAlign": "center", "color": "#999"})
+    if not param_data or not param_data.months:
+        return html.Div("-", className="month-display-empty")
 
-    haeufigkeit = param_data.get("haeufigkeit", "").strip().lower()
+    haeufigkeit = param_data.haeufigkeit.strip().lower()
 
     # Handle special frequency cases
     if haeufigkeit == "quartalsmäßig":
@@ -85,15 +56,12 @@ def create_month_value_display(param_data):
     # Special handling for cases where we show a grouped Jan-Dec calendar
     # Both "Unregelmäßig" and "Jährlich" with "m" values
     if haeufigkeit in ["unregelmäßig", "jährlich"]:
-        month_data = param_data.get("month_data", {})
         all_m_values = True
 
         # Check if all months have "m" value
-        for month_name, month_info in month_data.items():
-            if isinstance(month_name, str) and month_name in KW_RANGES:
-                col_types = month_info.get("col_type", {})
-                kw_value = col_types.get("KW", "")
-                if not (isinstance(kw_value, str) and kw_value.strip().lower() == "m"):
+        for month_info in param_data.months:
+            if isinstance(month_info.month, str) and month_info.month in KW_RANGES:
+                if not month_info.kw_tokens.is_m:
                     all_m_values = False
                     break
 
@@ -106,34 +74,32 @@ def create_month_value_display(param_data):
 
 def _original_month_rendering_logic(param_data):
     """Original month rendering logic for standard cases"""
-    proben_gesamt = param_data.get("proben_gesamt", 0)
-    completed = param_data.get("completed", 0)
-    month_data = param_data["month_data"]
-    pn_type = param_data.get("pn_type", "").strip()
-    haeufigkeit = param_data.get("haeufigkeit", "").strip().lower()
+    proben_gesamt = param_data.proben_gesamt
+    completed = param_data.completed
+    month_names = param_data.month_names()
+    pn_type = param_data.pn_type.strip()
+    haeufigkeit = param_data.haeufigkeit.strip().lower()
 
     month_order = list(KW_RANGES.keys())
     sorted_months = sorted(
-        [m for m in month_data if isinstance(m, str) and m in KW_RANGES],
+        [m for m in month_names if isinstance(m, str) and m in KW_RANGES],
         key=lambda m: month_order.index(m)
     )
 
     month_divs = []
 
     for month in sorted_months:
-        month_info = month_data[month]
-        col_types = month_info.get("col_type", {})
+        month_info = param_data.month(month)
 
-        # Extract values for this month
-        kw_value_raw = col_types.get("KW", "")
-        ist_value_raw = col_types.get("Ist", "")
-        datum_val = col_types.get("Datum", "")
+        # Extract values for this month (KW and Ist cells are parsed at ingest)
+        kw_tokens = month_info.kw_tokens
+        datum_val = month_info.datum
 
         # Determine number of samples required
-        required_samples = _calculate_required_samples(kw_value_raw)
+        required_samples = kw_tokens.required
 
         # Determine actual samples taken
-        actual_samples_taken = _calculate_actual_samples(ist_value_raw)
+        actual_samples_taken = month_info.ist_tokens.taken
 
         # Determine if this month should be shown
         sample_expected = actual_samples_taken > 0 or (isinstance(datum_val, str) and datum_val.strip()) or isinstance(
@@ -143,119 +109,48 @@ def _original_month_rendering_logic(param_data):
         if not should_show_month:
             continue
 
-        # Determine dates for this month
-        dates = _extract_dates(datum_val)
+        # Dates of this month (formatted at ingest)
+        dates = param_data.month_dates(month)
 
         # Handle different KW formats
-        if "kw" in str(kw_value_raw).lower():
-            month_divs.extend(_handle_kw_format(month, kw_value_raw, actual_samples_taken, dates, haeufigkeit, pn_type))
-        elif 'T' in str(kw_value_raw):
+        if kw_tokens.kind == 'kw':
+            month_divs.extend(
+                _handle_kw_format(month, kw_tokens.kw_numbers, actual_samples_taken, dates, haeufigkeit, pn_type))
+        elif kw_tokens.kind == 't':
             month_divs.extend(
-                _handle_t_day_format(month, kw_value_raw, actual_samples_taken, dates, haeufigkeit, pn_type))
+                _handle_t_day_format(month, kw_tokens.t_days, actual_samples_taken, dates, haeufigkeit, pn_type))
         else:
             month_divs.append(
                 _handle_standard_month(month, actual_samples_taken, required_samples, dates, haeufigkeit, pn_type))
 
-    return html.Div(month_divs, style={"display": "flex", "flexWrap": "wrap", "gap": "6px", "padding": "8px 0"})
-
-
-def _calculate_required_samples(kw_value_raw):
-    """Calculate required number of samples from KW value"""
-    required_samples = 1  # Default value
-    try:
-        if isinstance(kw_value_raw, (int, float)) and not pd.isna(kw_value_raw):
-            required_samples = int(kw_value_raw)
-        elif isinstance(kw_value_raw, str):
-            if kw_value_raw.strip().lower() == "m":
-                required_samples = 1
-            elif kw_value_raw.strip().isdigit():
-                required_samples = int(kw_value_raw.strip())
-            elif "kw" in kw_value_raw.lower():
-                # Handle KW format
-                match = re.findall(r'KW[\s:]*([\d;]+)', kw_value_raw)
-                if match:
-                    kw_numbers = [k.strip() for k in match[0].split(';') if k.strip().isdigit()]
-                    required_samples = len(kw_numbers) if len(kw_numbers) > 0 else 1
-            elif 't' in kw_value_raw.lower():
-                # Handle T-day format
-                t_days = re.findall(r'T(\d+)', kw_value_raw)
-                required_samples = len(t_days) if len(t_days) > 0 else 1
-            else:
-                # Try to extract any numbers
-                match = re.findall(r'\d+', kw_value_raw)
-                if match:
-                    if len(match) == 1:
-                        required_samples = int(match[0])
-                    elif ';' in kw_value_raw:
-                        required_samples = len(match)
-    except:
-        required_samples = 1
-
-    return required_samples
-
-
-def _calculate_actual_samples(ist_value_raw):
-    """Calculate actual number of samples taken"""
-    actual_samples_taken = 0
-    try:
-        if isinstance(ist_value_raw, (int, float)) and not pd.isna(ist_value_raw):
-            actual_samples_taken = int(ist_value_raw)
-        elif isinstance(ist_value_raw, str):
-            if ist_value_raw.strip().isdigit():
-                actual_samples_taken = int(ist_value_raw.strip())
-            else:
-                # Count T occurrences or extract numbers
-                ist_t_values = re.findall(r'T?(\d+)', ist_value_raw)
-                actual_samples_taken = len(ist_t_values) if ist_t_values else 0
-    except:
-        actual_samples_taken = 0
-
-    return actual_samples_taken
-
+    return html.Div(month_divs, className="month-display")
 
-def _extract_dates(datum_val):
-    """Extract dates from datum value"""
-    dates = []
-    if isinstance(datum_val, str) and ";" in datum_val:
-        dates = [format_date_to_ddmmyyyy(d.strip()) for d in datum_val.split(";")]
-    elif isinstance(datum_val, pd.Timestamp):
-        dates = [format_date_to_ddmmyyyy(datum_val)]
-    elif datum_val and not pd.isna(datum_val):
-        dates = [format_date_to_ddmmyyyy(datum_val)]
-    return dates
 
-
-def _handle_kw_format(month, kw_value_raw, actual_samples_taken, dates, haeufigkeit, pn_type):
+def _handle_kw_format(month, kw_numbers, actual_samples_taken, dates, haeufigkeit, pn_type):
     """Handle KW format display"""
     month_divs = []
-    match = re.findall(r'KW[\s:]*([\d;]+)', str(kw_value_raw))
-    if match:
-        kw_numbers = [k.strip() for k in match[0].split(';') if k.strip().isdigit()]
-        for idx, kw in enumerate(kw_numbers):
-            header_text = f"{month} KW{kw}"
-
-            if len(kw_numbers) == 1:
-                taken = actual_samples_taken
-            else:
-                taken = 1 if idx < actual_samples_taken else 0
+    for idx, kw in enumerate(kw_numbers):
+        header_text = f"{month} KW{kw}"
 
-            details = []
-            if haeufigkeit.lower() not in ["täglich", "zweimalig pro woche"]:
-                details = [dates[idx]] if idx < len(dates) else []
+        if len(kw_numbers) == 1:
+            taken = actual_samples_taken
+        else:
+            taken = 1 if idx < actual_samples_taken else 0
 
-            bg_color, text_color, border_color = get_colors_for_state(taken, 1, pn_type)
+        details = []
+        if haeufigkeit.lower() not in ["täglich", "zweimalig pro woche"]:
+            details = [dates[idx]] if idx < len(dates) else []
 
-            month_divs.append(create_sample_box(
-                header_text, taken, 1, details, bg_color, text_color, border_color
-            ))
+        month_divs.append(create_sample_box(
+            header_text, taken, 1, details, get_state_for_sample(taken, 1, pn_type)
+        ))
 
     return month_divs
 
 
-def _handle_t_day_format(month, kw_value_raw, actual_samples_taken, dates, haeufigkeit, pn_type):
+def _handle_t_day_format(month, t_days, actual_samples_taken, dates, haeufigkeit, pn_type):
     """Handle T-day format display"""
     month_divs = []
-    t_days = re.findall(r'T(\d+)', str(kw_value_raw))
     for idx, t_day in enumerate(t_days):
         # Modified header format to show day first, then month
         header_text = f"{t_day} {month}"
@@ -269,10 +164,8 @@ def _handle_t_day_format(month, kw_value_raw, actual_samples_taken, dates, haeuf
         if haeufigkeit.lower() not in ["täglich", "zweimalig pro woche"]:
             details = [dates[idx]] if idx < len(dates) else []
 
-        bg_color, text_color, border_color = get_colors_for_state(taken, 1, pn_type)
-
         month_divs.append(create_sample_box(
-            header_text, taken, 1, details, bg_color, text_color, border_color
+            header_text, taken, 1, details, get_state_for_sample(taken, 1, pn_type)
         ))
 
     return month_divs
@@ -280,12 +173,12 @@ def _handle_t_day_format(month, kw_value_raw, actual_samples_taken, dates, haeuf
 
 def _handle_standard_month(month, actual_samples_taken, required_samples, dates, haeufigkeit, pn_type):
     """Handle standard month display"""
-    bg_color, text_color, border_color = get_colors_for_state(actual_samples_taken, required_samples, pn_type)
+    state = get_state_for_sample(actual_samples_taken, required_samples, pn_type)
 
     details = [] if haeufigkeit.lower() in ["täglich", "zweimalig pro woche"] else dates
 
     return create_sample_box(
-        month, actual_samples_taken, required_samples, details, bg_color, text_color, border_color
+        month, actual_samples_taken, required_samples, details, state
     )
 
 
@@ -304,22 +197,22 @@ def create_customer_table_with_scroll(table_body_rows, sorted_params):
     formatted_rows = []
     for row_data in table_body_rows:
         table_cells = [
-            html.Td(row_data["Messstelle"], className="table-cell-location column-messstelle"),
-            html.Td(row_data["Zapfstelle"], className="table-cell-location column-zapfstelle")
+            html.Td(row_data.messstelle, className="table-cell-location column-messstelle"),
+            html.Td(row_data.zapfstelle, className="table-cell-location column-zapfstelle")
         ]
 
         for param in sorted_params:
-            if param in row_data:
-                param_data = row_data[param]
-                completed = param_data.get("completed", 0)
-                total = param_data.get("proben_gesamt", 0)
+            if param in row_data.parameters:
+                param_data = row_data.parameters[param]
+                completed = param_data.completed
+                total = param_data.proben_gesamt
 
                 # Skip parameters that are empty or 0/0
                 if (total == 0 and completed == 0) or param.lower() in ["", "nan", "none"]:
                     table_cells.append(html.Td("-", className="table-cell-empty column-parameter"))
                     continue
 
-                haeufigkeit = param_data.get("haeufigkeit", "")
+                haeufigkeit = param_data.haeufigkeit
 
                 cell_content = html.Div([
                     create_progress_bar(completed, total, haeufigkeit),
@@ -350,20 +243,7 @@ def create_customer_table_with_scroll(table_body_rows, sorted_params):
 
 def _create_header_cell(text, column_class=""):
     """Create a standardized header cell with optional column class"""
-    return html.Th(text, className=f"table-header-cell {column_class}", style={
-        "backgroundColor": COLORS['header_bg'],
-        "color": "white",
-        "fontWeight": "600",
-        "fontSize": "16px",
-        "padding": "12px",
-        "border": "1px solid #ddd",
-        "textAlign": "center",
-        "whiteSpace": "normal",
-        "wordBreak": "break-word",
-        "-webkit-font-smoothing": "antialiased",
-        "textRendering": "optimizeLegibility",
-        "letterSpacing": "0.1px"
-    })
+    return html.Th(text, className=f"table-header-cell {column_class}")
 
 
 def create_customer_header(kunde_name):
@@ -385,6 +265,56 @@ def create_customer_header(kunde_name):
     })
 
 
+def create_collapsed_customer_section(index, kunde_name, summary):
+    """Customer header with progress, counts and overdue samples; the table is loaded when it is expanded"""
+    overdue = summary['overdue_samples']
+    facts = [
+        f"{summary['rows']} Messstellen",
+        f"{summary['parameters']} Parameter",
+        f"{overdue} Proben überfällig ({summary['overdue_parameters']} Parameter)" if overdue else "Nichts überfällig"
+    ]
+
+    header = html.Div([
+        html.Div([
+            html.Span("▸", id={'type': 'customer-arrow', 'index': index}, className="customer-summary-arrow"),
+            html.Span(kunde_name, className="customer-summary-name")
+        ], className="customer-summary-title"),
+        html.Div(" · ".join(facts), className="customer-summary-facts overdue" if overdue else "customer-summary-facts"),
+        html.Div(create_progress_bar(summary['completed'], summary['planned'], "Proben"),
+                 className="customer-summary-progress")
+    ], id={'type': 'customer-toggle', 'index': index}, n_clicks=0, className="customer-summary-header")
+
+    return html.Div([
+        header,
+        html.Div(id={'type': 'customer-body', 'index': index})
+    ], className="customer-group-container customer-group-collapsible")
+
+
+def create_search_bar(groups, pn_types, statuses):
+    """Search and filter bar above the customer sections (queries run against the server-side SearchIndex)"""
+    def dropdown(filter_id, options, placeholder):
+        return dcc.Dropdown(id=filter_id, options=options, value=[], multi=True, placeholder=placeholder,
+                            clearable=True, className="search-filter")
+
+    return html.Div([
+        dcc.Input(id='search-customer', type='search', placeholder="Kunde...", debounce=0.3,
+                  className="search-input"),
+        dcc.Input(id='search-location', type='search', placeholder="Messstelle / Zapfstelle...", debounce=0.3,
+                  className="search-input"),
+        dropdown('filter-group', [{'label': group, 'value': group} for group in groups], "All parameter groups..."),
+        dropdown('filter-pn-type', [{'label': pn_type, 'value': pn_type} for pn_type in pn_types], "All PN types..."),
+        dropdown('filter-status', [{'label': label, 'value': status} for status, label in statuses.items()],
+                 "All states...")
+    ], className="search-bar")
+
+
+def _create_legend_item(color, text):
+    return html.Div([
+        html.Div(className="legend-color", style={"backgroundColor": color}),
+        html.Span(text, className="legend-text")
+    ], className="legend-item")
+
+
 def create_legend():
     """Create the legend component"""
     return html.Div([
@@ -394,45 +324,14 @@ def create_legend():
             "fontSize": "18px"
         }),
         html.Div([
-            html.H4("Legende", style={"textAlign": "center", "marginBottom": "15px", "fontWeight": "bold"}),
+            html.H4("Legende", className="legend-title"),
 
             html.Div([
-                html.Div([
-                    html.Div(
-                        style={"width": "16px", "height": "16px", "backgroundColor": "#B4E380", "borderRadius": "4px",
-                               "marginRight": "10px"}),
-                    html.Span("Probe genommen", style={"fontSize": "15px"})
-                ], style={"display": "flex", "alignItems": "center", "marginBottom": "8px"}),
-
-                html.Div([
-                    html.Div(
-                        style={"width": "16px", "height": "16px", "backgroundColor": "#1F7D53", "borderRadius": "4px",
-                               "marginRight": "10px"}),
-                    html.Span("Mehr Proben als nötig", style={"fontSize": "15px"})
-                ], style={"display": "flex", "alignItems": "center", "marginBottom": "8px"}),
-
-                html.Div([
-                    html.Div(
-                        style={"width": "16px", "height": "16px", "backgroundColor": "#CB0404", "borderRadius": "4px",
-                               "marginRight": "10px"}),
-                    html.Span("Probe nicht genommen (intern)", style={"fontSize": "15px"})
-                ], style={"display": "flex", "alignItems": "center", "marginBottom": "8px"}),
-
-                html.Div([
-                    html.Div(
-                        style={"width": "16px", "height": "16px", "backgroundColor": "#7F55B1", "borderRadius": "4px",
-                               "marginRight": "10px"}),
-                    html.Span("Probe nicht genommen (extern)", style={"fontSize": "15px"})
-                ], style={"display": "flex", "alignItems": "center"})
+                _create_legend_item("#B4E380", "Probe genommen"),
+                _create_legend_item("#1F7D53", "Mehr Proben als nötig"),
+                _create_legend_item("#CB0404", "Probe nicht genommen (intern)"),
+                _create_legend_item("#7F55B1", "Probe nicht genommen (extern)")
             ], style={"display": "flex", "flexDirection": "column", "alignItems": "flex-start", "gap": "6px"})
 
-        ], style={
-            "padding": "15px 25px",
-            "backgroundColor": "#f8f9fa",
-            "borderRadius": "10px",
-            "margin": "20px auto",
-            "maxWidth": "300px",
-            "boxShadow": "0 2px 5px rgba(0,0,0,0.1)",
-            "textAlign": "left"
-        })
-    ])
\ No newline at end of file
+        ], className="legend-container")
+    ])
@@ -0,0 +1,216 @@
+# utils/upload_cache.py
+
+import hashlib
+import io
+import os
+import shutil
+import sys
+import tempfile
+import threading
+from collections import OrderedDict
+import numpy as np
+import pandas as pd
+from config.constants import UPLOAD_CACHE_MAX_ENTRIES, UPLOAD_CACHE_MAX_BYTES, UPLOAD_SPOOL_MAX_BYTES
+
+_SPOOL_DIR = None
+
+# Uploads are hashed in chunks of this size instead of being read into memory at once
+DIGEST_CHUNK_BYTES = 1024 * 1024
+
+
+def content_digest(data):
+    """SHA-256 hex digest of uploaded workbook bytes"""
+    return hashlib.sha256(data).hexdigest()
+
+
+def source_digest(source, chunk_size=DIGEST_CHUNK_BYTES):
+    """SHA-256 hex digest of a workbook given as path or file-like object, read in chunks"""
+    digest = hashlib.sha256()
+    if hasattr(source, "getbuffer"):
+        with source.getbuffer() as view:
+            digest.update(view)
+        return digest.hexdigest()
+
+    if hasattr(source, "read"):
+        source.seek(0)
+        for chunk in iter(lambda: source.read(chunk_size), b""):
+            digest.update(chunk)
+        source.seek(0)
+    else:
+        with open(source, "rb") as fh:
+            for chunk in iter(lambda: fh.read(chunk_size), b""):
+                digest.update(chunk)
+    return digest.hexdigest()
+
+
+def source_path(source):
+    """File system path of a workbook source (a path or a spilled upload), None for in-memory buffers"""
+    if isinstance(source, (str, os.PathLike)):
+        return os.fspath(source)
+    return getattr(source, "path", None)
+
+
+def source_bytes(source):
+    """Raw bytes of a workbook given as path or file-like object"""
+    if hasattr(source, "getvalue"):
+        return source.getvalue()
+    if hasattr(source, "read"):
+        source.seek(0)
+        data = source.read()
+        source.seek(0)
+        return data
+    with open(source, "rb") as fh:
+        return fh.read()
+
+
+def _spool_dir():
+    """Process-private directory (mode 0700) for uploads too large to keep in memory"""
+    global _SPOOL_DIR
+    if _SPOOL_DIR is None:
+        _SPOOL_DIR = tempfile.mkdtemp(prefix="twm-upload-")
+    return _SPOOL_DIR
+
+
+class SpilledUpload(io.BufferedRandom):
+    """Upload too large for memory: a file in the private spool directory, removed when closed"""
+
+    def __init__(self):
+        fd, self.path = tempfile.mkstemp(suffix=".upload", dir=_spool_dir())
+        super().__init__(io.FileIO(fd, "w+b"))
+
+    def close(self):
+        try:
+            super().close()
+        finally:
+            try:
+                os.remove(self.path)
+            except OSError:
+                pass
+
+
+def spool_upload(stream, max_memory=UPLOAD_SPOOL_MAX_BYTES):
+    """
+    Copy an uploaded file stream into a buffer of its own, rewound and ready to parse.
+
+    Small uploads stay in memory; above max_memory the upload is copied in chunks to a file in
+    a private temp directory (see SpilledUpload), so worker processes can read it by path.
+    """
+    head = stream.read(max_memory + 1)
+    if len(head) <= max_memory:
+        return io.BytesIO(head)
+
+    spool = SpilledUpload()
+    spool.write(head)
+    del head
+    shutil.copyfileobj(stream, spool)
+    spool.seek(0)
+    return spool
+
+
+def estimate_size(obj):
+    """Approximate deep memory footprint of a cached dataset in bytes"""
+    if isinstance(obj, pd.DataFrame):
+        return int(obj.memory_usage(deep=True, index=True).sum())
+
+    size = 0
+    seen = set()
+    stack = [obj]
+    while stack:
+        item = stack.pop()
+        if id(item) in seen:
+            continue
+        seen.add(id(item))
+        if isinstance(item, pd.DataFrame):
+            size += int(item.memory_usage(deep=True, index=True).sum())
+            continue
+        size += sys.getsizeof(item)
+        if isinstance(item, dict):
+            stack.extend(item.keys())
+            stack.extend(item.values())
+        elif isinstance(item, (list, tuple, set)):
+            stack.extend(item)
+        elif isinstance(item, np.ndarray) and item.dtype == object:
+            stack.extend(item.ravel().tolist())
+        elif hasattr(type(item), "__slots__"):
+            # Slotted records of the transformed plan (utils/plan_model.py)
+            stack.extend(getattr(item, slot) for slot in type(item).__slots__ if hasattr(item, slot))
+    return size
+
+
+class UploadCache:
+    """Bounded LRU of parsed/transformed datasets keyed by (namespace, SHA-256 of the upload)"""
+
+    def __init__(self, max_entries=UPLOAD_CACHE_MAX_ENTRIES, max_bytes=UPLOAD_CACHE_MAX_BYTES):
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self.total_bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def get(self, namespace, digest):
+        """Cached value or None; counts a hit or a miss"""
+        with self._lock:
+            entry = self._entries.get((namespace, digest))
+            if entry is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end((namespace, digest))
+            self.hits += 1
+            return entry[0]
+
+    def peek(self, namespace, digest):
+        """Cached value or None; not counted as a lookup"""
+        with self._lock:
+            entry = self._entries.get((namespace, digest))
+            return None if entry is None else entry[0]
+
+    def put(self, namespace, digest, value, size=None):
+        """Store a value, evicting least recently used entries beyond the entry/byte limits"""
+        if size is None:
+            size = estimate_size(value)
+        if size > self.max_bytes:
+            return
+
+        with self._lock:
+            key = (namespace, digest)
+            if key in self._entries:
+                self.total_bytes -= self._entries.pop(key)[1]
+            self._entries[key] = (value, size)
+            self.total_bytes += size
+
+            while self._entries and (len(self._entries) > self.max_entries or self.total_bytes > self.max_bytes):
+                _, (_, evicted_size) = self._entries.popitem(last=False)
+                self.total_bytes -= evicted_size
+                self.evictions += 1
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self.total_bytes = 0
+
+    def stats(self):
+        """Counters for the /debug endpoints"""
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                'entries': len(self._entries),
+                'max_entries': self.max_entries,
+                'bytes': self.total_bytes,
+                'max_bytes': self.max_bytes,
+                'hits': self.hits,
+                'misses': self.misses,
+                'evictions': self.evictions,
+                'hit_rate': round(self.hits / lookups, 3) if lookups else 0.0,
+                'keys': [self._key_label(key) for key in self._entries]
+            }
+
+    def _key_label(self, key):
+        namespace, digest = key
+        return f"{namespace}:{digest[:12]}"
+
+
+# One cache per app process
+UPLOAD_CACHE = UploadCache()
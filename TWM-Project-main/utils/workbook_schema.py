@@ -0,0 +1,161 @@
+# utils/workbook_schema.py
+
+import hashlib
+import re
+from collections import OrderedDict, namedtuple
+from config.constants import KW_RANGES
+
+MONTH_PATTERN = re.compile(r'(Jan|Feb|Mrz|Apr|Mai|Jun|Jul|Aug|Sep|Okt|Nov|Dez)')
+
+# Canonical header names used throughout both apps
+TOTAL_COLUMN = "Proben\nGesamt"
+CURRENT_COLUMN = "Aktuell\nGesamt"
+PN_COLUMN = "PN (I/E)"
+FREQUENCY_COLUMN = "Häufigkeit"
+AREA_COLUMN = "Gebiet"
+# Added on multi-sheet / multi-workbook ingest: file (and sheet) each row came from
+SOURCE_COLUMN = "Quelle"
+
+MAP_REQUIRED_COLUMNS = ["Gebiet", "Bereich", "Messstelle", "Zapfstelle", "Parameter", TOTAL_COLUMN, CURRENT_COLUMN]
+# Read by the map only (latest sample date); the dashboard leaves them out of its frame
+MAP_ONLY_COLUMNS = ["Start Datum", "aktuelles Datum"]
+
+MonthColumn = namedtuple("MonthColumn", ["position", "column", "month", "col_type"])
+MonthColumns = namedtuple("MonthColumns", ["kw", "ist", "datum"])
+
+_SCHEMA_CACHE = OrderedDict()
+_SCHEMA_CACHE_SIZE = 32
+
+
+def header_fingerprint(columns):
+    """Stable fingerprint of a workbook header row"""
+    joined = "\x1f".join(f"{type(col).__name__}:{col}" for col in columns)
+    return hashlib.sha1(joined.encode("utf-8")).hexdigest()
+
+
+def _find_column(columns, exact, *fragments):
+    """Exact header name first, then the first header containing all fragments (case-insensitive)"""
+    if exact in columns:
+        return exact
+    lowered = [(col, col.lower()) for col in columns]
+    return next((col for col, low in lowered if all(f.lower() in low for f in fragments)), None)
+
+
+class WorkbookSchema:
+    """Typed column map of a plan workbook header, resolved once per upload"""
+
+    def __init__(self, columns):
+        self.columns = tuple(columns)
+        self.fingerprint = header_fingerprint(self.columns)
+        str_columns = [col for col in self.columns if isinstance(col, str)]
+
+        # Month columns in sheet order, typed as KW / Ist / Datum ("" for anything else)
+        self.month_columns = []
+        for position, col in enumerate(self.columns):
+            if not isinstance(col, str):
+                continue
+            month_match = MONTH_PATTERN.search(col)
+            if not month_match:
+                continue
+
+            col_type = ""
+            if "KW" in col:
+                col_type = "KW"
+            elif "Ist" in col:
+                col_type = "Ist"
+            elif "Datum" in col:
+                col_type = "Datum"
+            self.month_columns.append(MonthColumn(position, col, month_match.group(1), col_type))
+
+        # month -> KW columns plus the first Ist / Datum column mentioning that month
+        self.months = {}
+        for month in dict.fromkeys(mc.month for mc in self.month_columns):
+            self.months[month] = MonthColumns(
+                kw=[mc.column for mc in self.month_columns if mc.month == month and mc.col_type == "KW"],
+                ist=next((c for c in str_columns if month in c and "Ist" in c), None),
+                datum=next((c for c in str_columns if month in c and "Datum" in c), None)
+            )
+
+        self.total_column = _find_column(str_columns, TOTAL_COLUMN, "Proben", "Gesamt")
+        self.current_column = next((col for col in str_columns if "Aktuell" in col and "Gesamt" in col), None)
+        self.pn_column = _find_column(str_columns, PN_COLUMN, "PN", "I/E")
+        self.frequency_column = _find_column(str_columns, FREQUENCY_COLUMN, "häufigkeit")
+        self.area_column = _find_column(str_columns, AREA_COLUMN, "gebiet")
+
+        self.warnings = self._detect_variations()
+
+    def _detect_variations(self):
+        """Header deviations from the canonical layout, reported once per workbook"""
+        warnings = []
+        for label, resolved, canonical in [
+            ("total", self.total_column, TOTAL_COLUMN),
+            ("current", self.current_column, CURRENT_COLUMN),
+            ("PN type", self.pn_column, PN_COLUMN),
+            ("frequency", self.frequency_column, FREQUENCY_COLUMN),
+            ("Gebiet", self.area_column, AREA_COLUMN),
+        ]:
+            if resolved is None:
+                warnings.append(f"No {label} column found (expected {canonical!r})")
+            elif resolved != canonical:
+                warnings.append(f"Using {resolved!r} as {label} column (expected {canonical!r})")
+
+        for month in KW_RANGES:
+            columns = self.months.get(month)
+            if columns is None:
+                warnings.append(f"No columns found for month {month}")
+                continue
+            for col_type, resolved in [("KW", columns.kw[0] if columns.kw else None),
+                                       ("Ist", columns.ist), ("Datum", columns.datum)]:
+                canonical = f"{month}\n{col_type}"
+                if resolved is None:
+                    warnings.append(f"No {canonical!r} column found")
+                elif resolved != canonical:
+                    warnings.append(f"Using {resolved!r} as {canonical!r}")
+        return warnings
+
+    def datum_column(self, month):
+        """Resolved Datum column of a month, or None"""
+        columns = self.months.get(month)
+        return columns.datum if columns else None
+
+    def datum_columns(self):
+        """Resolved Datum columns in calendar order"""
+        return [self.months[m].datum for m in KW_RANGES if m in self.months and self.months[m].datum]
+
+    def canonical_names(self):
+        """Rename map from resolved header names to the canonical names the map code expects"""
+        renames = {}
+        for resolved, canonical in [(self.total_column, TOTAL_COLUMN), (self.current_column, CURRENT_COLUMN),
+                                    (self.pn_column, PN_COLUMN), (self.frequency_column, FREQUENCY_COLUMN),
+                                    (self.area_column, AREA_COLUMN)]:
+            if resolved and resolved != canonical and canonical not in self.columns:
+                renames[resolved] = canonical
+        for month, columns in self.months.items():
+            for col_type, resolved in [("KW", columns.kw[0] if columns.kw else None),
+                                       ("Ist", columns.ist), ("Datum", columns.datum)]:
+                canonical = f"{month}\n{col_type}"
+                if resolved and resolved != canonical and canonical not in self.columns:
+                    renames[resolved] = canonical
+        return renames
+
+    def missing_columns(self, required):
+        """Required canonical columns that could not be resolved"""
+        available = set(self.columns) | set(self.canonical_names().values())
+        return [col for col in required if col not in available]
+
+
+def get_workbook_schema(columns):
+    """Resolve (or fetch from cache) the schema for a header row"""
+    columns = tuple(columns)
+    fingerprint = header_fingerprint(columns)
+
+    schema = _SCHEMA_CACHE.get(fingerprint)
+    if schema is not None:
+        _SCHEMA_CACHE.move_to_end(fingerprint)
+        return schema
+
+    schema = WorkbookSchema(columns)
+    _SCHEMA_CACHE[fingerprint] = schema
+    if len(_SCHEMA_CACHE) > _SCHEMA_CACHE_SIZE:
+        _SCHEMA_CACHE.popitem(last=False)
+    return schema